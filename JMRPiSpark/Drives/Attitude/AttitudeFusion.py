@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# Attitude Fusion
+# Orientation ( quaternion and Euler angles ) from MPU6050 accelerometer and gyroscope samples
+# 由 MPU6050 加速度计和陀螺仪样本计算姿态（四元数和欧拉角）
+#
+# @version v1.0.0
+#
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    # numpy is only used by batch update of numpy structured arrays
+    numpy = None
+
+DEG_TO_RAD = math.pi / 180.0
+RAD_TO_DEG = 180.0 / math.pi
+
+_INF = float("inf")
+_NAN = float("nan")
+
+##
+# Default weight of gyroscope in ComplementaryFilter
+DEF_COMPLEMENTARY_ALPHA = 0.98
+##
+# Default gain of MadgwickFilter
+DEF_MADGWICK_BETA = 0.1
+##
+# Default proportional and integral gains of MahonyFilter
+DEF_MAHONY_KP = 1.0
+DEF_MAHONY_KI = 0.0
+
+def quaternionToEuler(q):
+    """!
+    \~english
+    Convert a quaternion to Euler angles ( Z-Y-X order )
+    @param q: quaternion ( w, x, y, z )
+    @return ( roll, pitch, yaw ) in degrees
+    \~chinese
+    四元数转换为欧拉角（Z-Y-X 顺序）
+    @param q: 四元数 ( w, x, y, z )
+    @return ( roll, pitch, yaw )，单位度
+    """
+    w, x, y, z = q
+    roll = math.atan2( 2.0 * ( w * x + y * z ), 1.0 - 2.0 * ( x * x + y * y ) )
+    sinPitch = 2.0 * ( w * y - z * x )
+    pitch = math.asin( max( -1.0, min( 1.0, sinPitch ) ) )
+    yaw = math.atan2( 2.0 * ( w * z + x * y ), 1.0 - 2.0 * ( y * y + z * z ) )
+    return ( roll * RAD_TO_DEG, pitch * RAD_TO_DEG, yaw * RAD_TO_DEG )
+
+def eulerToQuaternion(roll, pitch, yaw):
+    """!
+    \~english
+    Convert Euler angles ( Z-Y-X order ) to a quaternion
+    @param roll, pitch, yaw: angles in degrees
+    @return quaternion ( w, x, y, z )
+    \~chinese
+    欧拉角（Z-Y-X 顺序）转换为四元数
+    @param roll, pitch, yaw: 角度，单位度
+    @return 四元数 ( w, x, y, z )
+    """
+    hr = roll * DEG_TO_RAD * 0.5
+    hp = pitch * DEG_TO_RAD * 0.5
+    hy = yaw * DEG_TO_RAD * 0.5
+    cr, sr = math.cos( hr ), math.sin( hr )
+    cp, sp = math.cos( hp ), math.sin( hp )
+    cy, sy = math.cos( hy ), math.sin( hy )
+    return ( cr * cp * cy + sr * sp * sy,
+             sr * cp * cy - cr * sp * sy,
+             cr * sp * cy + sr * cp * sy,
+             cr * cp * sy - sr * sp * cy )
+
+def _isFinite(x, y, z):
+    # False for None ( readFifo ), NaN ( field not captured in ring buffers ) and infinity
+    return x != None and y != None and z != None and -_INF < x + y + z < _INF
+
+def _tiltFromAccel(ax, ay, az):
+    # roll and pitch in radians from gravity direction
+    return math.atan2( ay, az ), math.atan2( -ax, math.sqrt( ay * ay + az * az ) )
+
+class AttitudeFilter:
+    """!
+    \~english
+    Base class of attitude filters. A filter is updated with samples of MPU6050
+    ( MPUSample, accel in any unit, gyro in deg/s ), one by one with AttitudeFilter#update,
+    or in batch with AttitudeFilter#updateBatch ( eg. the result of MPU6050#readFifo,
+    MPU6050#readFifoArray or MPURingBuffer#read ).
+
+    The time step is taken from sample timestamps, or from sampleRate when timestamps are not available.
+    The first sample initializes roll and pitch from accelerometer.
+
+    \~chinese
+    姿态滤波器基类。滤波器使用 MPU6050 样本（MPUSample，加速度任意单位，陀螺仪单位 deg/s）更新，
+    可以使用 AttitudeFilter#update 逐个更新，或使用 AttitudeFilter#updateBatch 批量更新
+    （例如 MPU6050#readFifo、MPU6050#readFifoArray 或 MPURingBuffer#read 的结果）。
+
+    时间步长取自样本时间戳，没有时间戳时使用 sampleRate。第一个样本由加速度计初始化横滚角和俯仰角。
+    """
+    _sampleRate = None
+    _lastTs = None
+    _initialized = False
+    # Quaternion ( w, x, y, z )
+    _q0 = 1.0
+    _q1 = 0.0
+    _q2 = 0.0
+    _q3 = 0.0
+
+    def __init__(self, sampleRate = None):
+        """!
+        \~english
+        @param sampleRate: sample rate in Hz used when samples have no timestamps, eg. MPU6050#getSampleRate()
+        \~chinese
+        @param sampleRate: 样本没有时间戳时使用的采样率 Hz，例如 MPU6050#getSampleRate()
+        """
+        self._sampleRate = sampleRate
+        self.reset()
+
+    def reset(self):
+        """!
+        \~english Reset attitude, the next sample initializes it again
+        \~chinese 复位姿态，下一个样本将重新初始化
+        """
+        self._q0, self._q1, self._q2, self._q3 = 1.0, 0.0, 0.0, 0.0
+        self._lastTs = None
+        self._initialized = False
+
+    def getQuaternion(self):
+        """!
+        \~english @return quaternion ( w, x, y, z )
+        \~chinese @return 四元数 ( w, x, y, z )
+        """
+        return ( self._q0, self._q1, self._q2, self._q3 )
+
+    def getEuler(self):
+        """!
+        \~english @return Euler angles ( roll, pitch, yaw ) in degrees
+        \~chinese @return 欧拉角 ( roll, pitch, yaw )，单位度
+        """
+        return quaternionToEuler( self.getQuaternion() )
+
+    def _init(self, ax, ay, az):
+        roll, pitch = _tiltFromAccel( ax, ay, az )
+        self._q0, self._q1, self._q2, self._q3 = eulerToQuaternion( roll * RAD_TO_DEG, pitch * RAD_TO_DEG, 0.0 )
+
+    def _step(self, ax, ay, az, gx, gy, gz, dt):
+        # gx, gy, gz in rad/s
+        raise NotImplementedError
+
+    def _dt(self, timestamp, dt):
+        if dt != None: return dt
+        if timestamp == timestamp and timestamp != None:   # not NaN
+            last = self._lastTs
+            self._lastTs = timestamp
+            if last != None and timestamp > last:
+                return timestamp - last
+        if self._sampleRate:
+            return 1.0 / self._sampleRate
+        return None
+
+    def update(self, sample, dt = None):
+        """!
+        \~english
+        Update attitude with a sample, missing accelerometer or gyroscope ( None or NaN ) is skipped
+        @param sample: a MPUSample or a tuple of the same fields
+        @param dt: time step in seconds, None means from timestamps or sampleRate
+        @return Euler angles ( roll, pitch, yaw ) in degrees
+        \~chinese
+        使用一个样本更新姿态，缺失的加速度计或陀螺仪数据（None 或 NaN）被跳过
+        @param sample: MPUSample 或相同字段的元组
+        @param dt: 时间步长，单位秒，None 表示由时间戳或 sampleRate 得到
+        @return 欧拉角 ( roll, pitch, yaw )，单位度
+        """
+        timestamp, ax, ay, az, temp, gx, gy, gz = sample
+        dt = self._dt( timestamp, dt )
+        accelValid = _isFinite( ax, ay, az )
+        if not accelValid:
+            # Filters skip the accelerometer correction on NaN
+            ax = ay = az = _NAN
+        if not self._initialized:
+            # The initial attitude needs the accelerometer
+            if accelValid:
+                self._init( ax, ay, az )
+                self._initialized = True
+        elif dt != None and _isFinite( gx, gy, gz ):
+            self._step( ax, ay, az, gx * DEG_TO_RAD, gy * DEG_TO_RAD, gz * DEG_TO_RAD, dt )
+        return self.getEuler()
+
+    def updateBatch(self, samples, dt = None):
+        """!
+        \~english
+        Update attitude with a batch of samples.
+        For numpy structured arrays ( MPU_SAMPLE_DTYPE ), unit conversion and time steps
+        are computed vectorized, only the filter recursion runs per sample.
+        It is only moderately faster than AttitudeFilter#update ( measured 1.1 ~ 1.9x ), see benchmarks/bench_attitude_fusion.py
+        @param samples: a list of MPUSample or a numpy structured array
+        @param dt: time step in seconds, None means from timestamps or sampleRate
+        @return Euler angles ( roll, pitch, yaw ) in degrees after the last sample
+        \~chinese
+        使用一批样本更新姿态。
+        对于 numpy 结构化数组（MPU_SAMPLE_DTYPE），单位换算和时间步长以向量化方式计算，只有滤波递推逐个样本执行
+        仅比 AttitudeFilter#update 略快（实测 1.1 ~ 1.9 倍），参见 benchmarks/bench_attitude_fusion.py
+        @param samples: MPUSample 列表或 numpy 结构化数组
+        @param dt: 时间步长，单位秒，None 表示由时间戳或 sampleRate 得到
+        @return 最后一个样本后的欧拉角 ( roll, pitch, yaw )，单位度
+        """
+        if numpy is None or not isinstance( samples, numpy.ndarray ):
+            for sample in samples:
+                self.update( sample, dt )
+            return self.getEuler()
+
+        n = len( samples )
+        if n == 0: return self.getEuler()
+
+        if not self._initialized:
+            start = 0
+            while start < n and not self._initialized:
+                self.update( samples[start].tolist(), dt )
+                start += 1
+            samples = samples[start:]
+            n -= start
+            if n == 0: return self.getEuler()
+
+        if dt != None:
+            steps = numpy.full( n, float( dt ) )
+        else:
+            ts = samples["timestamp"]
+            if numpy.isnan( ts ).any():
+                if not self._sampleRate: return self.getEuler()
+                steps = numpy.full( n, 1.0 / self._sampleRate )
+            else:
+                prev = numpy.empty( n )
+                prev[0] = self._lastTs if self._lastTs != None else ts[0]
+                prev[1:] = ts[:-1]
+                steps = ts - prev
+                self._lastTs = float( ts[-1] )
+
+        gx = samples["gyro_x"] * DEG_TO_RAD
+        gy = samples["gyro_y"] * DEG_TO_RAD
+        gz = samples["gyro_z"] * DEG_TO_RAD
+        valid = ( steps > 0 ) & numpy.isfinite( gx + gy + gz )
+        step = self._step
+        for ax, ay, az, gx, gy, gz, h, ok in zip(
+                samples["accel_x"].tolist(), samples["accel_y"].tolist(), samples["accel_z"].tolist(),
+                gx.tolist(), gy.tolist(), gz.tolist(), steps.tolist(), valid.tolist() ):
+            if ok: step( ax, ay, az, gx, gy, gz, h )
+        return self.getEuler()
+
+class ComplementaryFilter(AttitudeFilter):
+    """!
+    \~english
+    Complementary filter: roll and pitch blend integrated gyroscope with accelerometer tilt,
+    yaw is integrated gyroscope only ( it drifts ).
+    The cheapest filter, suited to slow motion, it has gimbal lock at pitch +-90 degrees.
+
+    \~chinese
+    互补滤波器：横滚角和俯仰角融合陀螺仪积分与加速度计倾角，偏航角仅为陀螺仪积分（会漂移）。
+    计算量最小，适用于慢速运动，在俯仰角 +-90 度处存在万向节锁。
+    """
+    _alpha = DEF_COMPLEMENTARY_ALPHA
+    # Euler angles in radians
+    _roll = 0.0
+    _pitch = 0.0
+    _yaw = 0.0
+
+    def __init__(self, alpha = DEF_COMPLEMENTARY_ALPHA, sampleRate = None):
+        """!
+        \~english
+        @param alpha: weight of gyroscope, 0 ~ 1, default: DEF_COMPLEMENTARY_ALPHA
+        @param sampleRate: sample rate in Hz used when samples have no timestamps
+        \~chinese
+        @param alpha: 陀螺仪权重，0 ~ 1，默认：DEF_COMPLEMENTARY_ALPHA
+        @param sampleRate: 样本没有时间戳时使用的采样率 Hz
+        """
+        self._alpha = alpha
+        AttitudeFilter.__init__( self, sampleRate )
+
+    def reset(self):
+        AttitudeFilter.reset( self )
+        self._roll = self._pitch = self._yaw = 0.0
+
+    def getQuaternion(self):
+        return eulerToQuaternion( self._roll * RAD_TO_DEG, self._pitch * RAD_TO_DEG, self._yaw * RAD_TO_DEG )
+
+    def getEuler(self):
+        return ( self._roll * RAD_TO_DEG, self._pitch * RAD_TO_DEG, self._yaw * RAD_TO_DEG )
+
+    def _init(self, ax, ay, az):
+        self._roll, self._pitch = _tiltFromAccel( ax, ay, az )
+        self._yaw = 0.0
+
+    def _step(self, ax, ay, az, gx, gy, gz, dt):
+        alpha = self._alpha
+        # Body rates to Euler angle rates ( Z-Y-X ), singular at pitch +-90 degrees
+        sinRoll = math.sin( self._roll )
+        cosRoll = math.cos( self._roll )
+        cosPitch = max( math.cos( self._pitch ), 1e-6 )
+        tanPitch = math.sin( self._pitch ) / cosPitch
+        roll = self._roll + ( gx + ( sinRoll * gy + cosRoll * gz ) * tanPitch ) * dt
+        pitch = self._pitch + ( cosRoll * gy - sinRoll * gz ) * dt
+        yaw = self._yaw + ( sinRoll * gy + cosRoll * gz ) / cosPitch * dt
+        # False for zero, NaN ( field not captured ) and infinity
+        if 0.0 < ax * ax + ay * ay + az * az < _INF:
+            accRoll, accPitch = _tiltFromAccel( ax, ay, az )
+            # Blend on the shortest way around +-180 degrees
+            roll += ( 1.0 - alpha ) * math.atan2( math.sin( accRoll - roll ), math.cos( accRoll - roll ) )
+            pitch = alpha * pitch + ( 1.0 - alpha ) * accPitch
+        self._roll = math.atan2( math.sin( roll ), math.cos( roll ) )
+        self._pitch = pitch
+        self._yaw = math.atan2( math.sin( yaw ), math.cos( yaw ) )
+
+class MadgwickFilter(AttitudeFilter):
+    """!
+    \~english
+    Madgwick gradient descent filter ( IMU version, without magnetometer ).
+    S. Madgwick, An efficient orientation filter for inertial and inertial/magnetic sensor arrays, 2010
+
+    \~chinese
+    Madgwick 梯度下降滤波器（IMU 版本，无磁力计）。
+    S. Madgwick, An efficient orientation filter for inertial and inertial/magnetic sensor arrays, 2010
+    """
+    _beta = DEF_MADGWICK_BETA
+
+    def __init__(self, beta = DEF_MADGWICK_BETA, sampleRate = None):
+        """!
+        \~english
+        @param beta: filter gain, bigger converges to accelerometer faster but is noisier, default: DEF_MADGWICK_BETA
+        @param sampleRate: sample rate in Hz used when samples have no timestamps
+        \~chinese
+        @param beta: 滤波增益，越大越快收敛到加速度计但噪声越大，默认：DEF_MADGWICK_BETA
+        @param sampleRate: 样本没有时间戳时使用的采样率 Hz
+        """
+        self._beta = beta
+        AttitudeFilter.__init__( self, sampleRate )
+
+    def _step(self, ax, ay, az, gx, gy, gz, dt):
+        q0, q1, q2, q3 = self._q0, self._q1, self._q2, self._q3
+
+        # Rate of change of quaternion from gyroscope
+        qDot0 = 0.5 * ( -q1 * gx - q2 * gy - q3 * gz )
+        qDot1 = 0.5 * ( q0 * gx + q2 * gz - q3 * gy )
+        qDot2 = 0.5 * ( q0 * gy - q1 * gz + q3 * gx )
+        qDot3 = 0.5 * ( q0 * gz + q1 * gy - q2 * gx )
+
+        norm = math.sqrt( ax * ax + ay * ay + az * az )
+        if norm > 0.0:
+            ax /= norm
+            ay /= norm
+            az /= norm
+
+            # Gradient of objective function
+            _2q0 = 2.0 * q0
+            _2q1 = 2.0 * q1
+            _2q2 = 2.0 * q2
+            _2q3 = 2.0 * q3
+            _4q0 = 4.0 * q0
+            _4q1 = 4.0 * q1
+            _4q2 = 4.0 * q2
+            _8q1 = 8.0 * q1
+            _8q2 = 8.0 * q2
+            q0q0 = q0 * q0
+            q1q1 = q1 * q1
+            q2q2 = q2 * q2
+            q3q3 = q3 * q3
+            s0 = _4q0 * q2q2 + _2q2 * ax + _4q0 * q1q1 - _2q1 * ay
+            s1 = _4q1 * q3q3 - _2q3 * ax + 4.0 * q0q0 * q1 - _2q0 * ay - _4q1 + _8q1 * q1q1 + _8q1 * q2q2 + _4q1 * az
+            s2 = 4.0 * q0q0 * q2 + _2q0 * ax + _4q2 * q3q3 - _2q3 * ay - _4q2 + _8q2 * q1q1 + _8q2 * q2q2 + _4q2 * az
+            s3 = 4.0 * q1q1 * q3 - _2q1 * ax + 4.0 * q2q2 * q3 - _2q2 * ay
+            norm = math.sqrt( s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3 )
+            if norm > 0.0:
+                beta = self._beta / norm
+                qDot0 -= beta * s0
+                qDot1 -= beta * s1
+                qDot2 -= beta * s2
+                qDot3 -= beta * s3
+
+        q0 += qDot0 * dt
+        q1 += qDot1 * dt
+        q2 += qDot2 * dt
+        q3 += qDot3 * dt
+        norm = 1.0 / math.sqrt( q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3 )
+        self._q0, self._q1, self._q2, self._q3 = q0 * norm, q1 * norm, q2 * norm, q3 * norm
+
+class MahonyFilter(AttitudeFilter):
+    """!
+    \~english
+    Mahony nonlinear complementary filter on quaternion ( IMU version, without magnetometer ),
+    a PI controller corrects gyroscope with the error between measured and estimated gravity.
+    R. Mahony, T. Hamel, J. Pflimlin, Nonlinear Complementary Filters on the Special Orthogonal Group, 2008
+
+    \~chinese
+    四元数上的 Mahony 非线性互补滤波器（IMU 版本，无磁力计），使用 PI 控制器根据测量与估计重力方向的误差修正陀螺仪。
+    R. Mahony, T. Hamel, J. Pflimlin, Nonlinear Complementary Filters on the Special Orthogonal Group, 2008
+    """
+    _kp = DEF_MAHONY_KP
+    _ki = DEF_MAHONY_KI
+    # Integral error terms
+    _ix = 0.0
+    _iy = 0.0
+    _iz = 0.0
+
+    def __init__(self, kp = DEF_MAHONY_KP, ki = DEF_MAHONY_KI, sampleRate = None):
+        """!
+        \~english
+        @param kp: proportional gain, default: DEF_MAHONY_KP
+        @param ki: integral gain, it estimates gyroscope bias when greater than 0, default: DEF_MAHONY_KI
+        @param sampleRate: sample rate in Hz used when samples have no timestamps
+        \~chinese
+        @param kp: 比例增益，默认：DEF_MAHONY_KP
+        @param ki: 积分增益，大于 0 时估计陀螺仪零偏，默认：DEF_MAHONY_KI
+        @param sampleRate: 样本没有时间戳时使用的采样率 Hz
+        """
+        self._kp = kp
+        self._ki = ki
+        AttitudeFilter.__init__( self, sampleRate )
+
+    def reset(self):
+        AttitudeFilter.reset( self )
+        self._ix = self._iy = self._iz = 0.0
+
+    def _step(self, ax, ay, az, gx, gy, gz, dt):
+        q0, q1, q2, q3 = self._q0, self._q1, self._q2, self._q3
+
+        norm = math.sqrt( ax * ax + ay * ay + az * az )
+        if norm > 0.0:
+            ax /= norm
+            ay /= norm
+            az /= norm
+
+            # Estimated direction of gravity ( half )
+            halfVx = q1 * q3 - q0 * q2
+            halfVy = q0 * q1 + q2 * q3
+            halfVz = q0 * q0 - 0.5 + q3 * q3
+
+            # Error is cross product between measured and estimated direction of gravity
+            halfEx = ay * halfVz - az * halfVy
+            halfEy = az * halfVx - ax * halfVz
+            halfEz = ax * halfVy - ay * halfVx
+
+            if self._ki > 0.0:
+                self._ix += 2.0 * self._ki * halfEx * dt
+                self._iy += 2.0 * self._ki * halfEy * dt
+                self._iz += 2.0 * self._ki * halfEz * dt
+                gx += self._ix
+                gy += self._iy
+                gz += self._iz
+
+            gx += 2.0 * self._kp * halfEx
+            gy += 2.0 * self._kp * halfEy
+            gz += 2.0 * self._kp * halfEz
+
+        # Integrate rate of change of quaternion
+        gx *= 0.5 * dt
+        gy *= 0.5 * dt
+        gz *= 0.5 * dt
+        q0, q1, q2, q3 = ( q0 + ( -q1 * gx - q2 * gy - q3 * gz ),
+                           q1 + ( q0 * gx + q2 * gz - q3 * gy ),
+                           q2 + ( q0 * gy - q1 * gz + q3 * gx ),
+                           q3 + ( q0 * gz + q1 * gy - q2 * gx ) )
+        norm = 1.0 / math.sqrt( q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3 )
+        self._q0, self._q1, self._q2, self._q3 = q0 * norm, q1 * norm, q2 * norm, q3 * norm
@@ -31,7 +31,17 @@
 # @date 2018.04.01
 #
 
-import smbus
+import struct
+import time
+from collections import namedtuple
+
+from ..Bus.I2CBus import getI2CBusManager
+
+try:
+    import numpy
+except ImportError:
+    # numpy is only needed by batch decode
+    numpy = None
 
 ##
 # default I2C address of MPU6050
@@ -41,6 +51,18 @@ DEF_MPU6050_ADDRESS = 0x68
 # Earth Gravitiy
 GRAVITIY_EARTH  = 9.80665
 
+##
+# \~english
+# A sample of MPU6050: timestamp in seconds ( time.time() ), accel in m/s^2,
+# temp in degrees Celcius, gyro in deg/s. The values not read are None
+# \~chinese
+# MPU6050 样本：时间戳单位秒（time.time()），加速度单位 m/s^2，温度单位摄氏度，陀螺仪单位 deg/s。未读取的数据为 None
+MPUSample = namedtuple( "MPUSample", ( "timestamp", "accel_x", "accel_y", "accel_z", "temp", "gyro_x", "gyro_y", "gyro_z" ) )
+
+##
+# numpy structured dtype of MPUSample for batch decode, the values not read are NaN
+MPU_SAMPLE_DTYPE = [ ( name, "f8" ) for name in MPUSample._fields ]
+
 class MPU6050:
     """!
     \~english
@@ -104,9 +126,31 @@ class MPU6050:
     REG_GYRO_YOUT_H = 0x45
     REG_GYRO_ZOUT_H = 0x47
 
+    # Burst read of sensor data registers ACCEL_XOUT_H ~ GYRO_ZOUT_L:
+    # accel x,y,z, temp, gyro x,y,z, 7 big-endian signed words
+    SENSOR_DATA_LENGTH = 14
+    SENSOR_DATA_FORMAT = ">7h"
+
+    # Offset registers, not described in Register Map revision 4.2,
+    # see MPU Hardware Offset Registers Application Note
+    REG_XA_OFFS_H       = 0x06      # XA, YA, ZA, 3 big-endian signed words, ±16g scale, bit0 is reserved
+    REG_XG_OFFS_USRH    = 0x13      # XG, YG, ZG, 3 big-endian signed words, ±1000dps scale
+
+    REG_SMPLRT_DIV      = 0x19
+    REG_CONFIG          = 0x1A
     REG_GYRO_CONFIG     = 0x1B
     REG_ACCEL_CONFIG    = 0x1C
 
+    REG_FIFO_EN         = 0x23
+    REG_USER_CTRL       = 0x6A
+    REG_FIFO_COUNTH     = 0x72
+    REG_FIFO_R_W        = 0x74
+
+    # FIFO buffer size of MPU6050 ( bytes )
+    FIFO_SIZE = 1024
+    # Max length of SMBus block read
+    I2C_BLOCK_MAX = 32
+
     #Interrupt Register
     REG_INT_PIN_CFG = 0x37      #中断/旁路设置寄存器
     REG_INT_ENABLE  = 0x38      #中断使能寄存器
@@ -164,11 +208,76 @@ class MPU6050:
     VAL_INT_ENABLE_MOTION   = 0x40      #Motion detection
     VAL_INT_ENABLE_DATA_RDY = 0x01      #Data Ready ( Gyro data do not have data in cycle mode )
 
+    #INT status values
+    VAL_INT_STATUS_MOT        = 0x40
+    VAL_INT_STATUS_FIFO_OFLOW = 0x10
+    VAL_INT_STATUS_DATA_RDY   = 0x01
+
+    #FIFO_EN Values
+    #Register 35(0x23) – FIFO Enable / FIFO_EN. page 16
+    VAL_FIFO_EN_TEMP    = 0x80
+    VAL_FIFO_EN_XG      = 0x40
+    VAL_FIFO_EN_YG      = 0x20
+    VAL_FIFO_EN_ZG      = 0x10
+    VAL_FIFO_EN_ACCEL   = 0x08
+
+    #USER_CTRL Values
+    #Register 106(0x6A) – User Control / USER_CTRL. page 38
+    VAL_USER_CTRL_FIFO_EN       = 0x40
+    VAL_USER_CTRL_FIFO_RESET    = 0x04
+
+    #CONFIG Values, DLPF_CFG ( gyroscope bandwidth )
+    #Register 26(0x1A) – Configuration / CONFIG. page 13
+    DLPF_BW_256HZ   = 0x00      #Gyroscope output rate 8kHz
+    DLPF_BW_188HZ   = 0x01      #Gyroscope output rate 1kHz
+    DLPF_BW_98HZ    = 0x02
+    DLPF_BW_42HZ    = 0x03
+    DLPF_BW_20HZ    = 0x04
+    DLPF_BW_10HZ    = 0x05
+    DLPF_BW_5HZ     = 0x06
+
+    # ( gyroscope bandwidth in Hz, DLPF_CFG ), from wide to narrow
+    DLPF_BANDWIDTHS = ( (256, 0x00), (188, 0x01), (98, 0x02), (42, 0x03), (20, 0x04), (10, 0x05), (5, 0x06) )
+
+    # Writable configuration registers kept in shadow copy, grouped by continuous addresses
+    # for burst read when resync
+    SHADOW_REGISTER_GROUPS = (
+        (0x19, 4),  # SMPLRT_DIV, CONFIG, GYRO_CONFIG, ACCEL_CONFIG
+        (0x1F, 2),  # MOT_THR, MOT_DUR
+        (0x23, 1),  # FIFO_EN
+        (0x37, 2),  # INT_PIN_CFG, INT_ENABLE
+        (0x69, 4),  # MOT_DETECT_CTRL, USER_CTRL, PWR_MGMT_1, PWR_MGMT_2
+    )
+
     _address = None
+    _busId = None
     _bus = None
+    # True when the bus is got from I2CBusManager and must be released by close()
+    _ownsBus = False
     _gravityFactor = None;
 
-    def __init__(self, address, busId = 1, gravityFactor = GRAVITIY_EARTH ):
+    # Shadow copy of writable configuration registers { regAddr: value }
+    _shadow = None
+    # Scale modifiers precomputed from the shadow of ACCEL_CONFIG and GYRO_CONFIG
+    _accel_scale = None
+    _gyro_scale = None
+
+    # Temperature model of gyroscope bias ( refTemp, offsets, slopes ), see setGyroTempModel
+    _gyro_temp_model = None
+    # Last decoded temperature, used by gyroscope compensation when temperature is not read
+    _last_temp = None
+    # I2C bus statistics
+    _bus_stats = None
+
+    # FIFO frame size in bytes, None means FIFO is disabled
+    _fifo_frame_size = None
+    # FIFO frame contents: accel, temp, gyro ( True / False )
+    _fifo_layout = None
+    # Timestamp of the next sample read from FIFO, None means unknown
+    _fifo_next_ts = None
+    _fifo_stats = None
+
+    def __init__(self, address, busId = 1, gravityFactor = GRAVITIY_EARTH, bus = None ):
         """!
         \~english
         Initialize the MPU6050 object instance
@@ -176,6 +285,8 @@ class MPU6050:
         @param address        MPU6050 I2C Address (default is: 0x68)
         @param busId          I2C Bus ID of Raspberry Pi. RPi-Spark pHAT default is 1
         @param gravityFactor  Default is GRAVITIY_EARTH
+        @param bus            An smbus compatible bus object, eg. RecordingBus or ReplayBus,
+                              None means the shared bus of I2CBusManager
         
         \~chinese
         初始化 MPU6050 实例
@@ -183,17 +294,44 @@ class MPU6050:
         @param address        MPU6050 I2C 地址（默认为：0x68）
         @param busId          树梅派( Raspberry Pi ) I2C 总线 ID。 RPi-Spark pHAT 默认值为 1
         @param gravityFactor  默认 GRAVITIY_EARTH ( 地球重力加速度 )
+        @param bus            兼容 smbus 的总线对象，例如 RecordingBus 或 ReplayBus，None 表示 I2CBusManager 的共享总线
 
         \~ \n
         @see DEF_MPU6050_ADDRESS
         @see GRAVITIY_EARTH
         """
         self._address = address
-        self._bus = smbus.SMBus( busId )
+        self._busId = busId
+        self._ownsBus = bus == None
+        self._bus = bus if bus != None else getI2CBusManager().getBus( busId )
         self._gravityFactor = gravityFactor
-        self.setAccelRange( self.ACCEL_RANGE_2G )
+        self._shadow = {}
+        self.resetBusStats()
+        try:
+            self.resyncRegisters()
+            self.setAccelRange( self.ACCEL_RANGE_2G )
+        except:
+            self.close()
+            raise
+
+    def close(self):
+        """!
+        \~english
+        Release the shared bus of I2CBusManager, the bus is closed when no device uses it.
+        A bus passed in by bus parameter is not touched
+        \~chinese
+        释放 I2CBusManager 的共享总线，没有设备使用时关闭总线。
+        通过 bus 参数传入的总线不受影响
+        """
+        if self._ownsBus:
+            self._ownsBus = False
+            getI2CBusManager().releaseBus( self._busId )
+        self._bus = None
 
     def _readByte(self, regAddr):
+        stats = self._bus_stats
+        stats["transactions"] += 1
+        stats["bytes_read"] += 1
         return self._bus.read_byte_data(self._address, regAddr)
 
     def _readWord(self, regAddr):
@@ -205,8 +343,83 @@ class MPU6050:
         else:
             return rawVal
 
+    def _readBlock(self, regAddr, length):
+        """!
+        Read registers start at regAddr in one I2C transaction
+        @return a bytes of length
+        """
+        stats = self._bus_stats
+        stats["transactions"] += 1
+        stats["bytes_read"] += length
+        return bytes( bytearray( self._bus.read_i2c_block_data(self._address, regAddr, length) ) )
+
     def _writeByte(self, regAddr, regValue):
+        stats = self._bus_stats
+        stats["transactions"] += 1
+        stats["bytes_written"] += 1
         self._bus.write_byte_data(self._address, regAddr, regValue)
+        if regAddr in self._shadow:
+            self._setShadow(regAddr, regValue)
+
+    def _setShadow(self, regAddr, regValue):
+        self._shadow[regAddr] = regValue
+        if regAddr == self.REG_ACCEL_CONFIG or regAddr == self.REG_GYRO_CONFIG:
+            self._updateScales()
+
+    def _updateScales(self):
+        """!
+        Precompute scale modifiers from the shadow of ACCEL_CONFIG and GYRO_CONFIG
+        """
+        self._accel_scale = {
+            self.ACCEL_RANGE_2G: self.ACCEL_SCALE_MODIFIER_2G,
+            self.ACCEL_RANGE_4G: self.ACCEL_SCALE_MODIFIER_4G,
+            self.ACCEL_RANGE_8G: self.ACCEL_SCALE_MODIFIER_8G,
+            self.ACCEL_RANGE_16G: self.ACCEL_SCALE_MODIFIER_16G,
+        }.get( self.readAccelRange() )
+
+        self._gyro_scale = {
+            self.GYRO_RANGE_250DEG: self.GYRO_SCALE_MODIFIER_250DEG,
+            self.GYRO_RANGE_500DEG: self.GYRO_SCALE_MODIFIER_500DEG,
+            self.GYRO_RANGE_1KDEG: self.GYRO_SCALE_MODIFIER_1KDEG,
+            self.GYRO_RANGE_2KDEG: self.GYRO_SCALE_MODIFIER_2KDEG,
+        }.get( self.readGyroRange() )
+
+    def resyncRegisters(self):
+        """!
+        \~english
+        Read the writable configuration registers from device into the shadow copy.
+        The driver keeps the shadow copy when it writes registers, so configuration 
+        reads ( eg. readAccelRange ) do not access I2C bus. Only call this method when 
+        other program changed the registers.
+
+        \~chinese
+        从设备读取可写配置寄存器到影子副本。
+        驱动写寄存器时会同步更新影子副本，所以读取配置（例如 readAccelRange）不访问 I2C 总线。
+        仅当其它程序改变了寄存器时才需要调用此方法。
+        """
+        for regAddr, length in self.SHADOW_REGISTER_GROUPS:
+            values = bytearray( self._readBlock( regAddr, length ) )
+            for i in range(length):
+                self._shadow[regAddr + i] = values[i]
+        self._updateScales()
+
+    def getBusStats(self):
+        """!
+        \~english
+        Get I2C bus statistics of this device
+        @return a dictionary, eg. { "transactions": 12, "bytes_read": 140, "bytes_written": 2 }
+        \~chinese
+        读取该设备的 I2C 总线统计数据
+        @return 字典，例如：{ "transactions": 12, "bytes_read": 140, "bytes_written": 2 }
+        """
+        return dict( self._bus_stats )
+
+    def resetBusStats(self):
+        """!
+        \~english Reset I2C bus statistics
+        \~chinese 复位 I2C 总线统计数据
+        """
+        self._bus_stats = { "transactions": 0, "bytes_read": 0, "bytes_written": 0 }
 
     def _sendCmd(self, cmd, value, firstClear = True):
         if firstClear:
@@ -219,6 +432,12 @@ class MPU6050:
         \~chinese 复位全部寄存器
         """
         self._writeByte(self.REG_PWR_MGMT_1, self.VAL_PWR_MGMT_1_RESET)
+        # Register Map revision 4.2, page 8: all registers reset to 0x00, 
+        # except PWR_MGMT_1 is 0x40 ( sleep )
+        for regAddr in self._shadow:
+            self._shadow[regAddr] = 0x00
+        self._shadow[self.REG_PWR_MGMT_1] = self.VAL_PWR_MGMT_1_SLEEP
+        self._updateScales()
  
     def open(self):
         """!
@@ -313,7 +532,7 @@ class MPU6050:
         #(decimal) 58 is read, write 0x20 (need read to clear INT state) or 0x00 (auto clear INT state).
         self._sendCmd( self.REG_INT_PIN_CFG, 0x00 )
         
-        orgAccelConf = self._readByte(self.REG_ACCEL_CONFIG)
+        orgAccelConf = self._shadow[self.REG_ACCEL_CONFIG]
         newAccelConf = ( (orgAccelConf | 0xE7) ^ 0xE7 ) | motDHPF
         # Write register 28 (==0x1C) to set the Digital High Pass Filter, 
         # bits 3:0. For example set it to 0x01 for 5Hz. 
@@ -391,13 +610,124 @@ class MPU6050:
         @returns 浮点值，温度以摄氏度为单位
         @note MPU6050寄存器映射和描述修订4.2，第30页
         """
-        rawTemp = self._readWord( self.REG_TEMP_OUT_H )
-        return (rawTemp + 12412.0) / 340.0
+        rawTemp, = struct.unpack( ">h", self._readBlock( self.REG_TEMP_OUT_H, 2 ) )
+        return self._decodeTemp( rawTemp )
         # Get the actual temperature using the formule given in the
         # MPU-6050 Register Map and Descriptions revision 4.2, page 30
         # Temperature in degrees C = (TEMP_OUT Register Value as a signed quantity)/340 + 36.53
 #         return ( rawTemp / 340.0 ) + 36.53
 
+    def _decodeTemp(self, rawTemp):
+        self._last_temp = (rawTemp + 12412.0) / 340.0
+        return self._last_temp
+
+    def readRawData(self):
+        """!
+        \~english
+        Read all sensor data registers ( ACCEL_XOUT_H ~ GYRO_ZOUT_L, 14 bytes ) in one I2C burst read
+        @return a tuple of raw values: ( accelX, accelY, accelZ, temp, gyroX, gyroY, gyroZ )
+        \~chinese
+        一次 I2C 突发读取全部传感器数据寄存器（ACCEL_XOUT_H ~ GYRO_ZOUT_L，14 字节）
+        @return 原始数据元组：( accelX, accelY, accelZ, temp, gyroX, gyroY, gyroZ )
+        """
+        return struct.unpack( self.SENSOR_DATA_FORMAT, self._readBlock( self.REG_ACCEL_XOUT_H, self.SENSOR_DATA_LENGTH ) )
+
+    def readSensorData(self):
+        """!
+        \~english
+        Read all sensor data in one I2C burst read and scale them
+        @return a tuple: ( accelX, accelY, accelZ, temp, gyroX, gyroY, gyroZ ) <br>
+                accel in m/s^2, gyro in deg/s, temp in degrees Celcius
+        \~chinese
+        一次 I2C 突发读取全部传感器数据并换算
+        @return 元组：( accelX, accelY, accelZ, temp, gyroX, gyroY, gyroZ ) <br>
+                加速度单位 m/s^2，陀螺仪单位 deg/s，温度单位摄氏度
+        """
+        ax, ay, az, rawTemp, gx, gy, gz = self.readRawData()
+        gravity = self._gravityFactor / self._accel_scale
+        gyroScale = self._gyro_scale
+        temp = self._decodeTemp( rawTemp )
+        gx /= gyroScale
+        gy /= gyroScale
+        gz /= gyroScale
+        if self._gyro_temp_model != None:
+            cx, cy, cz = self.getGyroTempCorrection( temp )
+            gx -= cx
+            gy -= cy
+            gz -= cz
+        return ( ax * gravity, ay * gravity, az * gravity, temp, gx, gy, gz )
+
+    def getSample(self):
+        """!
+        \~english
+        Read all sensor data in one I2C burst read
+        @return a MPUSample
+        \~chinese
+        一次 I2C 突发读取全部传感器数据
+        @return MPUSample
+        """
+        timestamp = time.time()
+        return MPUSample( timestamp, *self.readSensorData() )
+
+    def _decodeBatch(self, data, layout, timestamps):
+        if numpy is None:
+            raise ImportError("batch decode requires numpy")
+        hasAccel, hasTemp, hasGyro = layout
+        gravity = self._gravityFactor / self._accel_scale
+        gyroScale = 1.0 / self._gyro_scale
+
+        # Output columns of MPUSample, scale and offset of each word in a record
+        columns = []
+        scale = []
+        offset = []
+        if hasAccel:
+            columns += [1, 2, 3]
+            scale += [gravity] * 3
+            offset += [0.0] * 3
+        if hasTemp:
+            columns += [4]
+            scale += [1.0 / 340.0]
+            offset += [12412.0 / 340.0]
+        if hasGyro:
+            columns += [5, 6, 7]
+            scale += [gyroScale] * 3
+            offset += [0.0] * 3
+
+        words = numpy.frombuffer( data, dtype = ">i2" ).reshape( -1, len(columns) )
+        values = numpy.full( ( words.shape[0], len(MPUSample._fields) ), numpy.nan )
+        values[:, columns] = words * numpy.array( scale ) + numpy.array( offset )
+        if timestamps is not None:
+            values[:, 0] = timestamps
+
+        model = self._gyro_temp_model
+        if model != None and hasGyro:
+            temps = values[:, 4] if hasTemp else self._last_temp
+            if temps is not None:
+                refTemp, offsets, slopes = model
+                delta = numpy.reshape( temps - refTemp, ( -1, 1 ) )
+                values[:, 5:8] -= numpy.array( offsets ) + delta * numpy.array( slopes )
+        if hasTemp and len( values ):
+            self._last_temp = float( values[-1, 4] )
+        return values.view( MPU_SAMPLE_DTYPE ).reshape( words.shape[0] )
+
+    def decodeRawBatch(self, data, timestamps = None):
+        """!
+        \~english
+        Decode a batch of raw sensor data records in one vectorized operation, with current scales applied
+        @param data: bytes of N records, each record is SENSOR_DATA_LENGTH bytes
+                     in register order ( ACCEL_XOUT_H ~ GYRO_ZOUT_L )
+        @param timestamps: None, a timestamp or N timestamps, None means NaN
+        @return a numpy structured array of N samples, dtype is MPU_SAMPLE_DTYPE
+        @note numpy is required
+        \~chinese
+        一次向量化操作解码一批原始传感器数据记录，并按当前量程换算
+        @param data: N 条记录的字节数据，每条记录 SENSOR_DATA_LENGTH 字节，按寄存器顺序（ACCEL_XOUT_H ~ GYRO_ZOUT_L）
+        @param timestamps: None、一个时间戳或 N 个时间戳，None 表示 NaN
+        @return N 个样本的 numpy 结构化数组，dtype 为 MPU_SAMPLE_DTYPE
+        @note 需要 numpy
+        """
+        return self._decodeBatch( data, ( True, True, True ), timestamps )
+
     def setAccelRange(self, accelRange):
         """!
         Set range of accelerometer.
@@ -413,7 +743,8 @@ class MPU6050:
 
     def readAccelRange( self ):
         """!
-        Reads the range of accelerometer setup.
+        Reads the range of accelerometer setup from the shadow copy of register, 
+        it does not access I2C bus.
         
         @return an int value.
           It should be one of the following values:
@@ -422,40 +753,20 @@ class MPU6050:
               @see ACCEL_RANGE_8G
               @see ACCEL_RANGE_16G
         """
-        raw_data = self._readByte(self.REG_ACCEL_CONFIG)
+        raw_data = self._shadow.get(self.REG_ACCEL_CONFIG, 0x00)
         raw_data = (raw_data | 0xE7) ^ 0xE7
         return raw_data
 
-    def getAccelData( self,  raw = False ):
+    def _getAccelScale(self):
         """!
-        Gets and returns the X, Y and Z values from the accelerometer.
-
-        @param raw If raw is True, it will return the data in m/s^2,<br> If raw is False, it will return the data in g
-        @return a dictionary with the measurement results or Boolean.
-            @retval {...} data in m/s^2 if raw is True.
-            @retval {...} data in g if raw is False.
-            @retval False means 'Unkown accel range', that you need to check the "accel range" configuration
-        @note Result data format: {"x":0.45634,"y":0.2124,"z":1.334}
+        @return precomputed scale modifier of current accel range or None if range is unknown
         """
-        x = self._readWord(self.REG_ACCEL_XOUT_H)
-        y = self._readWord(self.REG_ACCEL_YOUT_H)
-        z = self._readWord(self.REG_ACCEL_ZOUT_H)
-
-        accel_scale_modifier = None
-        accel_range = self.readAccelRange()
-
-        if accel_range == self.ACCEL_RANGE_2G:
-            accel_scale_modifier = self.ACCEL_SCALE_MODIFIER_2G
-        elif accel_range == self.ACCEL_RANGE_4G:
-            accel_scale_modifier = self.ACCEL_SCALE_MODIFIER_4G
-        elif accel_range == self.ACCEL_RANGE_8G:
-            accel_scale_modifier = self.ACCEL_SCALE_MODIFIER_8G
-        elif accel_range == self.ACCEL_RANGE_16G:
-            accel_scale_modifier = self.ACCEL_SCALE_MODIFIER_16G
-        else:
+        if self._accel_scale == None:
             print( "ERROR: Unkown accel range!" )
-            return False            
-            #accel_scale_modifier = self.ACCEL_SCALE_MODIFIER_2G
+        return self._accel_scale
+
+    def _decodeAccel(self, x, y, z, raw, accel_scale_modifier):
+        if accel_scale_modifier == None: return False
 
         x = x / accel_scale_modifier
         y = y / accel_scale_modifier
@@ -466,6 +777,20 @@ class MPU6050:
         elif raw == False:
             return { 'x': x * self._gravityFactor, 'y': y * self._gravityFactor, 'z': z * self._gravityFactor }
 
+    def getAccelData( self,  raw = False ):
+        """!
+        Gets and returns the X, Y and Z values from the accelerometer.
+
+        @param raw If raw is True, it will return the data in m/s^2,<br> If raw is False, it will return the data in g
+        @return a dictionary with the measurement results or Boolean.
+            @retval {...} data in m/s^2 if raw is True.
+            @retval {...} data in g if raw is False.
+            @retval False means 'Unkown accel range', that you need to check the "accel range" configuration
+        @note Result data format: {"x":0.45634,"y":0.2124,"z":1.334}
+        """
+        x, y, z = struct.unpack( ">3h", self._readBlock( self.REG_ACCEL_XOUT_H, 6 ) )
+        return self._decodeAccel( x, y, z, raw, self._getAccelScale() )
+
     def setGyroRange(self, gyroRange):
         """!
         Set range of gyroscope.
@@ -482,7 +807,7 @@ class MPU6050:
 
     def readGyroRange( self ):
         """!
-        Read range of gyroscope.
+        Read range of gyroscope from the shadow copy of register, it does not access I2C bus.
 
         @return an int value. It should be one of the following values (GYRO_RANGE_250DEG)
 
@@ -491,48 +816,47 @@ class MPU6050:
         @see GYRO_RANGE_1KDEG
         @see GYRO_RANGE_2KDEG
         """
-        raw_data = self._readByte( self.REG_GYRO_CONFIG )
+        raw_data = self._shadow.get( self.REG_GYRO_CONFIG, 0x00 )
         raw_data = (raw_data | 0xE7) ^ 0xE7
         return raw_data
 
-    def getGyroData(self):
+    def _getGyroScale(self):
         """!
-        Gets and returns the X, Y and Z values from the gyroscope
-
-        @return a dictionary with the measurement results or Boolean.
-            @retval {...} a dictionary data.
-            @retval False means 'Unkown gyroscope range', that you need to check the "gyroscope range" configuration
-        @note Result data format: {"x":0.45634,"y":0.2124,"z":1.334}
+        @return precomputed scale modifier of current gyroscope range or None if range is unknown
         """
-        x = self._readWord(self.REG_GYRO_XOUT_H)
-        y = self._readWord(self.REG_GYRO_YOUT_H)
-        z = self._readWord(self.REG_GYRO_ZOUT_H)
-
-        gyro_scale_modifier = None
-        gyro_range = self.readGyroRange()
-
-        if gyro_range == self.GYRO_RANGE_250DEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_250DEG
-        elif gyro_range == self.GYRO_RANGE_500DEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_500DEG
-        elif gyro_range == self.GYRO_RANGE_1KDEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_1KDEG
-        elif gyro_range == self.GYRO_RANGE_2KDEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_2KDEG
-        else:
+        if self._gyro_scale == None:
             print("ERROR: Unkown gyroscope range!")
-            return False
-            #gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_250DEG
+        return self._gyro_scale
+
+    def _decodeGyro(self, x, y, z, gyro_scale_modifier):
+        if gyro_scale_modifier == None: return False
 
         x = x / gyro_scale_modifier
         y = y / gyro_scale_modifier
         z = z / gyro_scale_modifier
+        if self._gyro_temp_model != None:
+            cx, cy, cz = self.getGyroTempCorrection( self._last_temp )
+            x -= cx
+            y -= cy
+            z -= cz
         return {'x': x, 'y': y, 'z': z}
 
+    def getGyroData(self):
+        """!
+        Gets and returns the X, Y and Z values from the gyroscope
+
+        @return a dictionary with the measurement results or Boolean.
+            @retval {...} a dictionary data.
+            @retval False means 'Unkown gyroscope range', that you need to check the "gyroscope range" configuration
+        @note Result data format: {"x":0.45634,"y":0.2124,"z":1.334}
+        """
+        x, y, z = struct.unpack( ">3h", self._readBlock( self.REG_GYRO_XOUT_H, 6 ) )
+        return self._decodeGyro( x, y, z, self._getGyroScale() )
 
     def getAllData(self, temp = True, accel = True, gyro = True):
         """!
         Get all the available data.
+        All sensor data are read in one I2C burst read, so they are from the same sample.
 
         @param temp: True - Allow to return Temperature data
         @param accel: True - Allow to return Accelerometer data
@@ -543,17 +867,416 @@ class MPU6050:
             @retval {"temp":32.3,"accel":{"x":0.45634,"y":0.2124,"z":1.334},"gyro":{"x":0.45634,"y":0.2124,"z":1.334}} Returned all data
         """
         allData = {}
+        if not (temp or accel or gyro):
+            return allData
+
+        ax, ay, az, rawTemp, gx, gy, gz = self.readRawData()
+        # Always decode temperature, it is used by gyroscope compensation
+        tempValue = self._decodeTemp( rawTemp )
         if temp:
-            allData["temp"] = self.getTemp()
+            allData["temp"] = tempValue
 
         if accel:
-            allData["accel"] = self.getAccelData( raw = False )
+            allData["accel"] = self._decodeAccel( ax, ay, az, False, self._getAccelScale() )
 
         if gyro:
-            allData["gyro"] = self.getGyroData()
+            allData["gyro"] = self._decodeGyro( gx, gy, gz, self._getGyroScale() )
 
         return allData
 
+    def getAddress(self):
+        return self._address
+
+    def getBusId(self):
+        return self._busId
+
+    def getGravityFactor(self):
+        return self._gravityFactor
+
+    def _readOffsets(self, regAddr):
+        return struct.unpack( ">3h", self._readBlock( regAddr, 6 ) )
+
+    def _writeOffsets(self, regAddr, values):
+        data = bytearray( struct.pack( ">3h", *values ) )
+        for i in range(6):
+            self._writeByte( regAddr + i, data[i] )
+
+    def getAccelOffsets(self):
+        """!
+        \~english
+        Read accelerometer offset registers XA_OFFS, YA_OFFS, ZA_OFFS
+        @return a tuple ( x, y, z ), ±16g scale ( 2048 LSB/g ), they include factory trim values
+        \~chinese
+        读取加速度计偏移寄存器 XA_OFFS, YA_OFFS, ZA_OFFS
+        @return 元组 ( x, y, z )，±16g 量程（2048 LSB/g），包含出厂校准值
+        """
+        return self._readOffsets( self.REG_XA_OFFS_H )
+
+    def setAccelOffsets(self, x, y, z):
+        """!
+        \~english
+        Write accelerometer offset registers XA_OFFS, YA_OFFS, ZA_OFFS, bit0 of each register is kept
+        @param x, y, z: offsets in ±16g scale ( 2048 LSB/g )
+        \~chinese
+        写入加速度计偏移寄存器 XA_OFFS, YA_OFFS, ZA_OFFS，保留每个寄存器的 bit0
+        @param x, y, z: ±16g 量程（2048 LSB/g）的偏移值
+        """
+        current = self.getAccelOffsets()
+        values = [ ( v & ~1 ) | ( c & 1 ) for v, c in zip( ( x, y, z ), current ) ]
+        self._writeOffsets( self.REG_XA_OFFS_H, values )
+
+    def getGyroOffsets(self):
+        """!
+        \~english
+        Read gyroscope offset registers XG_OFFS_USR, YG_OFFS_USR, ZG_OFFS_USR
+        @return a tuple ( x, y, z ), ±1000dps scale ( 32.8 LSB/dps )
+        \~chinese
+        读取陀螺仪偏移寄存器 XG_OFFS_USR, YG_OFFS_USR, ZG_OFFS_USR
+        @return 元组 ( x, y, z )，±1000dps 量程（32.8 LSB/dps）
+        """
+        return self._readOffsets( self.REG_XG_OFFS_USRH )
+
+    def setGyroOffsets(self, x, y, z):
+        """!
+        \~english
+        Write gyroscope offset registers XG_OFFS_USR, YG_OFFS_USR, ZG_OFFS_USR
+        @param x, y, z: offsets in ±1000dps scale ( 32.8 LSB/dps )
+        \~chinese
+        写入陀螺仪偏移寄存器 XG_OFFS_USR, YG_OFFS_USR, ZG_OFFS_USR
+        @param x, y, z: ±1000dps 量程（32.8 LSB/dps）的偏移值
+        """
+        self._writeOffsets( self.REG_XG_OFFS_USRH, ( x, y, z ) )
+
+    def setGyroTempModel(self, refTemp = None, offsets = None, slopes = None):
+        """!
+        \~english
+        Set the temperature model of gyroscope bias, it is subtracted from gyroscope data in all decode paths:
+        bias = offsets + slopes * ( temp - refTemp )
+        @param refTemp: reference temperature in degrees Celcius, None means disable compensation
+        @param offsets: ( x, y, z ) bias at refTemp in deg/s
+        @param slopes: ( x, y, z ) bias change per degree Celcius in deg/s
+        @note If temperature is not read with gyroscope ( eg. getGyroData, FIFO without temp ),
+              the last decoded temperature is used
+        @see GyroTempModel
+        \~chinese
+        设置陀螺仪零偏的温度模型，所有解码路径都会从陀螺仪数据中减去零偏：
+        bias = offsets + slopes * ( temp - refTemp )
+        @param refTemp: 参考温度，单位摄氏度，None 表示禁用补偿
+        @param offsets: 参考温度下的零偏 ( x, y, z )，单位 deg/s
+        @param slopes: 每摄氏度的零偏变化 ( x, y, z )，单位 deg/s
+        @note 如果温度没有与陀螺仪一起读取（例如 getGyroData、不含温度的 FIFO），则使用最后解码的温度
+        @see GyroTempModel
+        """
+        if refTemp == None:
+            self._gyro_temp_model = None
+            return
+        self._gyro_temp_model = ( float( refTemp ), tuple( offsets ), tuple( slopes ) )
+
+    def getGyroTempModel(self):
+        """!
+        \~english @return ( refTemp, offsets, slopes ) or None, see MPU6050#setGyroTempModel
+        \~chinese @return ( refTemp, offsets, slopes ) 或 None，参见 MPU6050#setGyroTempModel
+        """
+        return self._gyro_temp_model
+
+    def getGyroTempCorrection(self, temp):
+        """!
+        \~english @return ( x, y, z ) gyroscope bias in deg/s at temp by the temperature model
+        \~chinese @return 由温度模型得到的 temp 温度下的陀螺仪零偏 ( x, y, z )，单位 deg/s
+        """
+        model = self._gyro_temp_model
+        if model == None or temp == None: return ( 0.0, 0.0, 0.0 )
+        refTemp, offsets, slopes = model
+        t = temp - refTemp
+        return ( offsets[0] + slopes[0] * t, offsets[1] + slopes[1] * t, offsets[2] + slopes[2] * t )
+
+    def getSampleRate(self):
+        """!
+        \~english
+        Get the sample rate ( output data rate ) of sensor registers and FIFO, 
+        it is computed from the shadow copy of SMPLRT_DIV and CONFIG registers
+        @return sample rate in Hz
+        @note Sample Rate = Gyroscope Output Rate / (1 + SMPLRT_DIV), the gyroscope 
+              output rate is 8kHz when DLPF is disabled ( DLPF_CFG = 0 or 7 ), and 1kHz when DLPF is enabled
+        \~chinese
+        读取传感器寄存器和 FIFO 的采样率（输出数据率），由 SMPLRT_DIV 和 CONFIG 寄存器的影子副本计算
+        @return 采样率，单位 Hz
+        @note 采样率 = 陀螺仪输出率 / (1 + SMPLRT_DIV)，DLPF 禁用时（DLPF_CFG = 0 或 7）陀螺仪输出率为 8kHz，启用时为 1kHz
+        """
+        return self._getGyroOutputRate() / ( 1 + self._shadow.get( self.REG_SMPLRT_DIV, 0x00 ) )
+
+    def _getGyroOutputRate(self):
+        dlpfCfg = self._shadow.get( self.REG_CONFIG, 0x00 ) & 0x07
+        return 8000.0 if dlpfCfg == 0 or dlpfCfg == 7 else 1000.0
+
+    def setDLPF(self, bandwidth):
+        """!
+        \~english
+        Set the digital low pass filter of accelerometer and gyroscope.
+        The narrowest filter whose gyroscope bandwidth is not less than bandwidth is selected.
+        @param bandwidth: required bandwidth in Hz, eg. 42. @see DLPF_BANDWIDTHS
+        @return the selected gyroscope bandwidth in Hz
+        @note The gyroscope output rate is 8kHz with 256Hz bandwidth and 1kHz with others,
+              so the sample rate changes with it, call MPU6050#setSampleRate after this method.
+        \~chinese
+        设置加速度计和陀螺仪的数字低通滤波器。选择陀螺仪带宽不小于 bandwidth 的最窄滤波器
+        @param bandwidth: 需要的带宽，单位 Hz，例如 42。@see DLPF_BANDWIDTHS
+        @return 选定的陀螺仪带宽，单位 Hz
+        @note 带宽 256Hz 时陀螺仪输出率为 8kHz，其它为 1kHz，采样率随之改变，请在此方法之后调用 MPU6050#setSampleRate
+        """
+        if bandwidth <= 0:
+            raise ValueError("bandwidth must be greater than 0")
+        selected = self.DLPF_BANDWIDTHS[0]
+        for bw in self.DLPF_BANDWIDTHS:
+            if bw[0] < bandwidth: break
+            selected = bw
+
+        # Keep EXT_SYNC_SET bits
+        config = self._shadow.get( self.REG_CONFIG, 0x00 ) & 0x38
+        self._sendCmd( self.REG_CONFIG, config | selected[1], False )
+        self._fifo_next_ts = None
+        return selected[0]
+
+    def getDLPF(self):
+        """!
+        \~english @return gyroscope bandwidth of digital low pass filter in Hz, from shadow copy of CONFIG register
+        \~chinese @return 数字低通滤波器的陀螺仪带宽，单位 Hz，由 CONFIG 寄存器的影子副本得到
+        """
+        dlpfCfg = self._shadow.get( self.REG_CONFIG, 0x00 ) & 0x07
+        for bw in self.DLPF_BANDWIDTHS:
+            if bw[1] == dlpfCfg: return bw[0]
+        # DLPF_CFG = 7 is reserved, filter is disabled like DLPF_CFG = 0
+        return self.DLPF_BANDWIDTHS[0][0]
+
+    def setSampleRate(self, rate):
+        """!
+        \~english
+        Set the sample rate ( output data rate ) of sensor registers and FIFO.
+        The divider SMPLRT_DIV is computed from gyroscope output rate of current DLPF setting,
+        the effective rate may differ from rate when it does not divide the gyroscope output rate.
+        @param rate: required sample rate in Hz
+        @return the effective sample rate in Hz
+        @note The accelerometer output rate is 1kHz, with a sample rate above 1kHz the same
+              accelerometer sample is output more than once
+        \~chinese
+        设置传感器寄存器和 FIFO 的采样率（输出数据率）。分频 SMPLRT_DIV 由当前 DLPF 设置的陀螺仪输出率计算，
+        当 rate 不能整除陀螺仪输出率时有效采样率会与 rate 不同
+        @param rate: 需要的采样率，单位 Hz
+        @return 有效采样率，单位 Hz
+        @note 加速度计输出率为 1kHz，采样率高于 1kHz 时同一加速度计样本会被多次输出
+        """
+        gyroRate = self._getGyroOutputRate()
+        if rate <= 0 or rate > gyroRate:
+            raise ValueError("rate must be in (0, {}] Hz with current DLPF setting".format( gyroRate ))
+
+        divider = int( round( gyroRate / rate ) ) - 1
+        if divider > 0xFF:
+            raise ValueError("rate must be at least {} Hz with current DLPF setting".format( gyroRate / 256 ))
+
+        self._sendCmd( self.REG_SMPLRT_DIV, divider, False )
+        self._fifo_next_ts = None
+        return self.getSampleRate()
+
+    def enableFifo(self, accel = True, gyro = True, temp = False):
+        """!
+        \~english
+        Enable FIFO, the sensor writes samples into its 1KB FIFO at sample rate 
+        ( see MPU6050#getSampleRate ), then use MPU6050#readFifo to drain them in batch.
+        @param accel: True - write accelerometer data into FIFO
+        @param gyro: True - write gyroscope data into FIFO
+        @param temp: True - write temperature data into FIFO
+        @note At the default 8kHz sample rate the FIFO overflows in about 10ms, 
+              lower the sample rate before enable FIFO
+
+        \~chinese
+        启用 FIFO，传感器以采样率（参见 MPU6050#getSampleRate）将样本写入 1KB FIFO，
+        然后使用 MPU6050#readFifo 批量读取。
+        @param accel: True - 将加速度计数据写入 FIFO
+        @param gyro: True - 将陀螺仪数据写入 FIFO
+        @param temp: True - 将温度数据写入 FIFO
+        @note 在默认的 8kHz 采样率下 FIFO 约 10ms 就会溢出，启用 FIFO 前请降低采样率
+        """
+        fifoEn = 0x00
+        if accel: fifoEn |= self.VAL_FIFO_EN_ACCEL
+        if temp: fifoEn |= self.VAL_FIFO_EN_TEMP
+        if gyro: fifoEn |= self.VAL_FIFO_EN_XG | self.VAL_FIFO_EN_YG | self.VAL_FIFO_EN_ZG
+        if fifoEn == 0x00:
+            raise ValueError("Need at least one sensor to write into FIFO")
+
+        # Data is written into FIFO in order of register address: accel, temp, gyro
+        self._fifo_layout = ( accel, temp, gyro )
+        self._fifo_frame_size = ( 6 if accel else 0 ) + ( 2 if temp else 0 ) + ( 6 if gyro else 0 )
+        self._fifo_stats = { "reads": 0, "samples": 0, "overflows": 0 }
+
+        self._writeByte( self.REG_FIFO_EN, fifoEn )
+        self.resetFifo()
+
+    def disableFifo(self):
+        """!
+        \~english Disable FIFO
+        \~chinese 停用 FIFO
+        """
+        self._writeByte( self.REG_FIFO_EN, 0x00 )
+        userCtrl = self._shadow[self.REG_USER_CTRL] & ~self.VAL_USER_CTRL_FIFO_EN
+        self._writeByte( self.REG_USER_CTRL, userCtrl )
+        self._fifo_frame_size = None
+        self._fifo_next_ts = None
+
+    def resetFifo(self):
+        """!
+        \~english Clear FIFO data and restart sample timestamps, FIFO keeps enabled
+        \~chinese 清除 FIFO 数据并重新开始样本时间戳，FIFO 保持启用
+        """
+        userCtrl = self._shadow[self.REG_USER_CTRL] & ~self.VAL_USER_CTRL_FIFO_EN
+        self._writeByte( self.REG_USER_CTRL, userCtrl | self.VAL_USER_CTRL_FIFO_RESET )
+        # FIFO_RESET bit automatically clears to 0 after the reset has been triggered
+        self._writeByte( self.REG_USER_CTRL, userCtrl | self.VAL_USER_CTRL_FIFO_EN )
+        self._fifo_next_ts = None
+
+    def getFifoCount(self):
+        """!
+        \~english @return number of bytes in FIFO
+        \~chinese @return FIFO 中的字节数
+        """
+        count, = struct.unpack( ">H", self._readBlock( self.REG_FIFO_COUNTH, 2 ) )
+        return count
+
+    def _readFifoBytes(self, length):
+        chunks = []
+        while length > 0:
+            size = min( length, self.I2C_BLOCK_MAX )
+            chunks.append( self._readBlock( self.REG_FIFO_R_W, size ) )
+            length -= size
+        return b"".join( chunks )
+
+    def readFifo(self, maxSamples = None):
+        """!
+        \~english
+        Drain samples from FIFO in block reads.
+        The timestamps are reconstructed from the sample rate, they continue from 
+        last batch, so there is no gap between batches.
+        If FIFO overflowed, the FIFO is reset and an empty batch is returned.
+
+        @param maxSamples: max number of samples to read, None means all samples in FIFO
+        @return a list of MPUSample, the values not enabled in FIFO are None
+
+        \~chinese
+        使用块读取从 FIFO 批量读取样本。
+        时间戳根据采样率重建，并与上一批次连续，批次之间没有间隙。
+        如果 FIFO 溢出，将复位 FIFO 并返回空批次。
+
+        @param maxSamples: 最多读取的样本数，None 表示读取 FIFO 中的全部样本
+        @return MPUSample 列表，FIFO 中未启用的数据为 None
+        """
+        batch = self._drainFifo( maxSamples )
+        if batch == None: return []
+        data, n, firstTs, period = batch
+        return self._decodeFifoFrames( data, n, firstTs, period )
+
+    def readFifoArray(self, maxSamples = None):
+        """!
+        \~english
+        Drain samples from FIFO in block reads like MPU6050#readFifo,
+        and decode them in one vectorized operation
+        @param maxSamples: max number of samples to read, None means all samples in FIFO
+        @return a numpy structured array, dtype is MPU_SAMPLE_DTYPE, the values not enabled in FIFO are NaN
+        @note numpy is required
+        \~chinese
+        与 MPU6050#readFifo 一样使用块读取从 FIFO 批量读取样本，并一次向量化解码
+        @param maxSamples: 最多读取的样本数，None 表示读取 FIFO 中的全部样本
+        @return numpy 结构化数组，dtype 为 MPU_SAMPLE_DTYPE，FIFO 中未启用的数据为 NaN
+        @note 需要 numpy
+        """
+        if numpy is None:
+            raise ImportError("readFifoArray() requires numpy")
+        batch = self._drainFifo( maxSamples )
+        if batch == None:
+            return numpy.empty( 0, dtype = MPU_SAMPLE_DTYPE )
+        data, n, firstTs, period = batch
+        return self._decodeBatch( data, self._fifo_layout, firstTs + numpy.arange( n ) * period )
+
+    def _drainFifo(self, maxSamples):
+        if self._fifo_frame_size == None:
+            raise ValueError("FIFO is disabled, use enableFifo() first")
+
+        frameSize = self._fifo_frame_size
+        count = self.getFifoCount()
+        now = time.time()
+        if count >= self.FIFO_SIZE:
+            # Oldest data was overwritten and the frames are not aligned any more
+            self._fifo_stats["overflows"] += 1
+            self.resetFifo()
+            return None
+
+        available = count // frameSize
+        n = available if maxSamples == None else min( available, maxSamples )
+        if n == 0: return None
+
+        data = self._readFifoBytes( n * frameSize )
+
+        # Timestamps: continue from last batch, re-anchor to the clock of host 
+        # when the drift is more than 10 sample periods
+        period = 1.0 / self.getSampleRate()
+        lastTs = now - ( available - n ) * period
+        firstTs = lastTs - ( n - 1 ) * period
+        if self._fifo_next_ts != None and abs( self._fifo_next_ts - firstTs ) < 10 * period:
+            firstTs = self._fifo_next_ts
+        self._fifo_next_ts = firstTs + n * period
+
+        self._fifo_stats["reads"] += 1
+        self._fifo_stats["samples"] += n
+        return data, n, firstTs, period
+
+    def _decodeFifoFrames(self, data, n, firstTs, period):
+        hasAccel, hasTemp, hasGyro = self._fifo_layout
+        words = struct.unpack( ">{0}h".format( n * self._fifo_frame_size // 2 ), data )
+        accelScale = self._accel_scale
+        gyroScale = self._gyro_scale
+        gravity = self._gravityFactor / accelScale
+
+        model = self._gyro_temp_model if hasGyro else None
+        if model != None:
+            refTemp, ( ox, oy, oz ), ( sx, sy, sz ) = model
+
+        samples = []
+        i = 0
+        temp = None
+        for k in range(n):
+            ax = ay = az = gx = gy = gz = None
+            if hasAccel:
+                ax = words[i] * gravity
+                ay = words[i+1] * gravity
+                az = words[i+2] * gravity
+                i += 3
+            if hasTemp:
+                temp = ( words[i] + 12412.0 ) / 340.0
+                i += 1
+            if hasGyro:
+                gx = words[i] / gyroScale
+                gy = words[i+1] / gyroScale
+                gz = words[i+2] / gyroScale
+                i += 3
+                if model != None:
+                    t = temp if temp != None else self._last_temp
+                    if t != None:
+                        t -= refTemp
+                        gx -= ox + sx * t
+                        gy -= oy + sy * t
+                        gz -= oz + sz * t
+            samples.append( MPUSample( firstTs + k * period, ax, ay, az, temp, gx, gy, gz ) )
+        if temp != None:
+            self._last_temp = temp
+        return samples
+
+    def getFifoStats(self):
+        """!
+        \~english
+        @return FIFO statistics, eg. { "reads": 10, "samples": 500, "overflows": 0 }
+        \~chinese
+        @return FIFO 统计数据，例如：{ "reads": 10, "samples": 500, "overflows": 0 }
+        """
+        return dict( self._fifo_stats or { "reads": 0, "samples": 0, "overflows": 0 } )
+
 #
 # This a simple test
 # if __name__ == "__main__":
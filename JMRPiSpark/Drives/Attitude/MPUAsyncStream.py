@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# MPU6050 asyncio Stream
+# Async iterators of MPU6050 samples for asyncio applications ( Python 3.5+ )
+# 为 asyncio 应用提供 MPU6050 样本的异步迭代器（Python 3.5+）
+#
+# @version v1.0.0
+#
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from .MPUSampler import DEF_SAMPLE_RATE
+
+##
+# When the queue of a subscription is full, drop the oldest batch
+STREAM_DROP_OLDEST = "drop_oldest"
+##
+# When the queue of a subscription is full, the I/O thread waits for the consumer.
+# With FIFO the samples wait in the sensor FIFO meanwhile
+STREAM_BLOCK = "block"
+
+##
+# Default max number of batches queued for a subscription
+DEF_STREAM_QUEUE_SIZE = 64
+
+# End of stream marker
+_END = object()
+
+# asyncio.current_task is new in Python 3.7
+_currentTask = getattr( asyncio, "current_task", None ) or asyncio.Task.current_task
+
+class MPUStreamSubscription:
+    """!
+    \~english
+    An async iterator of sample batches from a MPUAsyncStream, created by MPUAsyncStream#subscribe.
+    Each item is a list of MPUSample, or a MPUSample when flatten is True.
+    The iteration ends when the stream stops or the subscription is closed.
+    The subscription is closed when the task iterating it ends for any reason ( eg. cancelled while
+    processing a batch ), so a gone consumer never keeps queueing or blocking the stream.
+
+    \~chinese
+    来自 MPUAsyncStream 的样本批次异步迭代器，由 MPUAsyncStream#subscribe 创建。
+    每一项是 MPUSample 列表，flatten 为 True 时是 MPUSample。
+    数据流停止或订阅关闭时迭代结束。
+    迭代订阅的任务因任何原因结束时（例如处理批次时被取消）订阅将被关闭，因此已退出的使用者不会继续排队或阻塞数据流。
+    """
+    ##
+    # \~english number of batches dropped because the queue was full
+    # \~chinese 队列满时丢弃的批次数
+    dropped = 0
+
+    _stream = None
+    _queue = None
+    _flatten = False
+    _pending = None
+    _closed = False
+    # Set when unsubscribed, releases the I/O thread waiting for room in the queue
+    _released = None
+    _consumer = None
+
+    def __init__(self, stream, maxQueue, flatten):
+        self._stream = stream
+        self._queue = asyncio.Queue( maxsize = maxQueue )
+        self._released = asyncio.Event()
+        self._flatten = flatten
+        self._pending = []
+        self.dropped = 0
+
+    def _watchConsumer(self):
+        task = _currentTask()
+        if task is None or task is self._consumer: return
+        self._consumer = task
+        task.add_done_callback( lambda t: self.close() )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._flatten and self._pending:
+            return self._pending.pop( 0 )
+        if self._closed:
+            raise StopAsyncIteration
+        self._watchConsumer()
+        try:
+            batch = await self._queue.get()
+        except asyncio.CancelledError:
+            # The consumer is cancelled, do not keep queueing ( or blocking ) for it
+            self.close()
+            raise
+        if batch is _END:
+            self._closed = True
+            raise StopAsyncIteration
+        if self._flatten:
+            self._pending = batch[1:]
+            return batch[0]
+        return batch
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType, exc, tb):
+        self.close()
+
+    def close(self):
+        """!
+        \~english Unsubscribe, the iteration ends after queued batches
+        \~chinese 取消订阅，队列中的批次读完后迭代结束
+        """
+        if not self._stream._unsubscribe( self ): return
+        self._released.set()
+        self._put( _END )
+
+    def isSubscribed(self):
+        return not self._released.is_set()
+
+    def _put(self, batch):
+        # Runs on event loop, drop oldest when full
+        queue = self._queue
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait( batch )
+
+    async def _putWait(self, batch):
+        # Runs on event loop, waits for room in the queue until unsubscribed
+        if self._released.is_set(): return
+        put = asyncio.ensure_future( self._queue.put( batch ) )
+        released = asyncio.ensure_future( self._released.wait() )
+        try:
+            await asyncio.wait( [ put, released ], return_when = asyncio.FIRST_COMPLETED )
+        finally:
+            put.cancel()
+            released.cancel()
+
+class MPUAsyncStream:
+    """!
+    \~english
+    asyncio streaming of MPU6050. One I/O thread owns the I2C bus and reads sample batches,
+    from FIFO ( MPU6050#readFifo ) or by polling sensor registers at a poll rate,
+    then fans them out to any number of subscriptions on the event loop.
+    Coroutines consume samples without blocking the event loop and without touching the bus.
+
+    \~chinese
+    MPU6050 的 asyncio 数据流。由一个 I/O 线程独占 I2C 总线并读取样本批次，
+    数据来自 FIFO（MPU6050#readFifo）或按轮询频率轮询传感器寄存器，然后在事件循环中分发给任意数量的订阅。
+    协程使用样本时不会阻塞事件循环，也不需要访问总线。
+
+    \~
+    @note
+    <pre>
+    async def main(mpu):
+        stream = MPUAsyncStream( mpu, batchSize = 10, useFifo = True )
+        stream.start()
+        async with stream.subscribe() as batches:
+            async for batch in batches:
+                ...
+        await stream.stop()
+    </pre>
+    """
+    _mpu = None
+    _batchSize = 1
+    _useFifo = False
+    _pollRate = None
+    _overflow = STREAM_DROP_OLDEST
+    _loop = None
+    _thread = None
+    _stop = None
+    _subscriptions = None
+
+    # Stream statistics
+    _batches = 0
+    _samples = 0
+    _errors = 0
+
+    def __init__(self, mpu, batchSize = 1, useFifo = False, overflow = STREAM_DROP_OLDEST, pollRate = None):
+        """!
+        \~english
+        @param mpu: a MPU6050 instance
+        @param batchSize: number of samples in a batch
+        @param useFifo: True - drain samples from FIFO, FIFO is enabled on start; False - poll sensor registers
+        @param overflow: STREAM_DROP_OLDEST or STREAM_BLOCK, what to do when a subscription queue is full
+        @param pollRate: rate in Hz of polling sensor registers, it can not exceed sample rate of sensor,
+                         None means DEF_SAMPLE_RATE or the sample rate of sensor if it is lower
+        \~chinese
+        @param mpu: MPU6050 实例
+        @param batchSize: 每批样本数
+        @param useFifo: True - 从 FIFO 读取样本，启动时启用 FIFO；False - 轮询传感器寄存器
+        @param overflow: STREAM_DROP_OLDEST 或 STREAM_BLOCK，订阅队列满时的处理方式
+        @param pollRate: 轮询传感器寄存器的频率 Hz，不能超过传感器采样率，
+                         None 表示 DEF_SAMPLE_RATE，传感器采样率更低时使用传感器采样率
+        """
+        if batchSize < 1:
+            raise ValueError("batchSize must be at least 1")
+        self._mpu = mpu
+        self._batchSize = batchSize
+        self._useFifo = useFifo
+        self._overflow = overflow
+        if not useFifo:
+            sensorRate = mpu.getSampleRate()
+            if pollRate == None:
+                pollRate = min( DEF_SAMPLE_RATE, sensorRate )
+            elif pollRate <= 0 or pollRate > sensorRate:
+                raise ValueError("pollRate must be in (0, {}] Hz, the sample rate of sensor".format( sensorRate ))
+            self._pollRate = float( pollRate )
+        self._subscriptions = []
+
+    def subscribe(self, maxQueue = DEF_STREAM_QUEUE_SIZE, flatten = False):
+        """!
+        \~english
+        Subscribe to sample batches, must be called on the event loop
+        @param maxQueue: max number of batches queued, default: DEF_STREAM_QUEUE_SIZE
+        @param flatten: True - iterate samples instead of batches
+        @return a MPUStreamSubscription
+        \~chinese
+        订阅样本批次，必须在事件循环中调用
+        @param maxQueue: 最多排队的批次数，默认：DEF_STREAM_QUEUE_SIZE
+        @param flatten: True - 逐个样本迭代，而不是逐个批次
+        @return MPUStreamSubscription
+        """
+        subscription = MPUStreamSubscription( self, maxQueue, flatten )
+        self._subscriptions.append( subscription )
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        if subscription not in self._subscriptions: return False
+        self._subscriptions.remove( subscription )
+        return True
+
+    def _deliver(self, batch):
+        # Runs on event loop
+        for subscription in list( self._subscriptions ):
+            subscription._put( batch )
+
+    async def _deliverWait(self, batch):
+        # Runs on event loop, waits for room in every queue, closed subscriptions are skipped
+        for subscription in list( self._subscriptions ):
+            await subscription._putWait( batch )
+
+    def _publish(self, batch):
+        # Runs on I/O thread
+        self._batches += 1
+        self._samples += len( batch )
+        if self._overflow == STREAM_BLOCK:
+            future = asyncio.run_coroutine_threadsafe( self._deliverWait( batch ), self._loop )
+            while not self._stop.is_set():
+                try:
+                    future.result( 0.1 )
+                    return
+                except concurrent.futures.TimeoutError:
+                    pass
+            future.cancel()
+        else:
+            self._loop.call_soon_threadsafe( self._deliver, batch )
+
+    def _runPoll(self):
+        mpu = self._mpu
+        period = 1.0 / self._pollRate
+        batch = []
+        deadline = time.time()
+        while not self._stop.is_set():
+            now = time.time()
+            if deadline > now and self._stop.wait( deadline - now ): break
+            deadline += period
+            if time.time() - deadline > period:
+                # Too late, skip missed sample periods
+                deadline = time.time() + period
+
+            try:
+                batch.append( mpu.getSample() )
+            except IOError:
+                self._errors += 1
+                continue
+            if len( batch ) >= self._batchSize:
+                self._publish( batch )
+                batch = []
+
+    def _runFifo(self):
+        mpu = self._mpu
+        batchPeriod = self._batchSize / mpu.getSampleRate()
+        pending = []
+        while not self._stop.wait( batchPeriod ):
+            try:
+                pending.extend( mpu.readFifo() )
+            except IOError:
+                self._errors += 1
+                continue
+            while len( pending ) >= self._batchSize:
+                self._publish( pending[:self._batchSize] )
+                pending = pending[self._batchSize:]
+
+    def start(self):
+        """!
+        \~english Start the I/O thread, must be called on the event loop
+        \~chinese 启动 I/O 线程，必须在事件循环中调用
+        """
+        if self._thread != None: return
+        self._loop = asyncio.get_event_loop()
+        self._stop = threading.Event()
+        self._batches = self._samples = self._errors = 0
+        if self._useFifo:
+            self._mpu.enableFifo()
+            target = self._runFifo
+        else:
+            target = self._runPoll
+        self._thread = threading.Thread( target = target, name = "MPUAsyncStream" )
+        self._thread.daemon = True
+        self._thread.start()
+
+    async def stop(self):
+        """!
+        \~english Stop the I/O thread, iterations of all subscriptions end after queued batches
+        \~chinese 停止 I/O 线程，所有订阅的迭代在队列中的批次读完后结束
+        """
+        if self._thread == None: return
+        self._stop.set()
+        await self._loop.run_in_executor( None, self._thread.join )
+        self._thread = None
+        if self._useFifo:
+            self._mpu.disableFifo()
+        for subscription in list( self._subscriptions ):
+            subscription.close()
+
+    def isRunning(self):
+        return self._thread != None
+
+    def getPollRate(self):
+        """!
+        \~english @return rate in Hz of polling sensor registers, None with FIFO
+        \~chinese @return 轮询传感器寄存器的频率 Hz，使用 FIFO 时为 None
+        """
+        return self._pollRate
+
+    def getStats(self):
+        """!
+        \~english
+        Get stream statistics
+        @return a dictionary:
+            * batches, samples: published by I/O thread
+            * errors: I2C read errors
+            * subscriptions: number of subscriptions
+            * dropped: batches dropped by all subscriptions
+        \~chinese
+        读取数据流统计数据
+        @return 字典:
+            * batches, samples: I/O 线程发布的批次数和样本数
+            * errors: I2C 读取错误数
+            * subscriptions: 订阅数
+            * dropped: 所有订阅丢弃的批次数
+        """
+        return {
+            "batches": self._batches,
+            "samples": self._samples,
+            "errors": self._errors,
+            "subscriptions": len( self._subscriptions ),
+            "dropped": sum( s.dropped for s in self._subscriptions ),
+        }
@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# MPU6050 Calibration
+# Bias estimation, hardware offset registers and persisted calibration profiles
+# 零偏估计、硬件偏移寄存器和持久化的校准配置
+#
+# @version v1.0.0
+#
+
+import json
+import math
+import os
+import time
+
+##
+# Default file of calibration profiles
+DEF_CALIBRATION_FILE = os.path.join( os.path.expanduser("~"), ".jmrpispark", "mpu6050_calibration.json" )
+##
+# Default number of samples averaged in still period
+DEF_CALIBRATION_SAMPLES = 500
+##
+# Max standard deviation of gyroscope ( deg/s ) in still period
+DEF_STILL_GYRO_STD = 0.5
+##
+# Max standard deviation of accelerometer ( g ) in still period
+DEF_STILL_ACCEL_STD = 0.02
+
+##
+# Default number of samples in a block of GyroTempModel, a still block adds a point to the model
+DEF_TEMP_BLOCK_SAMPLES = 200
+##
+# Min temperature span ( degrees Celcius ) of points to fit the slopes of GyroTempModel
+DEF_TEMP_MIN_SPAN = 3.0
+
+# Scales of offset registers
+ACCEL_OFFSET_LSB_PER_G = 2048.0         # ±16g
+GYRO_OFFSET_LSB_PER_DPS = 32.8          # ±1000dps
+
+def _clampWord(value):
+    return max( -32768, min( 32767, int( round( value ) ) ) )
+
+class MPUCalibration:
+    """!
+    \~english
+    Calibration of MPU6050. Biases are estimated from a still period and written into the
+    offset registers ( XA_OFFS, XG_OFFS_USR ), so corrected data comes off the chip.
+    The offsets are saved as profiles keyed by "busId:address" in a JSON file,
+    later boots apply them instantly with MPUCalibration#applyProfile.
+
+    \~chinese
+    MPU6050 校准。由静止期间估计零偏并写入偏移寄存器（XA_OFFS, XG_OFFS_USR），使芯片直接输出校正后的数据。
+    偏移值以 "busId:address" 为键保存到 JSON 文件中，之后启动时使用 MPUCalibration#applyProfile 立即应用。
+
+    \~
+    @note
+    <pre>
+    mpu = MPU6050( DEF_MPU6050_ADDRESS )
+    mpu.open()
+    cal = MPUCalibration( mpu )
+    if not cal.applyProfile():
+        # Keep the board still and flat
+        cal.calibrate()
+    </pre>
+    """
+    _mpu = None
+    _profileFile = None
+
+    def __init__(self, mpu, profileFile = DEF_CALIBRATION_FILE):
+        """!
+        \~english
+        @param mpu: a MPU6050 instance
+        @param profileFile: JSON file of calibration profiles, default: DEF_CALIBRATION_FILE
+        \~chinese
+        @param mpu: MPU6050 实例
+        @param profileFile: 校准配置 JSON 文件，默认：DEF_CALIBRATION_FILE
+        """
+        self._mpu = mpu
+        self._profileFile = profileFile
+
+    def getProfileKey(self):
+        """!
+        \~english @return key of profile of the device: "busId:address", eg. "1:0x68"
+        \~chinese @return 设备配置的键："busId:address"，例如 "1:0x68"
+        """
+        return "{}:0x{:02X}".format( self._mpu.getBusId(), self._mpu.getAddress() )
+
+    def measureBias(self, samples = DEF_CALIBRATION_SAMPLES, gravity = ( 0, 0, 1 )):
+        """!
+        \~english
+        Estimate biases from a still period
+        @param samples: number of samples to average
+        @param gravity: expected accelerometer reading in g when still, default: ( 0, 0, 1 ), board is flat
+        @return a tuple ( accelBias, gyroBias ), accelBias in g, gyroBias in deg/s
+        @note RuntimeError is raised if the board moved during the still period
+        \~chinese
+        由静止期间估计零偏
+        @param samples: 平均的样本数
+        @param gravity: 静止时期望的加速度计读数，单位 g，默认：( 0, 0, 1 )，板子水平放置
+        @return 元组 ( accelBias, gyroBias )，accelBias 单位 g，gyroBias 单位 deg/s
+        @note 静止期间板子移动将引发 RuntimeError
+        """
+        mpu = self._mpu
+        interval = 1.0 / mpu.getSampleRate()
+        sums = [0.0] * 6
+        squares = [0.0] * 6
+        for k in range(samples):
+            ax, ay, az, temp, gx, gy, gz = mpu.readSensorData()
+            values = ( ax, ay, az, gx, gy, gz )
+            for i in range(6):
+                sums[i] += values[i]
+                squares[i] += values[i] * values[i]
+            time.sleep( interval )
+
+        means = [ v / samples for v in sums ]
+        stds = [ math.sqrt( max( 0.0, squares[i] / samples - means[i] * means[i] ) ) for i in range(6) ]
+
+        g = mpu.getGravityFactor()
+        if max( stds[3:] ) > DEF_STILL_GYRO_STD or max( stds[:3] ) / g > DEF_STILL_ACCEL_STD:
+            raise RuntimeError("MPU6050 is not still during calibration")
+
+        accelBias = tuple( means[i] / g - gravity[i] for i in range(3) )
+        gyroBias = tuple( means[3:] )
+        return accelBias, gyroBias
+
+    def calibrate(self, samples = DEF_CALIBRATION_SAMPLES, gravity = ( 0, 0, 1 ), save = True):
+        """!
+        \~english
+        Estimate biases from a still period, write them into offset registers and save profile
+        @param samples: number of samples to average
+        @param gravity: expected accelerometer reading in g when still, default: ( 0, 0, 1 ), board is flat
+        @param save: True - save profile into profile file
+        @return the profile, a dictionary
+        \~chinese
+        由静止期间估计零偏，写入偏移寄存器并保存配置
+        @param samples: 平均的样本数
+        @param gravity: 静止时期望的加速度计读数，单位 g，默认：( 0, 0, 1 )，板子水平放置
+        @param save: True - 将配置保存到配置文件
+        @return 配置字典
+        """
+        mpu = self._mpu
+        # The temperature model is learned with old offsets and no longer valid,
+        # it is cleared first so the whole bias is measured
+        model = mpu.getGyroTempModel()
+        mpu.setGyroTempModel( None )
+        try:
+            accelBias, gyroBias = self.measureBias( samples, gravity )
+        except:
+            # Offsets are not changed, so the old model is still valid
+            if model != None: mpu.setGyroTempModel( *model )
+            raise
+
+        # Offset registers add to the output, so remove the measured bias from current offsets
+        accelOffsets = [ _clampWord( c - b * ACCEL_OFFSET_LSB_PER_G ) for c, b in zip( mpu.getAccelOffsets(), accelBias ) ]
+        gyroOffsets = [ _clampWord( c - b * GYRO_OFFSET_LSB_PER_DPS ) for c, b in zip( mpu.getGyroOffsets(), gyroBias ) ]
+        mpu.setAccelOffsets( *accelOffsets )
+        mpu.setGyroOffsets( *gyroOffsets )
+
+        profile = {
+            "accel_offsets": list( mpu.getAccelOffsets() ),
+            "gyro_offsets": list( mpu.getGyroOffsets() ),
+            "accel_bias": list( accelBias ),
+            "gyro_bias": list( gyroBias ),
+            "time": time.time(),
+        }
+        if save:
+            self.saveProfile( profile )
+        return profile
+
+    def _loadProfiles(self):
+        try:
+            with open( self._profileFile, "r" ) as f:
+                return json.load( f )
+        except ( IOError, OSError, ValueError ):
+            return {}
+
+    def loadProfile(self):
+        """!
+        \~english @return the saved profile of the device, or None
+        \~chinese @return 设备已保存的配置，或 None
+        """
+        return self._loadProfiles().get( self.getProfileKey() )
+
+    def saveProfile(self, profile):
+        """!
+        \~english Save profile of the device into profile file, profiles of other devices are kept
+        \~chinese 将设备配置保存到配置文件，保留其它设备的配置
+        """
+        profiles = self._loadProfiles()
+        profiles[ self.getProfileKey() ] = profile
+
+        folder = os.path.dirname( self._profileFile )
+        if folder and not os.path.isdir( folder ):
+            os.makedirs( folder )
+        # Write a temporary file then rename, the file is never left half written
+        tmpFile = self._profileFile + ".tmp"
+        with open( tmpFile, "w" ) as f:
+            json.dump( profiles, f, indent = 2, sort_keys = True )
+        os.rename( tmpFile, self._profileFile )
+
+    def applyProfile(self, profile = None):
+        """!
+        \~english
+        Write offsets of profile into offset registers
+        @param profile: a profile, None means the saved profile of the device
+        @return True - applied, False - no profile
+        \~chinese
+        将配置中的偏移值写入偏移寄存器
+        @param profile: 配置，None 表示设备已保存的配置
+        @return True - 已应用, False - 没有配置
+        """
+        if profile == None:
+            profile = self.loadProfile()
+        if profile == None: return False
+        if "accel_offsets" in profile:
+            self._mpu.setAccelOffsets( *profile["accel_offsets"] )
+            self._mpu.setGyroOffsets( *profile["gyro_offsets"] )
+        if "gyro_temp_model" in profile:
+            model = GyroTempModel( self._mpu )
+            model.setState( profile["gyro_temp_model"] )
+            model.apply()
+        return True
+
+    def loadGyroTempModel(self):
+        """!
+        \~english @return a GyroTempModel restored from saved profile, or a new one, so learning continues
+        \~chinese @return 由已保存配置恢复的 GyroTempModel，或新建的模型，以便继续学习
+        """
+        model = GyroTempModel( self._mpu )
+        profile = self.loadProfile()
+        if profile != None and "gyro_temp_model" in profile:
+            model.setState( profile["gyro_temp_model"] )
+        return model
+
+    def saveGyroTempModel(self, model):
+        """!
+        \~english Save the state of a GyroTempModel into the profile of the device
+        \~chinese 将 GyroTempModel 的状态保存到设备配置中
+        """
+        profile = self.loadProfile() or {}
+        profile["gyro_temp_model"] = model.getState()
+        self.saveProfile( profile )
+
+class GyroTempModel:
+    """!
+    \~english
+    Learn gyroscope bias as a linear function of die temperature during still periods:
+    bias = offsets + slopes * ( temp - refTemp )
+
+    Samples are grouped in blocks, a block whose gyroscope std is below DEF_STILL_GYRO_STD is a still
+    period and adds a point ( mean temperature, mean gyroscope ) to running regression sums,
+    so the cost per sample is O(1) and the memory is fixed.
+    The gyroscope data is learned without the correction currently applied by MPU6050.
+
+    \~chinese
+    在静止期间学习陀螺仪零偏关于芯片温度的线性函数：
+    bias = offsets + slopes * ( temp - refTemp )
+
+    样本按块分组，陀螺仪标准差低于 DEF_STILL_GYRO_STD 的块为静止期间，
+    向累计回归和中添加一个点（平均温度，平均陀螺仪），因此每个样本的开销为 O(1) 且内存固定。
+    学习时会去除 MPU6050 当前应用的补偿。
+
+    \~
+    @note
+    <pre>
+    cal = MPUCalibration( mpu )
+    model = cal.loadGyroTempModel()
+    ...
+    model.updateBatch( samples )
+    if model.apply():
+        cal.saveGyroTempModel( model )
+    </pre>
+    """
+    _mpu = None
+    _blockSize = DEF_TEMP_BLOCK_SAMPLES
+    _refTemp = None
+
+    # Regression sums of points, temperature relative to refTemp
+    _n = 0
+    _st = 0.0
+    _stt = 0.0
+    _sb = None
+    _stb = None
+    _minTemp = None
+    _maxTemp = None
+
+    # Sums of current block
+    _blockN = 0
+    _blockT = 0.0
+    _blockG = None
+    _blockGG = None
+
+    def __init__(self, mpu, refTemp = None, blockSize = DEF_TEMP_BLOCK_SAMPLES):
+        """!
+        \~english
+        @param mpu: a MPU6050 instance
+        @param refTemp: reference temperature, None means the temperature of first point
+        @param blockSize: number of samples in a block
+        \~chinese
+        @param mpu: MPU6050 实例
+        @param refTemp: 参考温度，None 表示第一个点的温度
+        @param blockSize: 每块的样本数
+        """
+        self._mpu = mpu
+        self._refTemp = refTemp
+        self._blockSize = blockSize
+        self.reset()
+
+    def reset(self):
+        self._n = 0
+        self._st = self._stt = 0.0
+        self._sb = [0.0, 0.0, 0.0]
+        self._stb = [0.0, 0.0, 0.0]
+        self._minTemp = self._maxTemp = None
+        self._resetBlock()
+
+    def _resetBlock(self):
+        self._blockN = 0
+        self._blockT = 0.0
+        self._blockG = [0.0, 0.0, 0.0]
+        self._blockGG = [0.0, 0.0, 0.0]
+
+    def addPoint(self, temp, bias):
+        """!
+        \~english
+        Add a point of the model
+        @param temp: temperature in degrees Celcius
+        @param bias: ( x, y, z ) gyroscope bias in deg/s without compensation
+        \~chinese
+        向模型添加一个点
+        @param temp: 温度，单位摄氏度
+        @param bias: 未补偿的陀螺仪零偏 ( x, y, z )，单位 deg/s
+        """
+        if self._refTemp == None:
+            self._refTemp = temp
+        t = temp - self._refTemp
+        self._n += 1
+        self._st += t
+        self._stt += t * t
+        for i in range(3):
+            self._sb[i] += bias[i]
+            self._stb[i] += t * bias[i]
+        self._minTemp = temp if self._minTemp == None else min( self._minTemp, temp )
+        self._maxTemp = temp if self._maxTemp == None else max( self._maxTemp, temp )
+
+    def update(self, sample):
+        """!
+        \~english @param sample: a MPUSample with temperature and gyroscope
+        \~chinese @param sample: 包含温度和陀螺仪数据的 MPUSample
+        """
+        temp, gx, gy, gz = sample[4], sample[5], sample[6], sample[7]
+        if temp == None or gx == None: return
+        self._blockN += 1
+        self._blockT += temp
+        g = self._blockG
+        gg = self._blockGG
+        g[0] += gx
+        g[1] += gy
+        g[2] += gz
+        gg[0] += gx * gx
+        gg[1] += gy * gy
+        gg[2] += gz * gz
+        if self._blockN < self._blockSize: return
+
+        n = float( self._blockN )
+        means = [ v / n for v in g ]
+        still = all( gg[i] / n - means[i] * means[i] < DEF_STILL_GYRO_STD * DEF_STILL_GYRO_STD for i in range(3) )
+        if still:
+            temp = self._blockT / n
+            # The correction is linear in temperature, so add it back at the mean temperature
+            correction = self._mpu.getGyroTempCorrection( temp )
+            self.addPoint( temp, [ means[i] + correction[i] for i in range(3) ] )
+        self._resetBlock()
+
+    def updateBatch(self, samples):
+        update = self.update
+        for sample in samples:
+            update( sample )
+
+    def getPointCount(self):
+        return self._n
+
+    def getTempRange(self):
+        """!
+        \~english @return ( min, max ) temperature of points, or None
+        \~chinese @return 点的温度范围 ( min, max )，或 None
+        """
+        if self._n == 0: return None
+        return ( self._minTemp, self._maxTemp )
+
+    def fit(self):
+        """!
+        \~english
+        Fit the model by least squares, slopes are 0 when temperature span is less than DEF_TEMP_MIN_SPAN
+        @return ( refTemp, offsets, slopes ), or None when no point
+        \~chinese
+        最小二乘拟合模型，温度范围小于 DEF_TEMP_MIN_SPAN 时斜率为 0
+        @return ( refTemp, offsets, slopes )，没有点时为 None
+        """
+        n = self._n
+        if n == 0: return None
+        denominator = n * self._stt - self._st * self._st
+        if self._maxTemp - self._minTemp < DEF_TEMP_MIN_SPAN or denominator <= 0:
+            slopes = ( 0.0, 0.0, 0.0 )
+        else:
+            slopes = tuple( ( n * self._stb[i] - self._st * self._sb[i] ) / denominator for i in range(3) )
+        offsets = tuple( ( self._sb[i] - slopes[i] * self._st ) / n for i in range(3) )
+        return ( self._refTemp, offsets, slopes )
+
+    def apply(self):
+        """!
+        \~english
+        Fit the model and set it to MPU6050 ( MPU6050#setGyroTempModel )
+        @return True - applied, False - no point yet
+        \~chinese
+        拟合模型并设置到 MPU6050（MPU6050#setGyroTempModel）
+        @return True - 已应用, False - 还没有点
+        """
+        model = self.fit()
+        if model == None: return False
+        self._mpu.setGyroTempModel( *model )
+        return True
+
+    def getState(self):
+        """!
+        \~english @return state of the model as a dictionary, for saving in a profile
+        \~chinese @return 字典形式的模型状态，用于保存到配置
+        """
+        return {
+            "ref_temp": self._refTemp,
+            "n": self._n,
+            "st": self._st,
+            "stt": self._stt,
+            "sb": list( self._sb ),
+            "stb": list( self._stb ),
+            "temp_range": [ self._minTemp, self._maxTemp ],
+        }
+
+    def setState(self, state):
+        """!
+        \~english Restore state of the model got by GyroTempModel#getState
+        \~chinese 恢复由 GyroTempModel#getState 得到的模型状态
+        """
+        self._refTemp = state["ref_temp"]
+        self._n = state["n"]
+        self._st = state["st"]
+        self._stt = state["stt"]
+        self._sb = list( state["sb"] )
+        self._stb = list( state["stb"] )
+        self._minTemp, self._maxTemp = state["temp_range"]
+        self._resetBlock()
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# MPU6050 Data Ready Acquisition
+# Read samples when the MPU6050 INT pin signals data ready
+# 在 MPU6050 INT 引脚发出数据就绪信号时读取样本
+#
+# @version v1.0.0
+#
+
+import threading
+import time
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # Allow import off the Raspberry Pi, GPIO is only needed by start()
+    GPIO = None
+
+from .MPUSampler import MPURingBuffer, DEF_RING_CAPACITY
+
+##
+# Default timeout waiting for a data ready interrupt before a poll is done, in sample periods of sensor
+DEF_DATA_RDY_TIMEOUT_PERIODS = 5
+
+class MPUDataReady:
+    """!
+    \~english
+    Interrupt driven acquisition of MPU6050. The MPU6050 INT pin is wired to a GPIO,
+    samples are read only when the sensor signals data ready, and written into a MPURingBuffer.
+
+    The INT pin is configured as active high, push-pull, latched until any register is read
+    ( LATCH_INT_EN | INT_RD_CLEAR ), so the burst read of sensor data clears the interrupt.
+    If no interrupt arrives within timeout ( eg. an edge was lost while the latch was held ),
+    the data ready status is polled over I2C instead.
+
+    \~chinese
+    MPU6050 中断驱动采集。MPU6050 INT 引脚连接到 GPIO，仅在传感器发出数据就绪信号时读取样本，并写入 MPURingBuffer。
+
+    INT 引脚配置为高电平有效、推挽输出、锁存直到读取任意寄存器（LATCH_INT_EN | INT_RD_CLEAR），
+    因此突发读取传感器数据即可清除中断。
+    如果超时时间内没有中断到达（例如锁存期间丢失了边沿），则通过 I2C 轮询数据就绪状态。
+
+    \~
+    @note
+    <pre>
+    mpu = MPU6050( DEF_MPU6050_ADDRESS )
+    mpu.open()
+    drdy = MPUDataReady( mpu, intPin = 4 )
+    drdy.start()
+    ...
+    samples = drdy.Buffer.read()
+    ...
+    drdy.stop()
+    </pre>
+    """
+    ##
+    # \~english MPURingBuffer instance
+    # \~chinese MPURingBuffer 实例
+    Buffer = None
+
+    _mpu = None
+    _intPin = None
+    _timeout = None
+    _wait = None
+    _thread = None
+    _stop = None
+    _ready = None
+    _irq_time = None
+
+    # Acquisition statistics
+    _interrupts = 0
+    _samples = 0
+    _timeouts = 0
+    _polled = 0
+    _errors = 0
+
+    def __init__(self, mpu, intPin, timeout = None, capacity = DEF_RING_CAPACITY, buffer = None):
+        """!
+        \~english
+        @param mpu: a MPU6050 instance
+        @param intPin: BCM number of GPIO wired to MPU6050 INT pin
+        @param timeout: seconds waiting for an interrupt before polling,
+                        None means DEF_DATA_RDY_TIMEOUT_PERIODS sample periods of sensor ( MPU6050#getSampleRate )
+        @param capacity: capacity of ring buffer, default: DEF_RING_CAPACITY
+        @param buffer: a MPURingBuffer instance to write into, None means create a new one
+        \~chinese
+        @param mpu: MPU6050 实例
+        @param intPin: 连接 MPU6050 INT 引脚的 GPIO BCM 编号
+        @param timeout: 轮询前等待中断的秒数，None 表示传感器的 DEF_DATA_RDY_TIMEOUT_PERIODS 个采样周期（MPU6050#getSampleRate）
+        @param capacity: 环形缓冲区容量，默认：DEF_RING_CAPACITY
+        @param buffer: 写入的 MPURingBuffer 实例，None 表示创建新的缓冲区
+        """
+        self._mpu = mpu
+        self._intPin = intPin
+        self._timeout = timeout
+        self.Buffer = buffer if buffer != None else MPURingBuffer( capacity )
+        self._ready = threading.Event()
+        self._resetStats()
+
+    def _resetStats(self):
+        self._interrupts = 0
+        self._samples = 0
+        self._timeouts = 0
+        self._polled = 0
+        self._errors = 0
+
+    def _onInterrupt(self, channel):
+        # Runs on the RPi.GPIO event thread, keep it short
+        self._irq_time = time.time()
+        self._interrupts += 1
+        self._ready.set()
+
+    def _readSample(self, timestamp):
+        try:
+            ax, ay, az, temp, gx, gy, gz = self._mpu.readSensorData()
+        except IOError:
+            self._errors += 1
+            return
+        self.Buffer.write( timestamp, ax, ay, az, temp, gx, gy, gz )
+        self._samples += 1
+
+    def _run(self):
+        mpu = self._mpu
+        while not self._stop.is_set():
+            if self._ready.wait( self._wait ):
+                self._ready.clear()
+                if self._stop.is_set(): break
+                # Reading sensor data also clears the latched INT pin
+                self._readSample( self._irq_time )
+                continue
+
+            # No interrupt within timeout, fall back to poll data ready status.
+            # Reading INT_STATUS clears the latched INT pin, so edges restart.
+            self._timeouts += 1
+            try:
+                status = mpu.getIntDataRdy()
+            except IOError:
+                self._errors += 1
+                continue
+            if status & mpu.VAL_INT_STATUS_DATA_RDY:
+                self._polled += 1
+                self._readSample( time.time() )
+
+    def start(self):
+        """!
+        \~english Configure data ready interrupt, GPIO edge detection and start acquisition thread
+        \~chinese 配置数据就绪中断和 GPIO 边沿检测，启动采集线程
+        """
+        if self._thread != None: return
+        if GPIO == None:
+            raise RuntimeError("RPi.GPIO is required by MPUDataReady")
+
+        self._resetStats()
+        self._ready.clear()
+        self._stop = threading.Event()
+
+        mpu = self._mpu
+        self._wait = self._timeout
+        if self._wait == None:
+            self._wait = DEF_DATA_RDY_TIMEOUT_PERIODS / mpu.getSampleRate()
+        mpu.setDataRdyInt( mpu.VAL_INT_PIN_CFG_LATCH_INT_EN | mpu.VAL_INT_PIN_CFG_INT_RD_CLEAR )
+
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup( self._intPin, GPIO.IN, pull_up_down = GPIO.PUD_DOWN )
+        GPIO.add_event_detect( self._intPin, GPIO.RISING, callback = self._onInterrupt )
+
+        # Clear a pending latched interrupt, else no rising edge will arrive
+        mpu.getIntDataRdy()
+
+        self._thread = threading.Thread( target = self._run, name = "MPUDataReady" )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """!
+        \~english Stop acquisition thread, remove GPIO edge detection and disable interrupt
+        \~chinese 停止采集线程，移除 GPIO 边沿检测并关闭中断
+        """
+        if self._thread == None: return
+        self._stop.set()
+        self._ready.set()
+        self._thread.join()
+        self._thread = None
+        GPIO.remove_event_detect( self._intPin )
+        self._mpu.disableInt()
+
+    def isRunning(self):
+        return self._thread != None
+
+    def getStats(self):
+        """!
+        \~english
+        Get acquisition statistics
+        @return a dictionary:
+            * interrupts: data ready interrupts received
+            * samples: samples written into ring buffer
+            * timeouts: waits which timed out without interrupt
+            * polled: samples read by fallback poll
+            * errors: I2C read errors
+            * overruns, underruns: counters of ring buffer
+        \~chinese
+        读取采集统计数据
+        @return 字典:
+            * interrupts: 收到的数据就绪中断数
+            * samples: 写入环形缓冲区的样本数
+            * timeouts: 未收到中断而超时的等待次数
+            * polled: 由轮询读取的样本数
+            * errors: I2C 读取错误数
+            * overruns, underruns: 环形缓冲区计数器
+        """
+        return {
+            "interrupts": self._interrupts,
+            "samples": self._samples,
+            "timeouts": self._timeouts,
+            "polled": self._polled,
+            "errors": self._errors,
+            "overruns": self.Buffer.overruns,
+            "underruns": self.Buffer.underruns,
+        }
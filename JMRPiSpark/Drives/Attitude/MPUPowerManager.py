@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# MPU6050 Power Manager
+# Wake-on-motion: accelerometer only cycle mode when idle, full rate streaming on motion
+# 运动唤醒：空闲时进入仅加速度计的循环模式，检测到运动时全速采样
+#
+# @version v1.0.0
+#
+
+import math
+import threading
+import time
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # GPIO is only needed when the INT pin is used
+    GPIO = None
+
+from .MPUSampler import MPUSampler, MPU_SAMPLE_SIZE, DEF_RING_CAPACITY, DEF_SAMPLE_RATE
+
+POWER_STATE_OFF     = "off"
+POWER_STATE_IDLE    = "idle"
+POWER_STATE_ACTIVE  = "active"
+
+##
+# Default seconds without motion before going back to idle
+DEF_QUIET_TIMEOUT = 5.0
+##
+# Default thresholds of motion in active state: gyro in deg/s, accel in g away from 1g
+DEF_QUIET_GYRO = 5.0
+DEF_QUIET_ACCEL = 0.1
+##
+# Default seconds between checks of motion in active state
+DEF_ACTIVE_CHECK_INTERVAL = 0.1
+##
+# Max number of samples checked for motion on each check in active state, new samples are decimated to it
+DEF_ACTIVE_CHECK_SAMPLES = 8
+##
+# Default seconds between polls of motion interrupt status in idle state, when INT pin is not used
+DEF_IDLE_POLL_INTERVAL = 0.5
+
+class MPUPowerManager:
+    """!
+    \~english
+    Wake-on-motion power state machine of MPU6050.
+
+    * idle: accelerometer only cycle mode ( MPU6050#openOnlyAccel ) with motion interrupt
+      ( MPU6050#setMotionInt ), no sampling. With the INT pin wired to a GPIO the thread sleeps until
+      an edge arrives, else it polls interrupt status at a low rate.
+    * active: accelerometer and gyroscope at full rate, sampled by a MPUSampler into MPUPowerManager#Buffer.
+      After quietTimeout seconds without motion it goes back to idle.
+
+    CPU wakeups and bus traffic are counted per state, see MPUPowerManager#getStats.
+
+    \~chinese
+    MPU6050 运动唤醒电源状态机。
+
+    * idle：仅加速度计的循环模式（MPU6050#openOnlyAccel）并启用运动中断（MPU6050#setMotionInt），不采样。
+      INT 引脚连接 GPIO 时线程休眠直到边沿到达，否则以低频率轮询中断状态。
+    * active：加速度计和陀螺仪全速工作，由 MPUSampler 采样到 MPUPowerManager#Buffer。
+      quietTimeout 秒内没有运动则回到 idle。
+
+    按状态统计 CPU 唤醒次数和总线通信量，参见 MPUPowerManager#getStats。
+
+    \~
+    @note
+    <pre>
+    power = MPUPowerManager( mpu, intPin = 4 )
+    power.addStateCallback( lambda state: print( state ) )
+    power.start()
+    ...
+    samples = power.Buffer.read()
+    </pre>
+    """
+    ##
+    # \~english MPURingBuffer of samples in active state
+    # \~chinese active 状态样本的 MPURingBuffer
+    Buffer = None
+
+    _mpu = None
+    _intPin = None
+    _cycleFreq = None
+    _rate = None
+    _quietTimeout = DEF_QUIET_TIMEOUT
+    _quietGyro = DEF_QUIET_GYRO
+    _quietAccel = DEF_QUIET_ACCEL
+
+    _state = POWER_STATE_OFF
+    _sampler = None
+    _thread = None
+    _stop = None
+    _motion = None
+    _callbacks = None
+    _lastMotion = None
+    _checked = 0
+
+    # Statistics of state: { state: { "entries", "time", "wakeups", "transactions", "bytes" } }
+    _stats = None
+    _stateSince = None
+    _busMark = None
+
+    def __init__(self, mpu, intPin = None, cycleFreq = None, rate = None, capacity = DEF_RING_CAPACITY,
+                 quietTimeout = DEF_QUIET_TIMEOUT, quietGyro = DEF_QUIET_GYRO, quietAccel = DEF_QUIET_ACCEL):
+        """!
+        \~english
+        @param mpu: a MPU6050 instance
+        @param intPin: None, or BCM number of GPIO wired to MPU6050 INT pin
+        @param cycleFreq: wake-up frequency in idle, default: MPU6050.VAL_PWR_MGMT_2_LP_WAKE_CTRL_5HZ
+        @param rate: sampling rate in active state, None means DEF_SAMPLE_RATE or the sample rate of sensor if it is lower
+        @param capacity: capacity of ring buffer
+        @param quietTimeout: seconds without motion before going back to idle
+        @param quietGyro: gyroscope above this ( deg/s ) is motion
+        @param quietAccel: accelerometer magnitude away from 1g more than this ( g ) is motion
+        \~chinese
+        @param mpu: MPU6050 实例
+        @param intPin: None，或连接 MPU6050 INT 引脚的 GPIO BCM 编号
+        @param cycleFreq: idle 状态的唤醒频率，默认：MPU6050.VAL_PWR_MGMT_2_LP_WAKE_CTRL_5HZ
+        @param rate: active 状态的采样频率，None 表示 DEF_SAMPLE_RATE，传感器采样率更低时使用传感器采样率
+        @param capacity: 环形缓冲区容量
+        @param quietTimeout: 回到 idle 之前无运动的秒数
+        @param quietGyro: 陀螺仪超过此值（deg/s）视为运动
+        @param quietAccel: 加速度模长偏离 1g 超过此值（g）视为运动
+        """
+        self._mpu = mpu
+        self._intPin = intPin
+        self._cycleFreq = cycleFreq if cycleFreq != None else mpu.VAL_PWR_MGMT_2_LP_WAKE_CTRL_5HZ
+        if rate == None:
+            rate = min( DEF_SAMPLE_RATE, mpu.getSampleRate() )
+        self._rate = rate
+        self._quietTimeout = quietTimeout
+        self._quietGyro = quietGyro
+        self._quietAccel = quietAccel
+        self._motion = threading.Event()
+        self._callbacks = []
+        self._sampler = MPUSampler( mpu, self._rate, capacity )
+        self.Buffer = self._sampler.Buffer
+        self._resetStats()
+
+    def _resetStats(self):
+        self._stats = {}
+        for state in ( POWER_STATE_IDLE, POWER_STATE_ACTIVE ):
+            self._stats[state] = { "entries": 0, "time": 0.0, "wakeups": 0, "transactions": 0, "bytes": 0 }
+
+    def addStateCallback(self, callback):
+        """!
+        \~english @param callback: a function called with the new state on each state change
+        \~chinese @param callback: 每次状态改变时以新状态为参数调用的函数
+        """
+        self._callbacks.append( callback )
+
+    def getState(self):
+        return self._state
+
+    def _account(self):
+        # Add time and bus traffic since last mark to current state
+        now = time.time()
+        bus = self._mpu.getBusStats()
+        stats = self._stats.get( self._state )
+        if stats != None and self._busMark != None:
+            stats["time"] += now - self._stateSince
+            stats["transactions"] += bus["transactions"] - self._busMark["transactions"]
+            stats["bytes"] += bus["bytes_read"] + bus["bytes_written"] - self._busMark["bytes_read"] - self._busMark["bytes_written"]
+        self._stateSince = now
+        self._busMark = bus
+
+    def _setState(self, state):
+        self._account()
+        self._state = state
+        if state in self._stats:
+            self._stats[state]["entries"] += 1
+        for callback in self._callbacks:
+            callback( state )
+
+    def _enterIdle(self):
+        if self._sampler.isRunning():
+            self._sampler.stop()
+            self._stats[POWER_STATE_ACTIVE]["wakeups"] += self._sampler.getStats()["samples"]
+        mpu = self._mpu
+        mpu.setMotionInt()
+        mpu.openOnlyAccel( self._cycleFreq )
+        self._motion.clear()
+        # Clear a pending interrupt status
+        mpu.getIntDataRdy()
+        self._setState( POWER_STATE_IDLE )
+
+    def _enterActive(self):
+        mpu = self._mpu
+        mpu.disableInt()
+        mpu.open()
+        self._lastMotion = time.time()
+        self._checked = 0
+        self.Buffer.clear()
+        self._setState( POWER_STATE_ACTIVE )
+        self._sampler.start()
+
+    def _onInterrupt(self, channel):
+        self._motion.set()
+
+    def _waitMotion(self):
+        # Idle state, returns True on motion
+        stats = self._stats[POWER_STATE_IDLE]
+        if self._intPin != None:
+            self._motion.wait()
+            stats["wakeups"] += 1
+            self._motion.clear()
+            if self._stop.is_set(): return False
+            self._mpu.getIntDataRdy()
+            return True
+
+        if self._stop.wait( DEF_IDLE_POLL_INTERVAL ): return False
+        stats["wakeups"] += 1
+        return ( self._mpu.getIntDataRdy() & self._mpu.VAL_INT_STATUS_MOT ) != 0
+
+    def _isMoving(self):
+        # Check new samples in ring buffer without consuming them, decimated to DEF_ACTIVE_CHECK_SAMPLES.
+        # Motion which keeps the device active lasts much longer than the decimation step
+        buf = self.Buffer
+        total = self._sampler.getStats()["samples"]
+        n = min( total - self._checked, buf.getCapacity() )
+        self._checked = total
+        if n <= 0: return False
+
+        data = buf.window( n )
+        stride = MPU_SAMPLE_SIZE * max( 1, n // DEF_ACTIVE_CHECK_SAMPLES )
+        g = self._mpu.getGravityFactor()
+        gyroLimit = self._quietGyro * self._quietGyro
+        for ax, ay, az, gx, gy, gz in zip( data[1::stride], data[2::stride], data[3::stride],
+                                           data[5::stride], data[6::stride], data[7::stride] ):
+            if gx * gx + gy * gy + gz * gz > gyroLimit:
+                return True
+            if abs( math.sqrt( ax * ax + ay * ay + az * az ) / g - 1.0 ) > self._quietAccel:
+                return True
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._state == POWER_STATE_IDLE:
+                if self._waitMotion():
+                    self._enterActive()
+                continue
+
+            if self._stop.wait( DEF_ACTIVE_CHECK_INTERVAL ): break
+            self._stats[POWER_STATE_ACTIVE]["wakeups"] += 1
+            now = time.time()
+            if self._isMoving():
+                self._lastMotion = now
+            elif now - self._lastMotion > self._quietTimeout:
+                self._enterIdle()
+
+    def start(self, active = False):
+        """!
+        \~english
+        Start the power state machine
+        @param active: True - start in active state, False - start in idle state
+        \~chinese
+        启动电源状态机
+        @param active: True - 以 active 状态启动，False - 以 idle 状态启动
+        """
+        if self._thread != None: return
+        self._stop = threading.Event()
+        self._resetStats()
+        self._busMark = None
+        if self._intPin != None:
+            if GPIO == None:
+                raise RuntimeError("RPi.GPIO is required by MPUPowerManager with intPin")
+            GPIO.setwarnings(False)
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setup( self._intPin, GPIO.IN, pull_up_down = GPIO.PUD_DOWN )
+            GPIO.add_event_detect( self._intPin, GPIO.RISING, callback = self._onInterrupt )
+
+        if active:
+            self._enterActive()
+        else:
+            self._enterIdle()
+        self._thread = threading.Thread( target = self._run, name = "MPUPowerManager" )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """!
+        \~english Stop the power state machine, MPU6050 is left in sleep mode
+        \~chinese 停止电源状态机，MPU6050 进入睡眠模式
+        """
+        if self._thread == None: return
+        self._stop.set()
+        self._motion.set()
+        self._thread.join()
+        self._thread = None
+        if self._sampler.isRunning():
+            self._sampler.stop()
+            self._stats[POWER_STATE_ACTIVE]["wakeups"] += self._sampler.getStats()["samples"]
+        if self._intPin != None:
+            GPIO.remove_event_detect( self._intPin )
+        self._mpu.disableInt()
+        self._mpu.sleep()
+        self._setState( POWER_STATE_OFF )
+
+    def getStats(self):
+        """!
+        \~english
+        Get statistics per state
+        @return a dictionary { state: { "entries", "time", "wakeups", "transactions", "bytes" } } <br>
+                time in seconds, wakeups of CPU ( thread wakeups and samples ), I2C transactions and bytes
+        \~chinese
+        按状态读取统计数据
+        @return 字典 { state: { "entries", "time", "wakeups", "transactions", "bytes" } } <br>
+                time 单位秒，wakeups 为 CPU 唤醒次数（线程唤醒和采样），I2C 传输次数和字节数
+        """
+        self._account()
+        stats = dict( ( state, dict( s ) ) for state, s in self._stats.items() )
+        if self._state == POWER_STATE_ACTIVE and self._sampler.isRunning():
+            stats[POWER_STATE_ACTIVE]["wakeups"] += self._sampler.getStats()["samples"]
+        return stats
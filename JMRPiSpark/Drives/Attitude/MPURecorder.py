@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# MPU6050 Recorder
+# Record I2C traffic of MPU6050 into a binary file and replay it with a simulated bus
+# 将 MPU6050 的 I2C 通信记录到二进制文件，并通过模拟总线回放
+#
+# @version v1.0.0
+#
+
+import bisect
+import os
+import struct
+import threading
+import time
+
+#
+# File format ( little-endian ):
+#   File header: REC_MAGIC
+#   Records:     REC_HEADER_FORMAT ( kind, address, register, length, timestamp ) + length bytes of data
+#
+# Every indexInterval records an index record is appended, its data is
+# REC_INDEX_FORMAT ( offset of previous index record, timestamp and offset of the first record after
+# previous index record ). When the recorder is closed, a last index record and an end record are appended,
+# the data of end record is the offset of last index record, so a reader can walk the index chain
+# backward from the end of file. A file without end record ( eg. power lost ) is still readable by scanning.
+#
+REC_MAGIC = b"MPUREC\x00\x01"
+REC_HEADER_FORMAT = "<BBBHd"
+REC_HEADER_SIZE = struct.calcsize( REC_HEADER_FORMAT )
+REC_INDEX_FORMAT = "<QdQ"
+REC_END_FORMAT = "<Q"
+
+REC_READ_BYTE   = 0x01
+REC_READ_BLOCK  = 0x02
+REC_WRITE_BYTE  = 0x03
+REC_INDEX       = 0x10
+REC_END         = 0x11
+
+##
+# Default number of records between index records
+DEF_INDEX_INTERVAL = 1024
+
+class MPURecorder:
+    """!
+    \~english
+    Append-only binary recorder of I2C register transfers with timestamps and periodic index records.
+    Use RecordingBus to record the traffic of a MPU6050.
+
+    \~chinese
+    带时间戳和周期索引记录的只追加 I2C 寄存器传输二进制记录器。使用 RecordingBus 记录 MPU6050 的通信。
+    """
+    _file = None
+    _lock = None
+    _indexInterval = DEF_INDEX_INTERVAL
+    _count = 0
+    _lastIndex = 0
+    _chunkTs = None
+    _chunkOffset = None
+
+    def __init__(self, path, indexInterval = DEF_INDEX_INTERVAL):
+        """!
+        \~english
+        @param path: file to record into, records are appended if it exists and the index chain is continued
+        @param indexInterval: number of records between index records
+        \~chinese
+        @param path: 记录文件，文件存在时追加记录并延续索引链
+        @param indexInterval: 索引记录之间的记录数
+        """
+        self._indexInterval = indexInterval
+        self._lock = threading.Lock()
+        self._file = open( path, "ab" )
+        if self._file.tell() == 0:
+            self._file.write( REC_MAGIC )
+            self._lastIndex = 0
+        else:
+            # Chain the index records of this session to those of previous sessions
+            self._lastIndex = MPURecordReader( path )._findLastIndex()
+        self._count = 0
+        self._chunkTs = None
+
+    def _write(self, kind, address, register, data, timestamp):
+        offset = self._file.tell()
+        self._file.write( struct.pack( REC_HEADER_FORMAT, kind, address, register, len(data), timestamp ) )
+        self._file.write( data )
+        return offset
+
+    def _writeIndex(self, timestamp):
+        if self._chunkTs == None: return
+        data = struct.pack( REC_INDEX_FORMAT, self._lastIndex, self._chunkTs, self._chunkOffset )
+        self._lastIndex = self._write( REC_INDEX, 0, 0, data, timestamp )
+        self._chunkTs = None
+        self._count = 0
+
+    def log(self, kind, address, register, data, timestamp = None):
+        """!
+        \~english
+        Append a record
+        @param kind: REC_READ_BYTE, REC_READ_BLOCK or REC_WRITE_BYTE
+        @param address: I2C address
+        @param register: register address
+        @param data: bytes read or written
+        @param timestamp: None means time.time()
+        \~chinese
+        追加一条记录
+        @param kind: REC_READ_BYTE, REC_READ_BLOCK 或 REC_WRITE_BYTE
+        @param address: I2C 地址
+        @param register: 寄存器地址
+        @param data: 读取或写入的字节
+        @param timestamp: None 表示 time.time()
+        """
+        if timestamp == None:
+            timestamp = time.time()
+        with self._lock:
+            offset = self._write( kind, address, register, bytes( bytearray( data ) ), timestamp )
+            if self._chunkTs == None:
+                self._chunkTs = timestamp
+                self._chunkOffset = offset
+            self._count += 1
+            if self._count >= self._indexInterval:
+                self._writeIndex( timestamp )
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        """!
+        \~english Append the last index record and the end record, then close file
+        \~chinese 追加最后的索引记录和结束记录，然后关闭文件
+        """
+        with self._lock:
+            if self._file == None: return
+            now = time.time()
+            self._writeIndex( now )
+            self._write( REC_END, 0, 0, struct.pack( REC_END_FORMAT, self._lastIndex ), now )
+            self._file.close()
+            self._file = None
+
+class MPURecordReader:
+    """!
+    \~english Reader of files recorded by MPURecorder
+    \~chinese MPURecorder 记录文件的读取器
+    """
+    _path = None
+
+    def __init__(self, path):
+        self._path = path
+        with open( path, "rb" ) as f:
+            if f.read( len(REC_MAGIC) ) != REC_MAGIC:
+                raise ValueError("{} is not a MPU6050 recording".format( path ))
+
+    def _findLastIndex(self):
+        # Offset of the last index record, from the end record or by scanning a file without it, 0 if none
+        endSize = REC_HEADER_SIZE + struct.calcsize( REC_END_FORMAT )
+        with open( self._path, "rb" ) as f:
+            f.seek( 0, os.SEEK_END )
+            size = f.tell()
+            if size >= len(REC_MAGIC) + endSize:
+                f.seek( -endSize, os.SEEK_END )
+                kind, _, _, length, _ = struct.unpack( REC_HEADER_FORMAT, f.read( REC_HEADER_SIZE ) )
+                if kind == REC_END:
+                    return struct.unpack( REC_END_FORMAT, f.read( length ) )[0]
+
+            last = 0
+            offset = len(REC_MAGIC)
+            f.seek( offset )
+            while True:
+                header = f.read( REC_HEADER_SIZE )
+                if len( header ) < REC_HEADER_SIZE: break
+                kind, _, _, length, _ = struct.unpack( REC_HEADER_FORMAT, header )
+                if offset + REC_HEADER_SIZE + length > size: break
+                if kind == REC_INDEX: last = offset
+                offset += REC_HEADER_SIZE + length
+                f.seek( offset )
+            return last
+
+    def readIndex(self):
+        """!
+        \~english
+        Read index by walking the index chain backward from the end record
+        @return a list of ( timestamp, offset ) of record chunks in time order,
+                empty if the file has no end record
+        \~chinese
+        从结束记录开始向前遍历索引链读取索引
+        @return 按时间排序的记录块 ( timestamp, offset ) 列表，文件没有结束记录时为空
+        """
+        index = []
+        endSize = REC_HEADER_SIZE + struct.calcsize( REC_END_FORMAT )
+        with open( self._path, "rb" ) as f:
+            f.seek( 0, os.SEEK_END )
+            if f.tell() < len(REC_MAGIC) + endSize: return index
+            f.seek( -endSize, os.SEEK_END )
+            kind, _, _, length, _ = struct.unpack( REC_HEADER_FORMAT, f.read( REC_HEADER_SIZE ) )
+            if kind != REC_END: return index
+            offset = struct.unpack( REC_END_FORMAT, f.read( length ) )[0]
+            while offset:
+                f.seek( offset + REC_HEADER_SIZE )
+                offset, ts, chunkOffset = struct.unpack( REC_INDEX_FORMAT, f.read( struct.calcsize( REC_INDEX_FORMAT ) ) )
+                index.append( ( ts, chunkOffset ) )
+        index.reverse()
+        return index
+
+    def records(self, start = None):
+        """!
+        \~english
+        Iterate transfer records
+        @param start: None, or timestamp to start from, the index is used to seek to it
+        @return a generator of ( kind, address, register, data, timestamp )
+        \~chinese
+        迭代传输记录
+        @param start: None，或开始的时间戳，使用索引定位
+        @return ( kind, address, register, data, timestamp ) 生成器
+        """
+        offset = len(REC_MAGIC)
+        if start != None:
+            index = self.readIndex()
+            i = bisect.bisect_right( [ ts for ts, _ in index ], start ) - 1
+            if i >= 0: offset = index[i][1]
+
+        with open( self._path, "rb" ) as f:
+            f.seek( offset )
+            while True:
+                header = f.read( REC_HEADER_SIZE )
+                if len( header ) < REC_HEADER_SIZE: return
+                kind, address, register, length, ts = struct.unpack( REC_HEADER_FORMAT, header )
+                data = f.read( length )
+                if len( data ) < length: return
+                if kind >= REC_INDEX: continue
+                if start != None and ts < start: continue
+                yield ( kind, address, register, data, ts )
+
+class RecordingBus:
+    """!
+    \~english
+    An smbus compatible bus which records all transfers of the wrapped bus with MPURecorder
+    \~chinese
+    兼容 smbus 的总线，使用 MPURecorder 记录被包装总线的全部传输
+    \~
+    @note
+    <pre>
+    recorder = MPURecorder( "motion.rec" )
+    mpu = MPU6050( DEF_MPU6050_ADDRESS, bus = RecordingBus( smbus.SMBus( 1 ), recorder ) )
+    ...
+    recorder.close()
+    </pre>
+    """
+    _bus = None
+    _recorder = None
+
+    def __init__(self, bus, recorder):
+        self._bus = bus
+        self._recorder = recorder
+
+    def read_byte_data(self, address, register):
+        value = self._bus.read_byte_data( address, register )
+        self._recorder.log( REC_READ_BYTE, address, register, [ value ] )
+        return value
+
+    def read_i2c_block_data(self, address, register, length):
+        data = self._bus.read_i2c_block_data( address, register, length )
+        self._recorder.log( REC_READ_BLOCK, address, register, data )
+        return data
+
+    def write_byte_data(self, address, register, value):
+        self._bus.write_byte_data( address, register, value )
+        self._recorder.log( REC_WRITE_BYTE, address, register, [ value ] )
+
+    def close(self):
+        if hasattr( self._bus, "close" ): self._bus.close()
+
+class ReplayBus:
+    """!
+    \~english
+    An smbus compatible bus which replays a recording of MPURecorder, so MPU6050 runs unmodified without sensor.
+
+    Each read of a register returns the data of the next recorded read of the same register,
+    at max speed, or at the recorded time scaled by speed ( the read waits for it ).
+    Writes update a register map which answers reads not found in recording.
+    When a register runs out of recorded reads, its last data is returned.
+
+    \~chinese
+    兼容 smbus 的总线，回放 MPURecorder 的记录，使 MPU6050 无需传感器即可原样运行。
+
+    每次读取寄存器返回同一寄存器下一次记录的读取数据，以最快速度返回，或按 speed 缩放的记录时间返回（读取会等待）。
+    写入更新寄存器映射，用于响应记录中没有的读取。寄存器的记录读取用完后返回其最后的数据。
+
+    \~
+    @note
+    <pre>
+    mpu = MPU6050( DEF_MPU6050_ADDRESS, bus = ReplayBus( "motion.rec", speed = None ) )
+    </pre>
+    """
+    _reads = None
+    _cursors = None
+    _registers = None
+    _speed = None
+    _firstTs = None
+    _startTime = None
+
+    def __init__(self, path, speed = 1.0, start = None):
+        """!
+        \~english
+        @param path: recording file
+        @param speed: None - max speed, 1.0 - real time, 2.0 - twice real time, etc.
+        @param start: None, or timestamp in recording to start from
+        \~chinese
+        @param path: 记录文件
+        @param speed: None - 最快速度，1.0 - 实时，2.0 - 两倍实时，依此类推
+        @param start: None，或记录中开始的时间戳
+        """
+        self._speed = speed
+        self._reads = {}
+        self._cursors = {}
+        self._registers = {}
+        for kind, address, register, data, ts in MPURecordReader( path ).records( start ):
+            if self._firstTs == None: self._firstTs = ts
+            if kind == REC_WRITE_BYTE:
+                continue
+            self._reads.setdefault( ( address, register ), [] ).append( ( ts, bytearray( data ) ) )
+
+    def _wait(self, ts):
+        if self._speed == None: return
+        if self._startTime == None:
+            self._startTime = time.time()
+        delay = self._startTime + ( ts - self._firstTs ) / self._speed - time.time()
+        if delay > 0: time.sleep( delay )
+
+    def _read(self, address, register, length):
+        key = ( address, register )
+        reads = self._reads.get( key )
+        if reads:
+            i = self._cursors.get( key, 0 )
+            if i < len( reads ):
+                self._cursors[key] = i + 1
+                ts, data = reads[i]
+                self._wait( ts )
+            else:
+                data = reads[-1][1]
+            if len( data ) >= length:
+                return list( data[:length] )
+        return [ self._registers.get( ( address, register + i ), 0 ) for i in range(length) ]
+
+    def read_byte_data(self, address, register):
+        return self._read( address, register, 1 )[0]
+
+    def read_i2c_block_data(self, address, register, length):
+        return self._read( address, register, length )
+
+    def write_byte_data(self, address, register, value):
+        self._registers[ ( address, register ) ] = value
+
+    def close(self):
+        pass
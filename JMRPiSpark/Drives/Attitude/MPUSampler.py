@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# MPU6050 Sampler
+# Continuous sampling on a background thread into a preallocated ring buffer
+# 在后台线程中连续采样到预分配的环形缓冲区
+#
+# @version v1.0.0
+#
+
+import math
+import threading
+import time
+from array import array
+from itertools import chain
+
+from .MPU6050 import MPUSample
+
+##
+# Number of values of a sample record in ring buffer, fields are the same as MPUSample
+MPU_SAMPLE_SIZE = len( MPUSample._fields )
+
+# Disabled fields ( None ) are stored as NaN, the same as MPU_SAMPLE_DTYPE
+_NAN = float( "nan" )
+
+##
+# Default sampling rate of MPUSampler ( Hz ), capped by the sample rate of sensor
+DEF_SAMPLE_RATE = 100
+##
+# Default capacity of MPURingBuffer ( samples )
+DEF_RING_CAPACITY = 1024
+
+class MPURingBuffer:
+    """!
+    \~english
+    A preallocated ring buffer of samples. Samples are stored as float values in
+    one flat array, no object is created per sample when writing.
+    One thread writes, other threads read.
+
+    Each record has the fields of MPUSample, and is read back as a MPUSample.
+
+    \~chinese
+    预分配的样本环形缓冲区。样本以浮点数存储在一个平坦数组中，写入时不为每个样本创建对象。
+    一个线程写入，其它线程读取。
+
+    每条记录的字段与 MPUSample 相同，读取时返回 MPUSample。
+    """
+    ##
+    # \~english number of unread samples overwritten because buffer was full
+    # \~chinese 缓冲区满时被覆盖的未读样本数
+    overruns = 0
+    ##
+    # \~english number of reads which asked more samples than available
+    # \~chinese 请求样本数多于可用样本数的读取次数
+    underruns = 0
+
+    _capacity = None
+    _data = None
+    # Total number of samples written / read, the index in buffer is count % capacity
+    _written = 0
+    _read = 0
+    _lock = None
+
+    def __init__(self, capacity = DEF_RING_CAPACITY):
+        """!
+        \~english
+        @param capacity: max number of samples in buffer
+        \~chinese
+        @param capacity: 缓冲区中的最大样本数
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be greater than 0")
+        self._capacity = capacity
+        self._data = array( "d", [0.0] ) * ( capacity * MPU_SAMPLE_SIZE )
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """!
+        \~english Drop all samples and reset counters
+        \~chinese 丢弃所有样本并复位计数器
+        """
+        with self._lock:
+            self._written = 0
+            self._read = 0
+            self.overruns = 0
+            self.underruns = 0
+
+    def getCapacity(self):
+        return self._capacity
+
+    def __len__(self):
+        """!
+        \~english @return number of unread samples
+        \~chinese @return 未读样本数
+        """
+        return self._written - self._read
+
+    def write(self, timestamp, ax, ay, az, temp, gx, gy, gz):
+        """!
+        \~english Write a sample, the oldest unread sample is overwritten if buffer is full, None fields are stored as NaN
+        \~chinese 写入一个样本，缓冲区满时覆盖最旧的未读样本，None 字段存储为 NaN
+        """
+        if temp == None: temp = _NAN
+        if ax == None: ax = ay = az = _NAN
+        if gx == None: gx = gy = gz = _NAN
+        with self._lock:
+            i = ( self._written % self._capacity ) * MPU_SAMPLE_SIZE
+            data = self._data
+            data[i] = timestamp
+            data[i+1] = ax
+            data[i+2] = ay
+            data[i+3] = az
+            data[i+4] = temp
+            data[i+5] = gx
+            data[i+6] = gy
+            data[i+7] = gz
+            self._written += 1
+            if self._written - self._read > self._capacity:
+                self._read = self._written - self._capacity
+                self.overruns += 1
+
+    def writeBatch(self, samples):
+        """!
+        \~english Write a batch of samples, eg. the result of MPU6050#readFifo, None fields are stored as NaN
+        \~chinese 写入一批样本，例如 MPU6050#readFifo 的结果，None 字段存储为 NaN
+        """
+        if not isinstance( samples, ( list, tuple ) ):
+            # The fallback below iterates samples again
+            samples = list( samples )
+        try:
+            flat = array( "d", chain.from_iterable( samples ) )
+        except TypeError:
+            flat = array( "d", [ _NAN if v == None else v for v in chain.from_iterable( samples ) ] )
+        n = len( flat ) // MPU_SAMPLE_SIZE
+        if n == 0: return
+        capacity = self._capacity
+        with self._lock:
+            # Only the last capacity samples can be kept
+            skip = max( 0, n - capacity )
+            written = self._written + skip
+            pos = skip * MPU_SAMPLE_SIZE
+            data = self._data
+            while pos < len( flat ):
+                i = ( written % capacity ) * MPU_SAMPLE_SIZE
+                size = min( len( flat ) - pos, len( data ) - i )
+                data[i:i + size] = flat[pos:pos + size]
+                pos += size
+                written += size // MPU_SAMPLE_SIZE
+            lost = self._written + n - self._read - capacity
+            self._written += n
+            if lost > 0:
+                self._read = self._written - capacity
+                self.overruns += lost
+
+    def _record(self, count):
+        i = ( count % self._capacity ) * MPU_SAMPLE_SIZE
+        return MPUSample( *self._data[i:i + MPU_SAMPLE_SIZE] )
+
+    def latest(self):
+        """!
+        \~english @return the latest MPUSample ( does not consume it ) or None if buffer is empty
+        \~chinese @return 最新的 MPUSample（不消费）或 None（缓冲区为空）
+        """
+        with self._lock:
+            if self._written == 0: return None
+            return self._record( self._written - 1 )
+
+    def read(self, n = None):
+        """!
+        \~english
+        Read and consume unread samples, oldest first
+        @param n: number of samples, None means all unread samples
+        @return a list of MPUSample
+        \~chinese
+        读取并消费未读样本，最旧的在前
+        @param n: 样本数，None 表示全部未读样本
+        @return MPUSample 列表
+        """
+        with self._lock:
+            start, count = self._consume( n )
+            return [ self._record( start + k ) for k in range(count) ]
+
+    def readFlat(self, n = None):
+        """!
+        \~english
+        Read and consume unread samples into a flat array( "d" ),
+        MPU_SAMPLE_SIZE values per sample, no object is created per sample
+        @param n: number of samples, None means all unread samples
+        \~chinese
+        读取并消费未读样本到平坦的 array( "d" )，每个样本 MPU_SAMPLE_SIZE 个值，不为每个样本创建对象
+        @param n: 样本数，None 表示全部未读样本
+        """
+        with self._lock:
+            start, count = self._consume( n )
+            return self._copy( start, count )
+
+    def window(self, n):
+        """!
+        \~english
+        Get the latest n samples into a flat array( "d" ) without consuming them
+        @param n: number of samples, up to capacity
+        \~chinese
+        获取最新的 n 个样本到平坦的 array( "d" )，不消费样本
+        @param n: 样本数，最多为容量
+        """
+        with self._lock:
+            count = min( n, self._capacity, self._written )
+            return self._copy( self._written - count, count )
+
+    def _consume(self, n):
+        available = self._written - self._read
+        if n == None:
+            count = available
+        else:
+            if n > available: self.underruns += 1
+            count = min( n, available )
+        start = self._read
+        self._read += count
+        return start, count
+
+    def _copy(self, start, count):
+        size = MPU_SAMPLE_SIZE
+        i = ( start % self._capacity ) * size
+        end = i + count * size
+        total = self._capacity * size
+        if end <= total:
+            return self._data[i:end]
+        return self._data[i:] + self._data[:end - total]
+
+class MPUSampler:
+    """!
+    \~english
+    Sample MPU6050 at a fixed rate on a background thread into a MPURingBuffer.
+    Consumers read the latest sample or drain windows from MPUSampler#Buffer.
+
+    \~chinese
+    在后台线程中以固定频率采样 MPU6050 到 MPURingBuffer。
+    使用者从 MPUSampler#Buffer 读取最新样本或批量读取样本。
+
+    \~
+    @note
+    <pre>
+    mpu = MPU6050( DEF_MPU6050_ADDRESS )
+    mpu.open()
+    mpu.setDLPF( 42 )
+    mpu.setSampleRate( 200 )
+    sampler = MPUSampler( mpu, rate = 200 )
+    sampler.start()
+    ...
+    latest = sampler.Buffer.latest()
+    window = sampler.Buffer.read()
+    ...
+    sampler.stop()
+    print( sampler.getStats() )
+    </pre>
+    """
+    ##
+    # \~english MPURingBuffer instance
+    # \~chinese MPURingBuffer 实例
+    Buffer = None
+
+    _mpu = None
+    _rate = None
+    _thread = None
+    _stop = None
+
+    # Sampling statistics
+    _samples = 0
+    _missed = 0
+    _errors = 0
+    _jitter_sum = 0.0
+    _jitter_sq_sum = 0.0
+    _jitter_max = 0.0
+
+    def __init__(self, mpu, rate = None, capacity = DEF_RING_CAPACITY, buffer = None):
+        """!
+        \~english
+        @param mpu: a MPU6050 instance
+        @param rate: sampling rate in Hz, it can not exceed sample rate of sensor ( MPU6050#getSampleRate ),
+                     None means DEF_SAMPLE_RATE or the sample rate of sensor if it is lower
+        @param capacity: capacity of ring buffer, default: DEF_RING_CAPACITY
+        @param buffer: a MPURingBuffer instance to write into, None means create a new one
+        \~chinese
+        @param mpu: MPU6050 实例
+        @param rate: 采样频率 Hz，不能超过传感器采样率（MPU6050#getSampleRate），None 表示 DEF_SAMPLE_RATE，传感器采样率更低时使用传感器采样率
+        @param capacity: 环形缓冲区容量，默认：DEF_RING_CAPACITY
+        @param buffer: 写入的 MPURingBuffer 实例，None 表示创建新的缓冲区
+        """
+        sensorRate = mpu.getSampleRate()
+        if rate == None:
+            # Power-on sample rate is 8kHz, do not spin a thread at it unless asked
+            rate = min( DEF_SAMPLE_RATE, sensorRate )
+        elif rate <= 0 or rate > sensorRate:
+            # Sampling faster than sensor output rate only reads the same sample again
+            raise ValueError("rate must be in (0, {}] Hz, the sample rate of sensor".format( sensorRate ))
+        self._mpu = mpu
+        self._rate = float(rate)
+        self.Buffer = buffer if buffer != None else MPURingBuffer( capacity )
+        self._resetStats()
+
+    def _resetStats(self):
+        self._samples = 0
+        self._missed = 0
+        self._errors = 0
+        self._jitter_sum = 0.0
+        self._jitter_sq_sum = 0.0
+        self._jitter_max = 0.0
+
+    def _run(self):
+        period = 1.0 / self._rate
+        mpu = self._mpu
+        write = self.Buffer.write
+        deadline = time.time()
+        while not self._stop.is_set():
+            now = time.time()
+            if deadline > now:
+                if self._stop.wait( deadline - now ): break
+                now = time.time()
+
+            try:
+                ax, ay, az, temp, gx, gy, gz = mpu.readSensorData()
+            except IOError:
+                # I2C bus error, skip this sample
+                self._errors += 1
+            else:
+                write( now, ax, ay, az, temp, gx, gy, gz )
+                self._samples += 1
+
+            # Jitter: lateness of the sample against its deadline
+            jitter = now - deadline
+            self._jitter_sum += jitter
+            self._jitter_sq_sum += jitter * jitter
+            if jitter > self._jitter_max: self._jitter_max = jitter
+
+            deadline += period
+            # Missed deadlines are skipped, do not burst to catch up
+            late = time.time() - deadline
+            if late > period:
+                skipped = int( late / period )
+                self._missed += skipped
+                deadline += skipped * period
+
+    def start(self):
+        """!
+        \~english Start sampling thread
+        \~chinese 启动采样线程
+        """
+        if self._thread != None: return
+        self._resetStats()
+        self._stop = threading.Event()
+        self._thread = threading.Thread( target = self._run, name = "MPUSampler" )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """!
+        \~english Stop sampling thread
+        \~chinese 停止采样线程
+        """
+        if self._thread == None: return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def isRunning(self):
+        return self._thread != None
+
+    def getRate(self):
+        return self._rate
+
+    def getStats(self):
+        """!
+        \~english
+        Get sampling statistics
+        @return a dictionary:
+            * samples: number of samples written
+            * overruns: unread samples overwritten in ring buffer ( consumer too slow )
+            * underruns: reads which asked more samples than available ( consumer too fast )
+            * missed: sampling deadlines skipped ( sampler too slow )
+            * errors: I2C read errors
+            * jitter_mean, jitter_rms, jitter_max: lateness of samples against deadlines, in seconds
+        \~chinese
+        读取采样统计数据
+        @return 字典:
+            * samples: 写入的样本数
+            * overruns: 环形缓冲区中被覆盖的未读样本数（使用者太慢）
+            * underruns: 请求样本数多于可用样本数的读取次数（使用者太快）
+            * missed: 跳过的采样时间点（采样太慢）
+            * errors: I2C 读取错误数
+            * jitter_mean, jitter_rms, jitter_max: 样本相对于采样时间点的延迟，单位秒
+        """
+        n = self._samples + self._errors
+        return {
+            "samples": self._samples,
+            "overruns": self.Buffer.overruns,
+            "underruns": self.Buffer.underruns,
+            "missed": self._missed,
+            "errors": self._errors,
+            "jitter_mean": self._jitter_sum / n if n else 0.0,
+            "jitter_rms": math.sqrt( self._jitter_sq_sum / n ) if n else 0.0,
+            "jitter_max": self._jitter_max,
+        }
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# Motion Gesture
+# Streaming detection of tap, double tap, shake, tilt and free fall from MPU6050 samples
+# 由 MPU6050 样本流检测单击、双击、摇晃、倾斜和自由落体
+#
+# @version v1.0.0
+#
+
+import math
+from collections import deque, namedtuple
+
+from .MPU6050 import GRAVITIY_EARTH
+
+GESTURE_TAP         = "tap"
+GESTURE_DOUBLE_TAP  = "double_tap"
+GESTURE_SHAKE       = "shake"
+GESTURE_TILT        = "tilt"
+GESTURE_FREE_FALL   = "free_fall"
+
+##
+# \~english
+# A gesture event: kind is one of GESTURE_*, timestamp of the sample which completes it,
+# value: peak in g for tap, std in g for shake, angle in degrees for tilt, duration in seconds for free fall
+# \~chinese
+# 手势事件：kind 为 GESTURE_* 之一，timestamp 为完成手势的样本时间戳，
+# value：单击为峰值 g，摇晃为标准差 g，倾斜为角度，自由落体为持续时间秒
+MotionEvent = namedtuple( "MotionEvent", ( "kind", "timestamp", "value" ) )
+
+# Default thresholds
+DEF_TAP_THRESHOLD       = 1.2       # g above baseline
+DEF_TAP_MAX_DURATION    = 0.08      # seconds
+DEF_DOUBLE_TAP_WINDOW   = 0.4       # seconds between taps
+DEF_SHAKE_THRESHOLD     = 0.5       # g, std of magnitude in window
+DEF_SHAKE_WINDOW        = 0.5       # seconds
+DEF_TILT_THRESHOLD      = 30.0      # degrees from flat
+DEF_TILT_HYSTERESIS     = 5.0       # degrees
+DEF_FREE_FALL_THRESHOLD = 0.3       # g
+DEF_FREE_FALL_DURATION  = 0.1       # seconds
+
+class MotionGesture:
+    """!
+    \~english
+    Streaming gesture detector. Feed it MPU6050 samples ( MPUSample ) one by one with MotionGesture#update
+    or in batches with MotionGesture#updateBatch, events are emitted to callbacks and / or a queue.
+
+    All detectors use incremental statistics over a sliding window of accelerometer samples
+    ( running sums and sums of squares ), the cost per sample is O(1):
+        * tap: short peak of magnitude above the window mean
+        * shake: total std of accelerometer vector in window
+        * tilt: angle of window mean vector ( gravity ) from flat, only when not shaking
+        * free fall: magnitude below threshold for a duration
+
+    \~chinese
+    流式手势检测器。使用 MotionGesture#update 逐个或使用 MotionGesture#updateBatch 批量输入 MPU6050 样本（MPUSample），
+    事件发送到回调函数和 / 或队列。
+
+    所有检测器均使用加速度样本滑动窗口上的增量统计（累计和与平方和），每个样本的开销为 O(1)：
+        * 单击：模长高于窗口均值的短暂峰值
+        * 摇晃：窗口内加速度向量的总标准差
+        * 倾斜：窗口均值向量（重力）偏离水平的角度，仅在未摇晃时检测
+        * 自由落体：模长低于阈值持续一段时间
+
+    \~
+    @note
+    <pre>
+    def onGesture(event):
+        print( event.kind, event.value )
+
+    gesture = MotionGesture( mpu.getSampleRate() )
+    gesture.addCallback( onGesture )
+    gesture.updateBatch( mpu.readFifo() )
+    </pre>
+    """
+    _gravityFactor = GRAVITIY_EARTH
+    _callbacks = None
+    _eventQueue = None
+
+    _tapThreshold = DEF_TAP_THRESHOLD
+    _tapMaxDuration = DEF_TAP_MAX_DURATION
+    _doubleTapWindow = DEF_DOUBLE_TAP_WINDOW
+    _shakeThreshold = DEF_SHAKE_THRESHOLD
+    _tiltThreshold = DEF_TILT_THRESHOLD
+    _tiltHysteresis = DEF_TILT_HYSTERESIS
+    _freeFallThreshold = DEF_FREE_FALL_THRESHOLD
+    _freeFallDuration = DEF_FREE_FALL_DURATION
+
+    # Sliding window of ( x, y, z, magnitude ) of accelerometer in g, and running sums
+    _window = None
+    _windowSize = 0
+    _sumX = 0.0
+    _sumY = 0.0
+    _sumZ = 0.0
+    _sumSq = 0.0
+    _sumMag = 0.0
+
+    # Detector states
+    _tapStart = None
+    _tapPeak = 0.0
+    _lastTap = None
+    _shaking = False
+    _tilted = False
+    _fallStart = None
+    _fallen = False
+
+    def __init__(self, sampleRate, gravityFactor = GRAVITIY_EARTH, eventQueue = None, shakeWindow = DEF_SHAKE_WINDOW):
+        """!
+        \~english
+        @param sampleRate: sample rate of input in Hz, eg. MPU6050#getSampleRate()
+        @param gravityFactor: gravity factor of MPU6050, default: GRAVITIY_EARTH
+        @param eventQueue: None, or a queue ( eg. Queue.Queue ) events are put into
+        @param shakeWindow: length of sliding window in seconds, default: DEF_SHAKE_WINDOW
+        \~chinese
+        @param sampleRate: 输入采样率 Hz，例如 MPU6050#getSampleRate()
+        @param gravityFactor: MPU6050 的重力系数，默认：GRAVITIY_EARTH
+        @param eventQueue: None，或放入事件的队列（例如 Queue.Queue）
+        @param shakeWindow: 滑动窗口长度，单位秒，默认：DEF_SHAKE_WINDOW
+        """
+        self._gravityFactor = gravityFactor
+        self._eventQueue = eventQueue
+        self._callbacks = []
+        self._windowSize = max( 2, int( round( sampleRate * shakeWindow ) ) )
+        self.reset()
+
+    def reset(self):
+        """!
+        \~english Clear window and states of detectors
+        \~chinese 清除窗口和检测器状态
+        """
+        self._window = deque()
+        self._sumX = self._sumY = self._sumZ = 0.0
+        self._sumSq = 0.0
+        self._sumMag = 0.0
+        self._tapStart = None
+        self._tapPeak = 0.0
+        self._lastTap = None
+        self._shaking = False
+        self._tilted = False
+        self._fallStart = None
+        self._fallen = False
+
+    def setTap(self, threshold = DEF_TAP_THRESHOLD, maxDuration = DEF_TAP_MAX_DURATION, doubleTapWindow = DEF_DOUBLE_TAP_WINDOW):
+        """!
+        \~english
+        @param threshold: peak above baseline in g
+        @param maxDuration: max duration of a tap in seconds, longer peaks are not taps
+        @param doubleTapWindow: max seconds between two taps of a double tap
+        \~chinese
+        @param threshold: 高于基线的峰值，单位 g
+        @param maxDuration: 单击的最长持续时间，单位秒，更长的峰值不是单击
+        @param doubleTapWindow: 双击中两次单击的最大间隔，单位秒
+        """
+        self._tapThreshold = threshold
+        self._tapMaxDuration = maxDuration
+        self._doubleTapWindow = doubleTapWindow
+
+    def setShake(self, threshold = DEF_SHAKE_THRESHOLD):
+        """!
+        \~english @param threshold: total std of accelerometer vector in window, in g
+        \~chinese @param threshold: 窗口内加速度向量的总标准差，单位 g
+        """
+        self._shakeThreshold = threshold
+
+    def setTilt(self, threshold = DEF_TILT_THRESHOLD, hysteresis = DEF_TILT_HYSTERESIS):
+        """!
+        \~english
+        @param threshold: angle from flat in degrees
+        @param hysteresis: degrees below threshold to clear tilt
+        \~chinese
+        @param threshold: 偏离水平的角度
+        @param hysteresis: 低于阈值多少度时清除倾斜状态
+        """
+        self._tiltThreshold = threshold
+        self._tiltHysteresis = hysteresis
+
+    def setFreeFall(self, threshold = DEF_FREE_FALL_THRESHOLD, duration = DEF_FREE_FALL_DURATION):
+        """!
+        \~english
+        @param threshold: max accelerometer magnitude in g
+        @param duration: min seconds below threshold
+        \~chinese
+        @param threshold: 加速度模长上限，单位 g
+        @param duration: 低于阈值的最短时间，单位秒
+        """
+        self._freeFallThreshold = threshold
+        self._freeFallDuration = duration
+
+    def addCallback(self, callback):
+        """!
+        \~english @param callback: a function called with a MotionEvent
+        \~chinese @param callback: 以 MotionEvent 为参数调用的函数
+        """
+        self._callbacks.append( callback )
+
+    def removeCallback(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove( callback )
+
+    def _emit(self, kind, timestamp, value):
+        event = MotionEvent( kind, timestamp, value )
+        for callback in self._callbacks:
+            callback( event )
+        if self._eventQueue != None:
+            self._eventQueue.put( event )
+
+    def update(self, sample):
+        """!
+        \~english
+        Feed a sample
+        @param sample: a MPUSample or a tuple of the same fields, accelerometer must be available
+        \~chinese
+        输入一个样本
+        @param sample: MPUSample 或相同字段的元组，必须包含加速度数据
+        """
+        ts, ax, ay, az = sample[0], sample[1], sample[2], sample[3]
+        if ax == None: return
+        g = self._gravityFactor
+        ax /= g
+        ay /= g
+        az /= g
+        mag = math.sqrt( ax * ax + ay * ay + az * az )
+
+        # Sliding window statistics, O(1)
+        window = self._window
+        window.append( ( ax, ay, az, mag ) )
+        self._sumX += ax
+        self._sumY += ay
+        self._sumZ += az
+        self._sumSq += mag * mag
+        self._sumMag += mag
+        if len( window ) > self._windowSize:
+            ox, oy, oz, omag = window.popleft()
+            self._sumX -= ox
+            self._sumY -= oy
+            self._sumZ -= oz
+            self._sumSq -= omag * omag
+            self._sumMag -= omag
+        n = len( window )
+        mx = self._sumX / n
+        my = self._sumY / n
+        mz = self._sumZ / n
+        # Total variance of vector: E[|a|^2] - |E[a]|^2
+        std = math.sqrt( max( 0.0, self._sumSq / n - ( mx * mx + my * my + mz * mz ) ) )
+
+        self._detectTap( ts, mag - self._sumMag / n )
+        self._detectShake( ts, std, n )
+        if not self._shaking:
+            self._detectTilt( ts, mx, my, mz )
+        self._detectFreeFall( ts, mag )
+
+    def updateBatch(self, samples):
+        """!
+        \~english Feed a batch of samples, eg. the result of MPU6050#readFifo or MPURingBuffer#read
+        \~chinese 批量输入样本，例如 MPU6050#readFifo 或 MPURingBuffer#read 的结果
+        """
+        update = self.update
+        for sample in samples:
+            update( sample )
+
+    def _detectTap(self, ts, peak):
+        if self._tapStart == None:
+            if peak > self._tapThreshold:
+                self._tapStart = ts
+                self._tapPeak = peak
+            return
+
+        if peak > self._tapThreshold:
+            self._tapPeak = max( self._tapPeak, peak )
+            return
+
+        # Peak ends, it is a tap only when it is short
+        start = self._tapStart
+        self._tapStart = None
+        if ts - start > self._tapMaxDuration: return
+
+        self._emit( GESTURE_TAP, ts, self._tapPeak )
+        if self._lastTap != None and start - self._lastTap <= self._doubleTapWindow:
+            self._emit( GESTURE_DOUBLE_TAP, ts, self._tapPeak )
+            self._lastTap = None
+        else:
+            self._lastTap = ts
+
+    def _detectShake(self, ts, std, n):
+        if n < self._windowSize: return
+        if not self._shaking and std > self._shakeThreshold:
+            self._shaking = True
+            self._emit( GESTURE_SHAKE, ts, std )
+        elif self._shaking and std < self._shakeThreshold * 0.5:
+            self._shaking = False
+
+    def _detectTilt(self, ts, gx, gy, gz):
+        mag = math.sqrt( gx * gx + gy * gy + gz * gz )
+        if mag < 0.5: return        # No reliable gravity direction
+        angle = math.degrees( math.acos( max( -1.0, min( 1.0, gz / mag ) ) ) )
+        if not self._tilted and angle > self._tiltThreshold:
+            self._tilted = True
+            self._emit( GESTURE_TILT, ts, angle )
+        elif self._tilted and angle < self._tiltThreshold - self._tiltHysteresis:
+            self._tilted = False
+
+    def _detectFreeFall(self, ts, mag):
+        if mag >= self._freeFallThreshold:
+            self._fallStart = None
+            self._fallen = False
+            return
+        if self._fallStart == None:
+            self._fallStart = ts
+        elif not self._fallen and ts - self._fallStart >= self._freeFallDuration:
+            self._fallen = True
+            self._emit( GESTURE_FREE_FALL, ts, ts - self._fallStart )
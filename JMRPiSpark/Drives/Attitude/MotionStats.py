@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# Motion Statistics
+# Incremental rolling statistics and decimation of MPU6050 sample streams
+# MPU6050 样本流的增量滑动统计和抽取
+#
+# @version v1.0.0
+#
+
+import math
+from array import array
+from collections import deque
+
+from .MPU6050 import GRAVITIY_EARTH
+
+try:
+    import numpy
+except ImportError:
+    # numpy is only used by batch updates of numpy arrays
+    numpy = None
+
+_INF = float("inf")
+
+class RollingStats:
+    """!
+    \~english
+    Statistics over a sliding window of the latest values, with fixed memory:
+    mean and variance by Welford's method ( with removal ), RMS, min and max by monotonic deques.
+    Each RollingStats#update costs O(1) amortized.
+    Values which are not finite ( NaN marks a field not captured ) are skipped, they do not enter the window.
+    RollingStats#updateBatch with a numpy array rebuilds the state from the latest window vectorized.
+
+    \~chinese
+    最新数值滑动窗口上的统计，内存固定：
+    Welford 方法（支持移除）计算均值和方差，RMS，单调双端队列计算最小值和最大值。
+    每次 RollingStats#update 的均摊开销为 O(1)。非有限数值（NaN 表示未采集的字段）被跳过，不进入窗口。
+    使用 numpy 数组调用 RollingStats#updateBatch 时以向量化方式由最新窗口重建状态。
+    """
+    _size = 0
+    _values = None
+    _count = 0          # total values added
+    _n = 0              # values in window
+    _mean = 0.0
+    _m2 = 0.0
+    _sumSq = 0.0
+    _minQ = None        # ( index, value ), increasing values
+    _maxQ = None        # ( index, value ), decreasing values
+
+    def __init__(self, window):
+        """!
+        \~english @param window: number of values in sliding window
+        \~chinese @param window: 滑动窗口中的数值个数
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self._size = window
+        self._values = array( "d", [0.0] ) * window
+        self.reset()
+
+    def reset(self):
+        self._count = 0
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._sumSq = 0.0
+        self._minQ = deque()
+        self._maxQ = deque()
+
+    def update(self, value):
+        """!
+        \~english Add a value, the oldest value leaves the window when it is full, NaN and infinity are skipped
+        \~chinese 添加一个数值，窗口满时最旧的数值离开窗口，跳过 NaN 和无穷大
+        """
+        # A NaN would stay in the running mean even after it leaves the window
+        if not -_INF < value < _INF: return
+        size = self._size
+        i = self._count % size
+        if self._n == size:
+            # Welford removal of the oldest value
+            old = self._values[i]
+            n = self._n - 1
+            if n == 0:
+                self._mean = self._m2 = 0.0
+            else:
+                mean = self._mean
+                newMean = ( mean * self._n - old ) / n
+                self._m2 -= ( old - mean ) * ( old - newMean )
+                self._mean = newMean
+            self._sumSq -= old * old
+            self._n = n
+
+        self._values[i] = value
+        self._n += 1
+        delta = value - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * ( value - self._mean )
+        self._sumSq += value * value
+
+        index = self._count
+        self._count += 1
+        minQ = self._minQ
+        while minQ and minQ[-1][1] >= value: minQ.pop()
+        minQ.append( ( index, value ) )
+        if minQ[0][0] <= index - size: minQ.popleft()
+        maxQ = self._maxQ
+        while maxQ and maxQ[-1][1] <= value: maxQ.pop()
+        maxQ.append( ( index, value ) )
+        if maxQ[0][0] <= index - size: maxQ.popleft()
+
+    def _window(self):
+        # Values in window, oldest first
+        size = self._size
+        if self._n < size:
+            return self._values[:self._n]
+        i = self._count % size
+        return self._values[i:] + self._values[:i]
+
+    def updateBatch(self, values):
+        """!
+        \~english
+        Add a batch of values. With a numpy array the state is rebuilt vectorized from the latest window
+        @param values: a sequence or a numpy array of values
+        \~chinese
+        添加一批数值。使用 numpy 数组时，以向量化方式由最新窗口重建状态
+        @param values: 数值序列或 numpy 数组
+        """
+        if numpy is None or not isinstance( values, numpy.ndarray ):
+            update = self.update
+            for value in values:
+                update( value )
+            return
+        values = numpy.asarray( values, dtype = numpy.float64 )
+        values = values[numpy.isfinite( values )]
+        if len( values ) == 0: return
+
+        size = self._size
+        window = numpy.concatenate( ( numpy.frombuffer( self._window(), dtype = numpy.float64 ), values ) )[-size:]
+        n = len( window )
+        count = self._count + len( values )
+        first = count - n
+
+        self._values[:] = array( "d", [0.0] ) * size
+        idx = ( numpy.arange( first, count ) % size )
+        buf = numpy.frombuffer( self._values, dtype = numpy.float64 )
+        buf[idx] = window
+        self._count = count
+        self._n = n
+        self._mean = float( window.mean() )
+        self._m2 = float( ( ( window - self._mean ) ** 2 ).sum() )
+        self._sumSq = float( ( window * window ).sum() )
+
+        # Monotonic deques: keep values strictly less ( greater ) than all later values
+        suffixMin = numpy.minimum.accumulate( window[::-1] )[::-1]
+        suffixMax = numpy.maximum.accumulate( window[::-1] )[::-1]
+        keepMin = numpy.ones( n, dtype = bool )
+        keepMax = numpy.ones( n, dtype = bool )
+        keepMin[:-1] = window[:-1] < suffixMin[1:]
+        keepMax[:-1] = window[:-1] > suffixMax[1:]
+        positions = numpy.arange( first, count )
+        self._minQ = deque( zip( positions[keepMin].tolist(), window[keepMin].tolist() ) )
+        self._maxQ = deque( zip( positions[keepMax].tolist(), window[keepMax].tolist() ) )
+
+    def __len__(self):
+        return self._n
+
+    def getMean(self):
+        return self._mean
+
+    def getVariance(self):
+        """!
+        \~english @return population variance of window
+        \~chinese @return 窗口的总体方差
+        """
+        return max( 0.0, self._m2 / self._n ) if self._n else 0.0
+
+    def getStd(self):
+        return math.sqrt( self.getVariance() )
+
+    def getRMS(self):
+        return math.sqrt( max( 0.0, self._sumSq / self._n ) ) if self._n else 0.0
+
+    def getMin(self):
+        return self._minQ[0][1] if self._minQ else None
+
+    def getMax(self):
+        return self._maxQ[0][1] if self._maxQ else None
+
+    def getPeak(self):
+        """!
+        \~english @return max absolute value of window
+        \~chinese @return 窗口的最大绝对值
+        """
+        if not self._n: return None
+        return max( abs( self.getMin() ), abs( self.getMax() ) )
+
+    def getStats(self):
+        """!
+        \~english @return a dictionary: count, mean, variance, std, rms, min, max, peak
+        \~chinese @return 字典：count, mean, variance, std, rms, min, max, peak
+        """
+        return {
+            "count": self._n,
+            "mean": self.getMean(),
+            "variance": self.getVariance(),
+            "std": self.getStd(),
+            "rms": self.getRMS(),
+            "min": self.getMin(),
+            "max": self.getMax(),
+            "peak": self.getPeak(),
+        }
+
+class BoxcarDecimator:
+    """!
+    \~english
+    Boxcar ( moving average ) decimator: outputs the mean of every factor input values
+    \~chinese
+    矩形窗（滑动平均）抽取器：每 factor 个输入值输出一个均值
+    """
+    _factor = 1
+    _sum = 0.0
+    _n = 0
+
+    def __init__(self, factor):
+        if factor < 1:
+            raise ValueError("factor must be at least 1")
+        self._factor = factor
+        self.reset()
+
+    def reset(self):
+        self._sum = 0.0
+        self._n = 0
+
+    def update(self, value):
+        """!
+        \~english @return the output value, or None when no output for this input
+        \~chinese @return 输出值，该输入没有输出时为 None
+        """
+        self._sum += value
+        self._n += 1
+        if self._n < self._factor: return None
+        out = self._sum / self._factor
+        self._sum = 0.0
+        self._n = 0
+        return out
+
+    def updateBatch(self, values):
+        """!
+        \~english @return a list ( or a numpy array for numpy input ) of output values
+        \~chinese @return 输出值列表（numpy 输入时为 numpy 数组）
+        """
+        if numpy is None or not isinstance( values, numpy.ndarray ):
+            out = []
+            for value in values:
+                v = self.update( value )
+                if v != None: out.append( v )
+            return out
+
+        factor = self._factor
+        values = numpy.asarray( values, dtype = numpy.float64 )
+        # Complete the pending block first, then whole blocks vectorized
+        head = min( ( factor - self._n ) % factor, len( values ) )
+        out = []
+        for value in values[:head].tolist():
+            v = self.update( value )
+            if v != None: out.append( v )
+        rest = values[head:]
+        blocks = len( rest ) // factor
+        result = numpy.concatenate( ( numpy.array( out ), rest[:blocks * factor].reshape( blocks, factor ).mean( axis = 1 ) ) )
+        for value in rest[blocks * factor:].tolist():
+            self.update( value )
+        return result
+
+class CICDecimator:
+    """!
+    \~english
+    Cascaded integrator-comb decimator: order integrators at input rate, decimate by factor,
+    order combs at output rate. Output is normalized by gain factor ^ order, so it is in units of input.
+    Input values are quantized by scale ( eg. 1 for raw LSB values ) and integrated in wrapping
+    64-bit integers, so the filter is exact and the memory is fixed for streams of any length.
+
+    \~chinese
+    级联积分梳状抽取器：order 个积分器以输入速率工作，按 factor 抽取，order 个梳状器以输出速率工作。
+    输出按增益 factor ^ order 归一化，单位与输入相同。
+    输入值按 scale 量化（例如原始 LSB 值使用 1）并以回绕的 64 位整数积分，因此滤波是精确的，任意长度的数据流内存都固定。
+    """
+    _factor = 1
+    _order = 1
+    _scale = 1.0
+    _integrators = None
+    _combs = None
+    _n = 0
+
+    _MASK = ( 1 << 64 ) - 1
+    _SIGN = 1 << 63
+
+    def __init__(self, factor, order = 3, scale = 1000.0):
+        """!
+        \~english
+        @param factor: decimation factor
+        @param order: number of integrator and comb stages
+        @param scale: input values are multiplied by scale and rounded, eg. 1000 keeps 3 decimals
+        @note factor ^ order * max( |value| * scale ) must be less than 2^63
+        \~chinese
+        @param factor: 抽取因子
+        @param order: 积分器和梳状器级数
+        @param scale: 输入值乘以 scale 后取整，例如 1000 保留 3 位小数
+        @note factor ^ order * max( |value| * scale ) 必须小于 2^63
+        """
+        if factor < 1 or order < 1:
+            raise ValueError("factor and order must be at least 1")
+        self._factor = factor
+        self._order = order
+        self._scale = float( scale )
+        self.reset()
+
+    def reset(self):
+        self._integrators = [0] * self._order
+        self._combs = [0] * self._order
+        self._n = 0
+
+    def _wrap(self, value):
+        value &= self._MASK
+        return value - ( 1 << 64 ) if value & self._SIGN else value
+
+    def _comb(self, value):
+        combs = self._combs
+        for k in range( self._order ):
+            value, combs[k] = value - combs[k], value
+        return self._wrap( value ) / ( self._scale * self._factor ** self._order )
+
+    def update(self, value):
+        """!
+        \~english @return the output value, or None when no output for this input
+        \~chinese @return 输出值，该输入没有输出时为 None
+        """
+        acc = int( round( value * self._scale ) )
+        integrators = self._integrators
+        for k in range( self._order ):
+            acc = integrators[k] = ( integrators[k] + acc ) & self._MASK
+        self._n += 1
+        if self._n < self._factor: return None
+        self._n = 0
+        return self._comb( acc )
+
+    def updateBatch(self, values):
+        """!
+        \~english @return a list ( or a numpy array for numpy input ) of output values
+        \~chinese @return 输出值列表（numpy 输入时为 numpy 数组）
+        """
+        if numpy is None or not isinstance( values, numpy.ndarray ) or len( values ) == 0:
+            out = []
+            for value in values:
+                v = self.update( value )
+                if v != None: out.append( v )
+            return out
+
+        # Integrators by cumulative sums in wrapping int64 ( uint64 keeps overflow defined )
+        acc = numpy.rint( numpy.asarray( values, dtype = numpy.float64 ) * self._scale ).astype( numpy.int64 ).astype( numpy.uint64 )
+        integrators = self._integrators
+        for k in range( self._order ):
+            acc = numpy.cumsum( acc, dtype = numpy.uint64 ) + numpy.uint64( integrators[k] )
+            integrators[k] = int( acc[-1] )
+
+        # Decimate: output at every factor-th input, counting from the pending inputs
+        first = self._factor - self._n - 1
+        picked = acc[first::self._factor]
+        self._n = ( self._n + len( values ) ) % self._factor
+        return numpy.array( [ self._comb( int( v ) ) for v in picked.tolist() ] )
+
+class MotionStats:
+    """!
+    \~english
+    Rolling statistics of accelerometer ( x, y, z and magnitude, in g ) and gyroscope magnitude ( deg/s )
+    of a MPU6050 sample stream, over a sliding window of seconds.
+
+    \~chinese
+    MPU6050 样本流在以秒计的滑动窗口上的加速度计（x, y, z 和模长，单位 g）和陀螺仪模长（deg/s）滑动统计。
+
+    \~
+    @note
+    <pre>
+    stats = MotionStats( mpu.getSampleRate(), window = 1.0 )
+    stats.updateBatch( mpu.readFifoArray() )
+    print( stats.getStats()["accel"]["rms"] )
+    </pre>
+    """
+    _gravityFactor = None
+    _channels = None
+
+    CHANNELS = ( "accel_x", "accel_y", "accel_z", "accel", "gyro" )
+
+    def __init__(self, sampleRate, window = 1.0, gravityFactor = GRAVITIY_EARTH):
+        """!
+        \~english
+        @param sampleRate: sample rate of input in Hz
+        @param window: length of sliding window in seconds
+        @param gravityFactor: gravity factor of MPU6050
+        \~chinese
+        @param sampleRate: 输入采样率 Hz
+        @param window: 滑动窗口长度，单位秒
+        @param gravityFactor: MPU6050 的重力系数
+        """
+        size = max( 1, int( round( sampleRate * window ) ) )
+        self._gravityFactor = gravityFactor
+        self._channels = dict( ( name, RollingStats( size ) ) for name in self.CHANNELS )
+
+    def reset(self):
+        for stats in self._channels.values():
+            stats.reset()
+
+    def update(self, sample):
+        """!
+        \~english @param sample: a MPUSample, None ( readFifo ) or NaN fields are skipped
+        \~chinese @param sample: MPUSample，跳过 None（readFifo）或 NaN 字段
+        """
+        channels = self._channels
+        if sample[1] != None:
+            g = self._gravityFactor
+            ax, ay, az = sample[1] / g, sample[2] / g, sample[3] / g
+            channels["accel_x"].update( ax )
+            channels["accel_y"].update( ay )
+            channels["accel_z"].update( az )
+            channels["accel"].update( math.sqrt( ax * ax + ay * ay + az * az ) )
+        if sample[5] != None:
+            gx, gy, gz = sample[5], sample[6], sample[7]
+            channels["gyro"].update( math.sqrt( gx * gx + gy * gy + gz * gz ) )
+
+    def updateBatch(self, samples):
+        """!
+        \~english @param samples: a list of MPUSample, or a numpy structured array ( MPU_SAMPLE_DTYPE ) for vectorized update
+        \~chinese @param samples: MPUSample 列表，或 numpy 结构化数组（MPU_SAMPLE_DTYPE）以向量化更新
+        """
+        if numpy is None or not isinstance( samples, numpy.ndarray ):
+            for sample in samples:
+                self.update( sample )
+            return
+        g = self._gravityFactor
+        ax = samples["accel_x"] / g
+        ay = samples["accel_y"] / g
+        az = samples["accel_z"] / g
+        channels = self._channels
+        channels["accel_x"].updateBatch( ax )
+        channels["accel_y"].updateBatch( ay )
+        channels["accel_z"].updateBatch( az )
+        channels["accel"].updateBatch( numpy.sqrt( ax * ax + ay * ay + az * az ) )
+        channels["gyro"].updateBatch( numpy.sqrt( samples["gyro_x"] ** 2 + samples["gyro_y"] ** 2 + samples["gyro_z"] ** 2 ) )
+
+    def getChannel(self, name):
+        """!
+        \~english @return RollingStats of a channel, name is one of MotionStats.CHANNELS
+        \~chinese @return 通道的 RollingStats，name 为 MotionStats.CHANNELS 之一
+        """
+        return self._channels[name]
+
+    def getStats(self):
+        """!
+        \~english @return a dictionary { channel: RollingStats#getStats() }
+        \~chinese @return 字典 { channel: RollingStats#getStats() }
+        """
+        return dict( ( name, stats.getStats() ) for name, stats in self._channels.items() )
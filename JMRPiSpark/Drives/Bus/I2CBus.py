@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# I2C Bus Manager
+# Shared I2C bus handles with locking, per-device statistics and a poll scheduler
+# 共享的 I2C 总线句柄，带锁、按设备统计和轮询调度
+#
+# @version v1.0.0
+#
+
+import heapq
+import threading
+import time
+
+try:
+    import smbus
+except ImportError:
+    # Allow import off the Raspberry Pi, smbus is only needed to open a bus
+    smbus = None
+
+class SharedI2CBus:
+    """!
+    \~english
+    An smbus compatible handle of one I2C bus shared by all devices on it.
+    Every transaction is serialized by the lock of the bus, use SharedI2CBus#transaction
+    to keep the bus across several transactions. Bus time is counted per device address.
+
+    \~chinese
+    一条 I2C 总线上所有设备共享的兼容 smbus 的句柄。
+    每次传输都由总线锁串行化，使用 SharedI2CBus#transaction 在多次传输期间保持总线。按设备地址统计总线时间。
+    """
+    _busId = None
+    _bus = None
+    _lock = None
+    _stats = None
+    _statsStart = None
+
+    def __init__(self, busId, bus = None):
+        """!
+        \~english
+        @param busId: I2C bus id
+        @param bus: an smbus compatible bus object, None means smbus.SMBus( busId )
+        \~chinese
+        @param busId: I2C 总线 ID
+        @param bus: 兼容 smbus 的总线对象，None 表示 smbus.SMBus( busId )
+        """
+        if bus == None:
+            if smbus == None:
+                raise ImportError("smbus is required to open I2C bus {}".format( busId ))
+            bus = smbus.SMBus( busId )
+        self._busId = busId
+        self._bus = bus
+        self._lock = threading.RLock()
+        self.resetStats()
+
+    def getBusId(self):
+        return self._busId
+
+    def transaction(self):
+        """!
+        \~english
+        Keep the bus for several transactions
+        @return the lock of bus, use it in a with statement
+        \~chinese
+        在多次传输期间保持总线
+        @return 总线锁，在 with 语句中使用
+        """
+        return self._lock
+
+    def _count(self, address, start, read, written):
+        stats = self._stats.get( address )
+        if stats == None:
+            stats = self._stats[address] = { "transactions": 0, "bytes_read": 0, "bytes_written": 0, "busy_time": 0.0 }
+        stats["transactions"] += 1
+        stats["bytes_read"] += read
+        stats["bytes_written"] += written
+        stats["busy_time"] += time.time() - start
+
+    def read_byte_data(self, address, register):
+        with self._lock:
+            start = time.time()
+            value = self._bus.read_byte_data( address, register )
+            self._count( address, start, 1, 0 )
+            return value
+
+    def read_i2c_block_data(self, address, register, length):
+        with self._lock:
+            start = time.time()
+            data = self._bus.read_i2c_block_data( address, register, length )
+            self._count( address, start, length, 0 )
+            return data
+
+    def write_byte_data(self, address, register, value):
+        with self._lock:
+            start = time.time()
+            self._bus.write_byte_data( address, register, value )
+            self._count( address, start, 0, 1 )
+
+    def write_i2c_block_data(self, address, register, data):
+        with self._lock:
+            start = time.time()
+            self._bus.write_i2c_block_data( address, register, data )
+            self._count( address, start, 0, len(data) )
+
+    def getStats(self):
+        """!
+        \~english
+        Get bus statistics per device
+        @return a dictionary { address: { "transactions", "bytes_read", "bytes_written", "busy_time", "utilisation" } },
+                busy_time in seconds, utilisation is busy_time / time since statistics reset
+        \~chinese
+        按设备读取总线统计数据
+        @return 字典 { address: { "transactions", "bytes_read", "bytes_written", "busy_time", "utilisation" } }，
+                busy_time 单位秒，utilisation 为 busy_time / 统计复位以来的时间
+        """
+        with self._lock:
+            elapsed = max( time.time() - self._statsStart, 1e-9 )
+            result = {}
+            for address, stats in self._stats.items():
+                result[address] = dict( stats, utilisation = stats["busy_time"] / elapsed )
+            return result
+
+    def resetStats(self):
+        with self._lock:
+            self._stats = {}
+            self._statsStart = time.time()
+
+    def close(self):
+        """!
+        \~english Close the underlying bus, use I2CBusManager#releaseBus for a shared bus
+        \~chinese 关闭底层总线，共享总线请使用 I2CBusManager#releaseBus
+        """
+        with self._lock:
+            if hasattr( self._bus, "close" ): self._bus.close()
+
+class I2CPollTask:
+    """!
+    \~english A periodic task of I2CPollScheduler, created by I2CPollScheduler#addTask
+    \~chinese I2CPollScheduler 的周期任务，由 I2CPollScheduler#addTask 创建
+    """
+    name = None
+    callback = None
+    period = None
+    runs = 0
+    missed = 0
+    errors = 0
+    busyTime = 0.0
+    _next = None
+    _active = True
+
+    def __init__(self, name, callback, rate):
+        self.name = name
+        self.callback = callback
+        self.period = 1.0 / rate
+
+    def getStats(self):
+        return { "runs": self.runs, "missed": self.missed, "errors": self.errors, "busy_time": self.busyTime }
+
+class I2CPollScheduler:
+    """!
+    \~english
+    Run periodic reads of several devices in one thread, each task has its own rate.
+    Tasks are kept in a heap ordered by deadline, so one loop serves all devices.
+
+    \~chinese
+    在一个线程中执行多个设备的周期读取，每个任务有各自的频率。任务按截止时间保存在堆中，一个循环服务所有设备。
+
+    \~
+    @note
+    <pre>
+    scheduler = I2CPollScheduler()
+    scheduler.addTask( "imu0", lambda: buf0.write( *imu0.getSample() ), 200 )
+    scheduler.addTask( "imu1", lambda: buf1.write( *imu1.getSample() ), 50 )
+    scheduler.start()
+    </pre>
+    """
+    _tasks = None
+    _heap = None
+    _lock = None
+    _wakeup = None
+    _thread = None
+    _stop = False
+    _seq = 0
+
+    def __init__(self):
+        self._tasks = {}
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition( self._lock )
+
+    def addTask(self, name, callback, rate):
+        """!
+        \~english
+        Add a periodic task
+        @param name: name of task
+        @param callback: a function called without argument on each period, eg. reading a device
+        @param rate: rate in Hz
+        @return an I2CPollTask
+        \~chinese
+        添加周期任务
+        @param name: 任务名称
+        @param callback: 每个周期调用的无参数函数，例如读取设备
+        @param rate: 频率 Hz
+        @return I2CPollTask
+        """
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        task = I2CPollTask( name, callback, rate )
+        with self._lock:
+            if name in self._tasks:
+                self._tasks[name]._active = False
+            self._tasks[name] = task
+            task._next = time.time()
+            self._push( task )
+            self._wakeup.notify()
+        return task
+
+    def removeTask(self, name):
+        with self._lock:
+            task = self._tasks.pop( name, None )
+            if task != None: task._active = False
+
+    def getTask(self, name):
+        return self._tasks.get( name )
+
+    def _push(self, task):
+        # The sequence number keeps heap entries comparable when deadlines are equal
+        self._seq += 1
+        heapq.heappush( self._heap, ( task._next, self._seq, task ) )
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._stop:
+                    if self._heap:
+                        delay = self._heap[0][0] - time.time()
+                        if delay <= 0: break
+                        self._wakeup.wait( delay )
+                    else:
+                        self._wakeup.wait()
+                if self._stop: return
+                deadline, _, task = heapq.heappop( self._heap )
+                if not task._active: continue
+
+            start = time.time()
+            try:
+                task.callback()
+            except Exception:
+                # A failing device must not stop polling of other devices
+                task.errors += 1
+            end = time.time()
+            task.runs += 1
+            task.busyTime += end - start
+
+            task._next = deadline + task.period
+            if end - task._next > task.period:
+                # Too late, skip missed periods instead of bursting
+                skipped = int( ( end - task._next ) / task.period )
+                task.missed += skipped
+                task._next += skipped * task.period
+            with self._lock:
+                if task._active: self._push( task )
+
+    def start(self):
+        """!
+        \~english Start the poll thread
+        \~chinese 启动轮询线程
+        """
+        if self._thread != None: return
+        self._stop = False
+        self._thread = threading.Thread( target = self._run, name = "I2CPollScheduler" )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """!
+        \~english Stop the poll thread
+        \~chinese 停止轮询线程
+        """
+        if self._thread == None: return
+        with self._lock:
+            self._stop = True
+            self._wakeup.notify()
+        self._thread.join()
+        self._thread = None
+
+    def getStats(self):
+        """!
+        \~english @return a dictionary { name: task statistics }
+        \~chinese @return 字典 { name: 任务统计 }
+        """
+        return dict( ( name, task.getStats() ) for name, task in self._tasks.items() )
+
+class I2CBusManager:
+    """!
+    \~english
+    Registry of shared I2C buses, one SharedI2CBus per bus id.
+    Use getI2CBusManager() to get the process-wide instance.
+
+    \~chinese
+    共享 I2C 总线注册表，每个总线 ID 一个 SharedI2CBus。使用 getI2CBusManager() 获取进程范围的实例。
+    """
+    _buses = None
+    _users = None
+    _lock = None
+
+    def __init__(self):
+        self._buses = {}
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def getBus(self, busId):
+        """!
+        \~english
+        Get the shared handle of a bus, the bus is opened on first use
+        @param busId: I2C bus id
+        @return a SharedI2CBus
+        \~chinese
+        获取总线的共享句柄，首次使用时打开总线
+        @param busId: I2C 总线 ID
+        @return SharedI2CBus
+        """
+        with self._lock:
+            bus = self._buses.get( busId )
+            if bus == None:
+                bus = self._buses[busId] = SharedI2CBus( busId )
+                self._users[busId] = 0
+            self._users[busId] += 1
+            return bus
+
+    def releaseBus(self, busId):
+        """!
+        \~english Release a handle got by I2CBusManager#getBus, the bus is closed when no user left
+        \~chinese 释放由 I2CBusManager#getBus 获取的句柄，没有使用者时关闭总线
+        """
+        with self._lock:
+            if busId not in self._buses: return
+            self._users[busId] -= 1
+            if self._users[busId] <= 0:
+                self._buses.pop( busId ).close()
+                del self._users[busId]
+
+    def getStats(self):
+        """!
+        \~english @return a dictionary { busId: { address: device statistics } }, see SharedI2CBus#getStats
+        \~chinese @return 字典 { busId: { address: 设备统计 } }，参见 SharedI2CBus#getStats
+        """
+        with self._lock:
+            buses = list( self._buses.items() )
+        return dict( ( busId, bus.getStats() ) for busId, bus in buses )
+
+_manager = None
+_managerLock = threading.Lock()
+
+def getI2CBusManager():
+    """!
+    \~english @return the process-wide I2CBusManager
+    \~chinese @return 进程范围的 I2CBusManager
+    """
+    global _manager
+    with _managerLock:
+        if _manager == None:
+            _manager = I2CBusManager()
+        return _manager
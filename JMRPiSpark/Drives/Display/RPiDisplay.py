@@ -29,7 +29,18 @@
 #    v1.0.0    2018.3.20
 #
 
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # Virtual displays do not need GPIO, so allow import off the Raspberry Pi
+    GPIO = None
+
+## Native pixel format: 1 bit per pixel, PIL Image mode "1"
+DSP_PIXEL_FORMAT_MONO   = "1"
+## Native pixel format: 8 bits per channel, PIL Image mode "RGB"
+DSP_PIXEL_FORMAT_RGB    = "RGB"
+## Native pixel format: 16 bits per pixel, 5-6-5 bits RGB, big-endian
+DSP_PIXEL_FORMAT_RGB565 = "RGB565"
 
 class RPiDiaplay:
     """!
@@ -37,10 +48,34 @@ class RPiDiaplay:
     You need to create a subclass from inherit it and 
     use the new subclass implement initialization and 
     operations of display chip.
+
+    The subclass advertises what the display chip can do by the CAP_* attributes,
+    a screen reads them once by RPiDiaplay#getCapabilities and chooses the fastest 
+    way to update the display.
     """
     width = None
     height = None
 
+    ##
+    # Native pixel format, it can be chosen:
+    # DSP_PIXEL_FORMAT_MONO, DSP_PIXEL_FORMAT_RGB, DSP_PIXEL_FORMAT_RGB565
+    CAP_PIXEL_FORMAT    = None
+    ##
+    # True - supported RPiDiaplay#displayChanged, only the changed window of buffer is sent
+    CAP_PARTIAL_UPDATE  = False
+    ##
+    # Rotation angles done by the display chip, see RPiDiaplay#setRotation
+    CAP_HW_ROTATION     = (0,)
+    ##
+    # True - supported RPiDiaplay#setMirror
+    CAP_HW_MIRROR       = False
+    ##
+    # True - display chip can scroll the content by itself
+    CAP_HW_SCROLL       = False
+    ##
+    # Max bytes of one bus transfer, None means no limit
+    CAP_MAX_TRANSFER    = None
+
     # SPI interface
     _spi        = None
     _spi_mosi   = None
@@ -175,4 +210,44 @@ class RPiDiaplay:
         waitting for subclasses implement
         """
         raise NotImplementedError
+
+    def getCapabilities(self):
+        """!
+        Get capabilities of display
+        @return a dictionary, eg. 
+            { "pixel_format": "1", "partial_update": True, "hw_rotation": (0, 180), 
+              "hw_mirror": True, "hw_scroll": True, "max_transfer": 4096 }
+        """
+        return {
+            "pixel_format": self.CAP_PIXEL_FORMAT,
+            "partial_update": self.CAP_PARTIAL_UPDATE,
+            "hw_rotation": self.CAP_HW_ROTATION,
+            "hw_mirror": self.CAP_HW_MIRROR,
+            "hw_scroll": self.CAP_HW_SCROLL,
+            "max_transfer": self.CAP_MAX_TRANSFER,
+        }
+
+    def displayChanged(self):
+        """!
+        Send only the window of buffer which changed since last transfer to display.
+        The display must advertise CAP_PARTIAL_UPDATE.
+        waitting for subclasses implement
+        """
+        raise NotImplementedError
+
+    def setRotation(self, angle):
+        """!
+        Rotate the display content by display chip.
+        @param angle: one of CAP_HW_ROTATION
+        waitting for subclasses implement
+        """
+        raise NotImplementedError
+
+    def setMirror(self, mirrorH, mirrorV):
+        """!
+        Mirror the display content by display chip.
+        The display must advertise CAP_HW_MIRROR.
+        waitting for subclasses implement
+        """
+        raise NotImplementedError
         
\ No newline at end of file
@@ -29,10 +29,23 @@
 #    v1.0.0    2018.3.20
 #
 
-import RPi.GPIO as GPIO
-import spidev
+import time
+from binascii import hexlify
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # Virtual displays do not need GPIO, so allow import off the Raspberry Pi
+    GPIO = None
+
+try:
+    import spidev
+except ImportError:
+    spidev = None
+
 from PIL import Image
 from .RPiDisplay import RPiDiaplay
+from .RPiDisplay import DSP_PIXEL_FORMAT_MONO
 
 class SSD1306Base( RPiDiaplay ):
     """!
@@ -98,6 +111,15 @@ class SSD1306Base( RPiDiaplay ):
     # scroll function (command 29/2Ah), the number of rows that in vertical 
     # scrolling can be set smaller or equal to the MUX ratio.
     CMD_SSD1306_SET_SCROLL_VERTICAL_AREA= 0xA3
+
+    # Display capabilities
+    CAP_PIXEL_FORMAT    = DSP_PIXEL_FORMAT_MONO
+    CAP_PARTIAL_UPDATE  = True
+    CAP_HW_ROTATION     = (0, 180)
+    CAP_HW_MIRROR       = True
+    CAP_HW_SCROLL       = True
+    # Default buffer size of spidev writebytes()
+    CAP_MAX_TRANSFER    = 4096
     
     ## 
     # \~english mirror horizontal (boolean)
@@ -111,6 +133,15 @@ class SSD1306Base( RPiDiaplay ):
     # \~english buffer page (int)
     # \~chinese 显存分页 (int)
     _mem_pages = None
+    ## 
+    # \~english rotation angle done by display chip, 0 or 180
+    # \~chinese 显示芯片完成的旋转角度, 0 或 180
+    _hw_rotation = 0
+    ## 
+    # \~english copy of buffer data of last transfer, None means unknown
+    # \~chinese 最后一次传输的缓冲区数据副本, None 表示未知
+    _last_buffer = None
+    _initialized = False
 
     def _command(self, commands):
         """!
@@ -138,7 +169,11 @@ class SSD1306Base( RPiDiaplay ):
         """
         if self._spi == None: raise "Do not setting SPI"
         GPIO.output( self._spi_dc, 1 )
-        self._spi.writebytes( data )
+        if isinstance(data, int) or len(data) <= self.CAP_MAX_TRANSFER:
+            self._spi.writebytes( data )
+            return
+        for i in range(0, len(data), self.CAP_MAX_TRANSFER):
+            self._spi.writebytes( data[i:i + self.CAP_MAX_TRANSFER] )
 
     def _display_buffer(self, buffer ):
         """!
@@ -157,6 +192,25 @@ class SSD1306Base( RPiDiaplay ):
             0, self._mem_pages - 1
             ])
         self._data( buffer )
+        self._last_buffer = bytearray(buffer)
+
+    def _mirror_commands(self):
+        """!
+        \~english
+        Commands of COM output scan direction and segment re-map for current mirror and rotation
+        \~chinese
+        根据当前镜像和旋转设定生成 COM 扫描方向和段重映射命令
+        """
+        mirrorH = bool(self._mirror_h) != (self._hw_rotation == 180)
+        mirrorV = bool(self._mirror_v) != (self._hw_rotation == 180)
+        return [
+            # 0xC0 / 0xC8 Set COM Output Scan Direction
+            self.CMD_SSD1306_SCAN_DIRECTION_INC if mirrorV else self.CMD_SSD1306_SCAN_DIRECTION_DEC,
+            # 0xA0 / oxA1 Set Segment re-map
+            # 0xA0    left to right
+            # 0xA1    right to left
+            self.CMD_SSD1306_SET_SEGMENT_REMAP_0 if mirrorH else self.CMD_SSD1306_SET_SEGMENT_REMAP_1,
+        ]
 
     def _init_display(self):
         """!
@@ -199,17 +253,8 @@ class SSD1306Base( RPiDiaplay ):
             # 0x20 Set Page Addressing Mode (0x00/0x01/0x02)
             self.CMD_SSD1306_SET_MEM_ADDR_MODE,
             0x01,
-  
-            # 0xC0 / 0xC8 Set COM Output Scan Direction
-            #CMD_SSD1306_SCAN_DIRECTION_INC,
-            #CMD_SSD1306_SCAN_DIRECTION_DEC,
-            self.CMD_SSD1306_SCAN_DIRECTION_INC if self._mirror_v else self.CMD_SSD1306_SCAN_DIRECTION_DEC,
-  
-            # 0xA0 / oxA1 Set Segment re-map
-            # 0xA0    left to right
-            # 0xA1    right to left
-            self.CMD_SSD1306_SET_SEGMENT_REMAP_0 if self._mirror_h else self.CMD_SSD1306_SET_SEGMENT_REMAP_1,
-        ])
+        ] + self._mirror_commands() )
+        self._last_buffer = None
 
     def init(self):
         """!
@@ -221,6 +266,7 @@ class SSD1306Base( RPiDiaplay ):
         self._init_io()
         self.reset()
         self._init_display()
+        self._initialized = True
 
     def clear(self, fill = 0x00):
         """!
@@ -341,6 +387,97 @@ class SSD1306Base( RPiDiaplay ):
                 self._buffer[bi] = pixBits
                 bi += 1
 
+    def displayChanged(self):
+        """!
+        \~english
+        Write only the changed window of buffer to physical display.
+        The buffer is compared with the data of last transfer, then the smallest
+        window of columns and pages which contains all changed bytes is sent.
+        If nothing changed, nothing is sent.
+
+        \~chinese
+        仅将缓冲区中改变的窗口写入物理显示屏。
+        缓冲区与最后一次传输的数据比较，然后发送包含所有改变字节的最小列和页窗口。
+        如果没有任何改变，则不发送数据。
+        """
+        buffer = self._buffer
+        last = self._last_buffer
+        if last is None or len(last) != len(buffer):
+            self._display_buffer( buffer )
+            return
+
+        # All comparisons run on bytes in C, not per byte in Python
+        data = bytearray(buffer)
+        if data == last: return
+
+        # The buffer is column by column, so a page is every pages-th byte
+        pages = self._mem_pages
+        changedPages = [ p for p in range(pages) if data[p::pages] != last[p::pages] ]
+        pageStart = changedPages[0]
+        pageEnd = changedPages[-1]
+
+        # First and last changed bytes from the XOR of both buffers as big integers
+        size = len(data)
+        diff = int(hexlify(data), 16) ^ int(hexlify(last), 16)
+        colStart = (size - 1 - ((diff.bit_length() - 1) >> 3)) // pages
+        colEnd = (size - 1 - (((diff & -diff).bit_length() - 1) >> 3)) // pages
+
+        self._command([
+            self.CMD_SSD1306_SET_COLUMN_ADDR,
+            colStart, colEnd,
+            self.CMD_SSD1306_SET_PAGE_ADDR,
+            pageStart, pageEnd
+            ])
+        # Vertical addressing mode, the buffer keeps the same order as display RAM
+        if pageStart == 0 and pageEnd == pages - 1:
+            self._data( buffer[ colStart * pages : (colEnd + 1) * pages ] )
+        else:
+            window = bytearray()
+            for c in range(colStart * pages, (colEnd + 1) * pages, pages):
+                window += data[ c + pageStart : c + pageEnd + 1 ]
+            self._data( window )
+        self._last_buffer = data
+
+    def setRotation(self, angle):
+        """!
+        \~english
+        Rotate the display content by display chip
+        @param angle: 0 or 180
+        @note The segment re-map only affects subsequent data input, so the whole
+              buffer is written again at next display() or displayChanged()
+
+        \~chinese
+        使用显示芯片旋转显示内容
+        @param angle: 0 或 180
+        @note 段重映射仅影响之后写入的数据，所以下一次 display() 或 displayChanged() 将重新写入整个缓冲区
+        """
+        if angle not in self.CAP_HW_ROTATION:
+            raise ValueError("SSD1306 only supported rotation: 0 or 180")
+        self._hw_rotation = angle
+        self._update_mirror()
+
+    def setMirror(self, mirrorH, mirrorV):
+        """!
+        \~english
+        Mirror the display content by display chip
+        @param mirrorH: The displayed image flips horizontal
+        @param mirrorV: The displayed image flips vertically
+
+        \~chinese
+        使用显示芯片镜像显示内容
+        @param mirrorH: 显示屏水平镜向显示
+        @param mirrorV: 显示屏垂直镜向显示
+        """
+        self._mirror_h = mirrorH
+        self._mirror_v = mirrorV
+        self._update_mirror()
+
+    def _update_mirror(self):
+        self._last_buffer = None
+        # Before init() the settings are sent by _init_display()
+        if self._initialized:
+            self._command( self._mirror_commands() )
+
     def scrollOn(self):
         """!
         \~english 
@@ -0,0 +1,652 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+#    Virtual ( headless ) displays
+#    v1.0.0
+#
+#    Run the display and screen pipeline without display hardware,
+#    eg. on CI servers or for benchmark
+#    无需显示屏硬件即可运行显示和屏幕程序，例如：CI 服务器或性能测试
+#
+
+from PIL import Image
+from PIL import ImageChops
+
+from .RPiDisplay import RPiDiaplay
+from .RPiDisplay import DSP_PIXEL_FORMAT_RGB
+from .RPiDisplay import DSP_PIXEL_FORMAT_RGB565
+from .SSD1306 import SSD1306_128x64
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## Traffic record type of command bytes ( DC pin is LOW )
+VD_TRAFFIC_COMMAND  = "cmd"
+## Traffic record type of data bytes ( DC pin is HIGH )
+VD_TRAFFIC_DATA     = "data"
+
+def _toBytes(data):
+    """!
+    \~english Convert a byte or an array of bytes to bytearray
+    \~chinese 将一个字节或字节数组转换为 bytearray
+    """
+    if isinstance(data, int):
+        return bytearray([data & 0xFF])
+    return bytearray(data)
+
+class SSD1306Simulator:
+    """!
+    \~english
+    A simulated SSD1306 controller.
+    It interprets the command / data stream of SSD1306 into an in-memory GRAM,
+    supported: memory addressing modes, column and page address, display start line,
+    display offset, segment remap, COM scan direction, contrast, inverse, display on/off
+    and scroll setup.
+
+    \~chinese
+    模拟的 SSD1306 控制器。
+    它将 SSD1306 的命令 / 数据流解析到内存中的 GRAM，
+    支持：内存寻址模式，列和页地址，显示起始行，显示偏移，段重映射，COM 扫描方向，
+    对比度，反显，开关显示和滚屏设置。
+    """
+    ADDR_MODE_HORIZONTAL    = 0x00
+    ADDR_MODE_VERTICAL      = 0x01
+    ADDR_MODE_PAGE          = 0x02
+
+    # Number of parameter bytes for each command which has parameters
+    # SSD1306 datasheet, 9 COMMAND TABLE
+    _CMD_ARGS = {
+        0x20: 1,    # Set Memory Addressing Mode
+        0x21: 2,    # Set Column Address
+        0x22: 2,    # Set Page Address
+        0x26: 6,    # Horizontal Scroll Setup ( right )
+        0x27: 6,    # Horizontal Scroll Setup ( left )
+        0x29: 5,    # Vertical and Right Horizontal Scroll Setup
+        0x2A: 5,    # Vertical and Left Horizontal Scroll Setup
+        0x81: 1,    # Set Contrast Control
+        0x8D: 1,    # Charge Pump Setting
+        0xA3: 2,    # Set Vertical Scroll Area
+        0xA8: 1,    # Set Multiplex Ratio
+        0xD3: 1,    # Set Display Offset
+        0xD5: 1,    # Set Display Clock Divide Ratio
+        0xD9: 1,    # Set Pre-charge Period
+        0xDA: 1,    # Set COM Pins Hardware Configuration
+        0xDB: 1,    # Set VCOMH Deselect Level
+    }
+
+    width = None
+    height = None
+    pages = None
+
+    ##
+    # \~english graphic display data RAM, indexed by [ page * width + column on panel ]
+    # \~chinese 显存 GRAM, 索引方式 [ page * width + 屏幕上的列 ]
+    gram = None
+
+    def __init__(self, width = 128, height = 64):
+        """!
+        \~english
+        Initialize the simulated controller
+        @param width: width of panel in pixel
+        @param height: height of panel in pixel, must be a multiple of 8
+
+        \~chinese
+        初始化模拟控制器
+        @param width: 屏幕宽度（像素）
+        @param height: 屏幕高度（像素），必须是 8 的倍数
+        """
+        if height % 8 != 0:
+            raise ValueError("The height of SSD1306 must be a multiple of 8")
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.reset()
+
+    def reset(self):
+        """!
+        \~english Reset controller registers to the power on state. GRAM is cleared.
+        \~chinese 复位控制器寄存器到上电状态，并清除 GRAM
+        """
+        self.gram = bytearray(self.width * self.pages)
+
+        self.addrMode = self.ADDR_MODE_PAGE
+        self.colStart = 0
+        self.colEnd = self.width - 1
+        self.pageStart = 0
+        self.pageEnd = self.pages - 1
+        self.col = 0
+        self.page = 0
+
+        self.startLine = 0
+        self.displayOffset = 0
+        self.muxRatio = self.height
+        self.contrast = 0x7F
+        self.segRemap = False
+        self.comScanDec = False
+        self.inverse = False
+        self.entireOn = False
+        self.displayOn = False
+        self.chargePump = False
+
+        self.scrollActive = False
+        self.scrollDirection = 1
+        self.scrollStartPage = 0
+        self.scrollEndPage = self.pages - 1
+        self.scrollInterval = 0
+        self.scrollVOffset = 0
+        self.scrollAreaTop = 0
+        self.scrollAreaRows = self.height
+        self.scrollSteps = 0
+
+        self._cmd = None
+        self._args = []
+
+    def command(self, commands):
+        """!
+        \~english
+        Feed command bytes to controller ( DC pin is LOW )
+        @param commands: a byte or an array of bytes
+        \~chinese
+        向控制器发送命令字节（DC 为低电平）
+        @param commands: 一个字节或字节数组
+        """
+        for b in _toBytes(commands):
+            if self._cmd is not None:
+                self._args.append(b)
+                if len(self._args) >= self._CMD_ARGS[self._cmd]:
+                    self._execute(self._cmd, self._args)
+                    self._cmd = None
+                    self._args = []
+            elif b in self._CMD_ARGS:
+                self._cmd = b
+                self._args = []
+            else:
+                self._execute(b, [])
+
+    def data(self, data):
+        """!
+        \~english
+        Feed data bytes to controller ( DC pin is HIGH ), data is written into GRAM
+        at the current address, then the address advances by the addressing mode
+        @param data: a byte or an array of bytes
+        \~chinese
+        向控制器发送数据字节（DC 为高电平），数据写入当前地址的 GRAM，然后按寻址模式移动地址
+        @param data: 一个字节或字节数组
+        """
+        gram = self.gram
+        width = self.width
+        for b in _toBytes(data):
+            # Segment remap only affects subsequent data input, GRAM keeps the
+            # segment order ( SSD1306 datasheet, 10.1.8 ). Panels are mounted so that
+            # A1 ( remap on ) is upright, GRAM is kept in the order seen on panel
+            col = self.col if self.segRemap else (width - 1 - self.col)
+            gram[self.page * width + col] = b
+            self._advance()
+
+    def _advance(self):
+        if self.addrMode == self.ADDR_MODE_VERTICAL:
+            self.page += 1
+            if self.page > self.pageEnd:
+                self.page = self.pageStart
+                self.col += 1
+                if self.col > self.colEnd:
+                    self.col = self.colStart
+        elif self.addrMode == self.ADDR_MODE_HORIZONTAL:
+            self.col += 1
+            if self.col > self.colEnd:
+                self.col = self.colStart
+                self.page += 1
+                if self.page > self.pageEnd:
+                    self.page = self.pageStart
+        else:
+            # Page addressing mode, page address pointer is not changed
+            self.col += 1
+            if self.col > self.colEnd:
+                self.col = self.colStart
+
+    def _execute(self, cmd, args):
+        if cmd == 0x20:
+            self.addrMode = args[0] & 0x03
+        elif cmd == 0x21:
+            self.colStart = args[0] % self.width
+            self.colEnd = args[1] % self.width
+            self.col = self.colStart
+        elif cmd == 0x22:
+            self.pageStart = args[0] % self.pages
+            self.pageEnd = args[1] % self.pages
+            self.page = self.pageStart
+        elif cmd in (0x26, 0x27):
+            self.scrollDirection = 1 if cmd == 0x26 else -1
+            self.scrollStartPage = args[1] & 0x07
+            self.scrollInterval = args[2] & 0x07
+            self.scrollEndPage = args[3] & 0x07
+            self.scrollVOffset = 0
+        elif cmd in (0x29, 0x2A):
+            self.scrollDirection = 1 if cmd == 0x29 else -1
+            self.scrollStartPage = args[1] & 0x07
+            self.scrollInterval = args[2] & 0x07
+            self.scrollEndPage = args[3] & 0x07
+            self.scrollVOffset = args[4] & 0x3F
+        elif cmd == 0x2E:
+            # After deactivating, the RAM data needs to be rewritten
+            self.scrollActive = False
+            self.scrollSteps = 0
+        elif cmd == 0x2F:
+            self.scrollActive = True
+            self.scrollSteps = 0
+        elif 0x40 <= cmd <= 0x7F:
+            self.startLine = cmd & 0x3F
+        elif cmd == 0x81:
+            self.contrast = args[0]
+        elif cmd == 0x8D:
+            self.chargePump = (args[0] & 0x04) != 0
+        elif cmd in (0xA0, 0xA1):
+            self.segRemap = cmd == 0xA1
+        elif cmd == 0xA3:
+            self.scrollAreaTop = args[0] & 0x3F
+            self.scrollAreaRows = args[1] & 0x7F
+        elif cmd in (0xA4, 0xA5):
+            self.entireOn = cmd == 0xA5
+        elif cmd in (0xA6, 0xA7):
+            self.inverse = cmd == 0xA7
+        elif cmd == 0xA8:
+            self.muxRatio = (args[0] & 0x3F) + 1
+        elif cmd in (0xAE, 0xAF):
+            self.displayOn = cmd == 0xAF
+        elif 0xB0 <= cmd <= 0xB7:
+            self.page = (cmd & 0x07) % self.pages
+        elif cmd in (0xC0, 0xC8):
+            self.comScanDec = cmd == 0xC8
+        elif cmd == 0xD3:
+            self.displayOffset = args[0] & 0x3F
+        elif cmd <= 0x0F:
+            self.col = ((self.col & 0xF0) | cmd) % self.width
+        elif cmd <= 0x1F:
+            self.col = ((self.col & 0x0F) | ((cmd & 0x0F) << 4)) % self.width
+        # Other commands ( timing, pre-charge, VCOMH, etc. ) do not change the picture
+
+    def scrollStep(self, steps = 1):
+        """!
+        \~english
+        Advance the active hardware scroll by steps. The simulator has no clock,
+        so the caller decides when a scroll step happens.
+        @param steps: number of scroll steps
+        \~chinese
+        将硬件滚屏前进指定步数。模拟器没有时钟，由调用者决定何时滚动一步。
+        @param steps: 滚动步数
+        """
+        if self.scrollActive:
+            self.scrollSteps += steps
+
+    def getPixel(self, x, y):
+        """!
+        \~english
+        Get pixel which is visible on panel at (x, y)
+        @return 0 or 1
+        \~chinese
+        读取屏幕上 (x, y) 位置可见的像素
+        @return 0 或 1
+        """
+        if not self.displayOn: return 0
+        if self.entireOn: return 1
+
+        rows = self.pages * 8
+        # C8 ( scan from COM[N-1] to COM0 ) is upright on mounted panels
+        com = y if self.comScanDec else (self.muxRatio - 1 - y)
+        row = (com + self.displayOffset + self.startLine) % rows
+        col = x
+
+        if self.scrollActive and self.scrollSteps:
+            top = self.scrollAreaTop
+            if self.scrollVOffset and top <= row < top + self.scrollAreaRows:
+                row = top + (row - top + self.scrollVOffset * self.scrollSteps) % self.scrollAreaRows
+            if self.scrollStartPage <= (row >> 3) <= self.scrollEndPage:
+                col = (col - self.scrollDirection * self.scrollSteps) % self.width
+
+        bit = (self.gram[(row >> 3) * self.width + col] >> (row & 0x07)) & 0x01
+        return bit ^ 0x01 if self.inverse else bit
+
+    def renderFrame(self):
+        """!
+        \~english
+        Render the visible picture of panel
+        @return a bytearray of pixels ( 0 or 1 ), row by row, size is width * height
+        \~chinese
+        渲染屏幕上的可见画面
+        @return 逐行排列的像素 bytearray（0 或 1），大小为 width * height
+        """
+        frame = bytearray(self.width * self.height)
+        i = 0
+        for y in range(self.height):
+            for x in range(self.width):
+                frame[i] = self.getPixel(x, y)
+                i += 1
+        return frame
+
+    def toImage(self):
+        """!
+        \~english Render the visible picture of panel into a PIL Image ( mode "1" )
+        \~chinese 将屏幕可见画面渲染为 PIL Image（色彩模式 "1"）
+        """
+        frame = self.renderFrame()
+        img = Image.frombytes("L", (self.width, self.height), bytes(frame))
+        return img.point([0] + [255] * 255, "1")
+
+    def toArray(self):
+        """!
+        \~english Render the visible picture of panel into a numpy uint8 array, shape is (height, width)
+        \~chinese 将屏幕可见画面渲染为 numpy uint8 数组，形状为 (height, width)
+        """
+        if numpy is None:
+            raise ImportError("toArray() requires numpy")
+        return numpy.frombuffer(bytes(self.renderFrame()), dtype=numpy.uint8).reshape(self.height, self.width)
+
+    def savePNG(self, fileName):
+        """!
+        \~english Save the visible picture of panel into a PNG file
+        \~chinese 将屏幕可见画面保存为 PNG 文件
+        """
+        self.toImage().save(fileName, "PNG")
+
+class VirtualBusRecorder:
+    """!
+    \~english
+    Count and optionally record bytes sent to a display bus
+    \~chinese
+    统计并可选记录发送到显示总线的字节
+    """
+    ##
+    # \~english number of bus transfers
+    # \~chinese 总线传输次数
+    transfers = 0
+    commandBytes = 0
+    dataBytes = 0
+    ##
+    # \~english recorded traffic, a list of ( VD_TRAFFIC_COMMAND | VD_TRAFFIC_DATA, bytearray )
+    # \~chinese 记录的总线数据，( VD_TRAFFIC_COMMAND | VD_TRAFFIC_DATA, bytearray ) 列表
+    traffic = None
+
+    _record = False
+
+    def __init__(self, record = False):
+        self._record = record
+        self.resetStats()
+
+    def resetStats(self):
+        """!
+        \~english Reset counters and recorded traffic
+        \~chinese 复位计数器并清除记录的总线数据
+        """
+        self.transfers = 0
+        self.commandBytes = 0
+        self.dataBytes = 0
+        self.traffic = []
+
+    def log(self, kind, data, size = None):
+        """!
+        \~english
+        Log a bus transfer
+        @param kind: VD_TRAFFIC_COMMAND or VD_TRAFFIC_DATA
+        @param data: bytes of transfer
+        @param size: number of bytes on the bus, if <b>None</b> means len(data)
+        \~chinese
+        记录一次总线传输
+        @param kind: VD_TRAFFIC_COMMAND 或 VD_TRAFFIC_DATA
+        @param data: 传输的字节
+        @param size: 总线上的字节数，<b>None</b> 表示 len(data)
+        """
+        if size is None: size = len(data)
+        self.transfers += 1
+        if kind == VD_TRAFFIC_COMMAND:
+            self.commandBytes += size
+        else:
+            self.dataBytes += size
+        if self._record:
+            self.traffic.append( (kind, data) )
+
+    def getStats(self):
+        """!
+        \~english
+        @return a dictionary, eg. { "transfers": 3, "command_bytes": 6, "data_bytes": 1024 }
+        \~chinese
+        @return 字典，例如：{ "transfers": 3, "command_bytes": 6, "data_bytes": 1024 }
+        """
+        return {
+            "transfers": self.transfers,
+            "command_bytes": self.commandBytes,
+            "data_bytes": self.dataBytes,
+        }
+
+class VirtualSSD1306_128x64(SSD1306_128x64):
+    """!
+    \~english
+    A headless SSD1306 128x64 display. It runs the same SSD1306Base driver code,
+    but the bus traffic goes into a SSD1306Simulator instead of the SPI bus.
+
+    \~chinese
+    无显示硬件的 SSD1306 128x64 显示屏。它运行同样的 SSD1306Base 驱动代码，
+    但总线数据送入 SSD1306Simulator 而不是 SPI 总线。
+
+    \~
+    @note
+    <pre>
+    from JMRPiSpark.Drives.Display.VirtualDisplay import VirtualSSD1306_128x64
+    from JMRPiSpark.Drives.Screen.SScreenSSD1306 import SScreenSSD1306 \n
+    myDSP = VirtualSSD1306_128x64( recordTraffic = True )
+    myDSP.init()
+    myDSP.on()
+    myScreen = SScreenSSD1306( myDSP, "1" )
+    myScreen.write("Hello World!")
+    myScreen.refresh()
+    myDSP.Controller.savePNG("screen.png")
+    print( myDSP.Bus.getStats() )
+    </pre>
+    """
+    ##
+    # \~english SSD1306Simulator instance
+    # \~chinese SSD1306Simulator 实例
+    Controller = None
+    ##
+    # \~english VirtualBusRecorder instance
+    # \~chinese VirtualBusRecorder 实例
+    Bus = None
+
+    def __init__(self, mirrorH = 0, mirrorV = 0, recordTraffic = False):
+        """!
+        \~english
+        @param mirrorH: The displayed image flips horizontal
+        @param mirrorV: The displayed image flips vertically
+        @param recordTraffic: True - record all bytes sent to the bus
+        \~chinese
+        @param mirrorH: 显示屏水平镜向显示
+        @param mirrorV: 显示屏垂直镜向显示
+        @param recordTraffic: True - 记录所有发送到总线的字节
+        """
+        SSD1306_128x64.__init__(self, mirrorH = mirrorH, mirrorV = mirrorV)
+        self.Controller = SSD1306Simulator(self.width, self.height)
+        self.Bus = VirtualBusRecorder(recordTraffic)
+
+    def _command(self, commands):
+        data = _toBytes(commands)
+        self.Bus.log(VD_TRAFFIC_COMMAND, data)
+        self.Controller.command(data)
+
+    def _data(self, data):
+        data = _toBytes(data)
+        self.Bus.log(VD_TRAFFIC_DATA, data)
+        self.Controller.data(data)
+
+    def _init_io(self):
+        pass
+
+    def reset(self):
+        """!
+        \~english Reset the simulated controller
+        \~chinese 复位模拟控制器
+        """
+        self.Controller.reset()
+
+class VirtualRGBDisplay(RPiDiaplay):
+    """!
+    \~english
+    A headless color display, it keeps the last frame as a PIL Image ( mode "RGB" ).
+    It can work with SScreenILI9341 instead of a TFT display.
+    With pixel format DSP_PIXEL_FORMAT_RGB565 it takes raw RGB565 frames like a TFT controller.
+
+    \~chinese
+    无显示硬件的彩色显示屏，以 PIL Image（色彩模式 "RGB"）保存最后一帧画面。
+    可以替代 TFT 显示屏与 SScreenILI9341 一起工作。
+    像素格式为 DSP_PIXEL_FORMAT_RGB565 时，像 TFT 控制器一样接收 RGB565 原始帧数据。
+    """
+    ##
+    # \~english VirtualBusRecorder instance, data bytes are counted as RGB565 ( 2 bytes per pixel )
+    # \~chinese VirtualBusRecorder 实例，数据字节按 RGB565（每像素 2 字节）计算
+    Bus = None
+    ##
+    # \~english number of frames displayed
+    # \~chinese 已显示的帧数
+    frames = 0
+
+    CAP_PIXEL_FORMAT = DSP_PIXEL_FORMAT_RGB
+
+    _frame = None
+    _image = None
+    _power_on = False
+
+    def __init__(self, width = 320, height = 240, recordTraffic = False, pixelFormat = DSP_PIXEL_FORMAT_RGB):
+        """!
+        \~english
+        @param width: width of display
+        @param height: height of display
+        @param recordTraffic: True - record all frames sent to display
+        @param pixelFormat: DSP_PIXEL_FORMAT_RGB or DSP_PIXEL_FORMAT_RGB565
+        \~chinese
+        @param width: 显示屏宽度
+        @param height: 显示屏高度
+        @param recordTraffic: True - 记录所有发送到显示屏的帧
+        @param pixelFormat: DSP_PIXEL_FORMAT_RGB 或 DSP_PIXEL_FORMAT_RGB565
+        """
+        if pixelFormat not in (DSP_PIXEL_FORMAT_RGB, DSP_PIXEL_FORMAT_RGB565):
+            raise ValueError("pixelFormat can be chosen: \"RGB\" or \"RGB565\"")
+        self.CAP_PIXEL_FORMAT = pixelFormat
+        self._init_config(width, height)
+        self.Bus = VirtualBusRecorder(recordTraffic)
+        self.frames = 0
+        self._frame = Image.new("RGB", (width, height))
+
+    def _init_display(self):
+        pass
+
+    def init(self):
+        self.clear()
+
+    def reset(self):
+        self.clear()
+
+    def on(self):
+        self._power_on = True
+
+    def off(self):
+        self._power_on = False
+
+    def setContrast(self, contrast):
+        pass
+
+    def setBrightness(self, brightness):
+        pass
+
+    def clear(self, fill = 0x00):
+        """!
+        \~english Clear the frame with a color
+        \~chinese 使用一个颜色清除画面
+        """
+        self._image = None
+        self._frame = Image.new("RGB", (self.width, self.height), fill)
+
+    def setImage(self, image):
+        """!
+        \~english Set an image, it will be shown at next display()
+        \~chinese 设定一个图像，将在下一次 display() 时显示
+        """
+        self._image = image
+
+    def display(self, image = None):
+        """!
+        \~english
+        Show an image. If image is <b>None</b> the image of last setImage() will be used.
+        With pixel format DSP_PIXEL_FORMAT_RGB565, image can be RGB565 bytes ( big-endian ) too.
+        \~chinese
+        显示图像。如果 image 是 <b>None</b> 则显示最后一次 setImage() 设定的图像。
+        像素格式为 DSP_PIXEL_FORMAT_RGB565 时，image 也可以是 RGB565 字节（大端）。
+        """
+        if image is None: image = self._image
+        if image is None: return
+        if isinstance(image, (bytes, bytearray)):
+            image = self._fromRGB565(image)
+        if image.size != (self.width, self.height):
+            raise ValueError('The image must be same dimensions as display ( {0} x {1} ).' \
+                .format(self.width, self.height))
+        self._frame = image.convert("RGB") if image.mode != "RGB" else image.copy()
+        self.frames += 1
+        self.Bus.log(VD_TRAFFIC_DATA, self._frame.tobytes() if self.Bus._record else None, self.width * self.height * 2)
+
+    def _fromRGB565(self, data):
+        pixels = self.width * self.height
+        if len(data) != pixels * 2:
+            raise ValueError('The RGB565 data must be {0} bytes.'.format(pixels * 2))
+        data = bytes(data)
+        high = Image.frombytes("L", (self.width, self.height), data[0::2])
+        low = Image.frombytes("L", (self.width, self.height), data[1::2])
+        r = high.point( lambda v: v & 0xF8 )
+        # The bits do not overlap, so add never overflow
+        g = ImageChops.add( high.point( lambda v: (v & 0x07) << 5 ), low.point( lambda v: (v & 0xE0) >> 3 ) )
+        b = low.point( lambda v: (v & 0x1F) << 3 )
+        return Image.merge( "RGB", (r, g, b) )
+
+    def toImage(self):
+        """!
+        \~english @return a copy of current frame, PIL Image ( mode "RGB" )
+        \~chinese @return 当前画面的副本，PIL Image（色彩模式 "RGB"）
+        """
+        return self._frame.copy()
+
+    def toArray(self):
+        """!
+        \~english @return current frame as numpy uint8 array, shape is (height, width, 3)
+        \~chinese @return numpy uint8 数组形式的当前画面，形状为 (height, width, 3)
+        """
+        if numpy is None:
+            raise ImportError("toArray() requires numpy")
+        return numpy.asarray(self._frame, dtype=numpy.uint8)
+
+    def savePNG(self, fileName):
+        """!
+        \~english Save current frame into a PNG file
+        \~chinese 将当前画面保存为 PNG 文件
+        """
+        self._frame.save(fileName, "PNG")
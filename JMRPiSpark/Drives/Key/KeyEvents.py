@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+#
+# RPi-Spark pHAT -- Key Events
+# Thread-safe bounded queue of timestamped key events and bitmask snapshot of key states
+# 线程安全的有界按键事件队列（带时间戳）和按键状态位掩码快照
+#
+# @version v1.0.0
+#
+
+import threading
+import time
+from collections import deque, namedtuple
+
+KEY_EVENT_DOWN  = "down"
+KEY_EVENT_UP    = "up"
+# Events of RPiKeyDebouncer
+KEY_EVENT_LONG_PRESS    = "long_press"
+KEY_EVENT_REPEAT        = "repeat"
+KEY_EVENT_DOUBLE_CLICK  = "double_click"
+
+##
+# \~english
+# A key event: kind is one of KEY_EVENT_*, key is the button id ( BCM pin number ),
+# timestamp in nanoseconds of a monotonic clock ( see monotonicNs ), state is the bitmask of all keys after the event
+# \~chinese
+# 按键事件：kind 为 KEY_EVENT_* 之一，key 为按键 ID（BCM 引脚号），
+# timestamp 为单调时钟的纳秒时间戳（参见 monotonicNs），state 为事件后所有按键的位掩码
+KeyEvent = namedtuple( "KeyEvent", ( "kind", "key", "timestamp", "state" ) )
+
+# Default capacity of event queue
+DEF_KEY_EVENT_QUEUE_SIZE = 64
+
+try:
+    monotonicNs = time.monotonic_ns
+except AttributeError:
+    # Python < 3.7
+    _monotonic = getattr( time, "monotonic", time.time )
+    def monotonicNs():
+        """!
+        \~english @return time in nanoseconds of a monotonic clock
+        \~chinese @return 单调时钟的纳秒时间
+        """
+        return int( _monotonic() * 1000000000 )
+
+class KeyEventQueue:
+    """!
+    \~english
+    Thread-safe bounded queue of key events with an atomic bitmask snapshot of key states.
+
+    Events are pushed by GPIO callbacks ( on RPi.GPIO thread ) and drained by application, eg. once per frame
+    of a game loop. When the queue is full the oldest event is dropped and counted.
+    Each registered key has a bit in state mask, KeyEventQueue#getState reads it without locking.
+
+    \~chinese
+    线程安全的有界按键事件队列，并提供按键状态的原子位掩码快照。
+
+    事件由 GPIO 回调（在 RPi.GPIO 线程中）推入，由应用程序取出，例如游戏循环中每帧一次。
+    队列满时丢弃最旧的事件并计数。
+    每个已注册按键在状态掩码中占一位，KeyEventQueue#getState 无需加锁即可读取。
+
+    \~
+    @note
+    <pre>
+    while True:
+        for event in queue.drain():
+            if event.kind == KEY_EVENT_DOWN and event.key == BUTTON_ACT_A:
+                fire()
+        if queue.getState() & queue.getKeyMask( BUTTON_JOY_LEFT ):
+            moveLeft()
+    </pre>
+    """
+    _lock = None
+    _capacity = DEF_KEY_EVENT_QUEUE_SIZE
+    _events = None
+    _keyBits = None
+    _state = 0
+
+    _pushed = 0
+    _dropped = 0
+
+    def __init__(self, capacity = DEF_KEY_EVENT_QUEUE_SIZE):
+        """!
+        \~english @param capacity: max number of events in queue, default: DEF_KEY_EVENT_QUEUE_SIZE
+        \~chinese @param capacity: 队列中的最大事件数，默认：DEF_KEY_EVENT_QUEUE_SIZE
+        """
+        if capacity < 1:
+            raise ValueError( "Invalid capacity: {}".format( capacity ) )
+        self._lock = threading.Lock()
+        self._capacity = capacity
+        self._events = deque( maxlen = capacity )
+        self._keyBits = {}
+
+    def registerKey(self, key, pressed = False):
+        """!
+        \~english
+        Register a key, assign a bit in state mask
+        @param key: button id
+        @param pressed: initial state of the key
+        @return mask of the key
+        \~chinese
+        注册按键，在状态掩码中分配一位
+        @param key: 按键 ID
+        @param pressed: 按键初始状态
+        @return 按键的掩码
+        """
+        with self._lock:
+            if key not in self._keyBits:
+                self._keyBits[key] = 1 << len( self._keyBits )
+            mask = self._keyBits[key]
+            self._state = ( self._state | mask ) if pressed else ( self._state & ~mask )
+        return mask
+
+    def getKeyMask(self, key):
+        """!
+        \~english @return mask of a registered key, 0 if the key is not registered
+        \~chinese @return 已注册按键的掩码，按键未注册时为 0
+        """
+        return self._keyBits.get( key, 0 )
+
+    def push(self, key, pressed, timestamp = None):
+        """!
+        \~english
+        Push a key event, the event is ignored if state of the key is not changed ( eg. bounce )
+        @param key: a registered button id
+        @param pressed: True - key down, False - key up
+        @param timestamp: None means monotonicNs()
+        @return True - pushed, False - ignored
+        \~chinese
+        推入按键事件，如果按键状态未改变（例如抖动）则忽略该事件
+        @param key: 已注册的按键 ID
+        @param pressed: True - 按下, False - 松开
+        @param timestamp: None 表示 monotonicNs()
+        @return True - 已推入, False - 已忽略
+        """
+        if timestamp == None:
+            timestamp = monotonicNs()
+        with self._lock:
+            mask = self._keyBits[key]
+            state = ( self._state | mask ) if pressed else ( self._state & ~mask )
+            if state == self._state: return False
+            self._state = state
+            if len( self._events ) == self._capacity:
+                self._dropped += 1
+            self._events.append( KeyEvent( KEY_EVENT_DOWN if pressed else KEY_EVENT_UP, key, timestamp, state ) )
+            self._pushed += 1
+        return True
+
+    def pushEvent(self, kind, key, timestamp = None):
+        """!
+        \~english
+        Push an event which does not change state of keys, eg. KEY_EVENT_LONG_PRESS
+        @param kind: kind of event
+        @param key: button id
+        @param timestamp: None means monotonicNs()
+        \~chinese
+        推入不改变按键状态的事件，例如 KEY_EVENT_LONG_PRESS
+        @param kind: 事件类型
+        @param key: 按键 ID
+        @param timestamp: None 表示 monotonicNs()
+        """
+        if timestamp == None:
+            timestamp = monotonicNs()
+        with self._lock:
+            if len( self._events ) == self._capacity:
+                self._dropped += 1
+            self._events.append( KeyEvent( kind, key, timestamp, self._state ) )
+            self._pushed += 1
+
+    def poll(self):
+        """!
+        \~english @return the oldest event, or None if queue is empty
+        \~chinese @return 最旧的事件，队列为空时为 None
+        """
+        with self._lock:
+            return self._events.popleft() if len( self._events ) > 0 else None
+
+    def drain(self):
+        """!
+        \~english
+        Take all events in queue, it swaps the queue and costs O(1)
+        @return events in order as a deque, it can be iterated without locking
+        \~chinese
+        取出队列中的所有事件，通过交换队列实现，开销为 O(1)
+        @return 按顺序排列的事件 deque，可无锁遍历
+        """
+        with self._lock:
+            events = self._events
+            self._events = deque( maxlen = self._capacity )
+        return events
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def getState(self):
+        """!
+        \~english @return bitmask of pressed keys, see KeyEventQueue#getKeyMask
+        \~chinese @return 已按下按键的位掩码，参见 KeyEventQueue#getKeyMask
+        """
+        return self._state
+
+    def isPressed(self, key):
+        return ( self._state & self._keyBits.get( key, 0 ) ) != 0
+
+    def getStats(self):
+        """!
+        \~english @return a dictionary: pushed, dropped, pending
+        \~chinese @return 字典：pushed（推入数）, dropped（丢弃数）, pending（待处理数）
+        """
+        return { "pushed": self._pushed, "dropped": self._dropped, "pending": len( self._events ) }
+
+    def __len__(self):
+        return len( self._events )
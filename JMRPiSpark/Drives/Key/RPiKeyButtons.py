@@ -37,6 +37,8 @@
 #
 
 import RPi.GPIO as GPIO
+from .KeyEvents import KeyEventQueue, DEF_KEY_EVENT_QUEUE_SIZE
+from .RPiKeyDebouncer import RPiKeyDebouncer, DEF_DEBOUNCE_TIME
 
 # Action Buttons    BCM_IO_NUM
 # BUTTON_ACT_A        = 22
@@ -61,9 +63,15 @@ class RPiKeyButtons :
     \~english This RPi-Spark pHAT Key Buttons Drive
     \~chinese 树梅派火花(RPi-Spark pHAT) 按键驱动
     """
+    _keyEvents = None
+    _keyDebouncer = None
+    _detectedKeys = None
+
     def __init__(self):
         GPIO.setwarnings(False)
         GPIO.setmode(GPIO.BCM)
+        # Keys with edge detection set by setKeyButton
+        self._detectedKeys = set()
         pass
 
     def setKeyButton( self, btnId, keyCallback, bounceTime = DEF_BOUNCE_TIME_NORMAL, pullUpDown = GPIO.PUD_UP, event = GPIO.BOTH ):
@@ -111,6 +119,7 @@ class RPiKeyButtons :
         if keyCallback != None:
             try:
                 GPIO.add_event_detect( btnId, event, callback=keyCallback, bouncetime=bounceTime )
+                self._detectedKeys.add( btnId )
             except:
                 pass
         pass
@@ -144,8 +153,9 @@ class RPiKeyButtons :
         移除按键事件回调
         @param buttons: 按钮ID数组。 例如: [12,13,15，...]
         """
-        for i in range( 0, len(buttons)-1 ):
-            GPIO.remove_event_detect( buttons[i] )
+        for btnId in buttons:
+            GPIO.remove_event_detect( btnId )
+            self._detectedKeys.discard( btnId )
 
     def readKeyButton( self, btnId ):
         """!
@@ -187,3 +197,96 @@ class RPiKeyButtons :
         for key in enableButtons:
             self.setKeyButton( key["id"], key["callback"], bounceTime, pullUpDown, event )
         pass
+
+    def enableKeyEvents(self, buttons = [], capacity = DEF_KEY_EVENT_QUEUE_SIZE, debounceTime = DEF_DEBOUNCE_TIME, pullUpDown = GPIO.PUD_UP):
+        """!
+        \~english
+        Enable event queue mode of key buttons, key down / up events are put into a thread-safe bounded queue
+        with monotonic timestamps in nanoseconds, and states of all keys are kept in a bitmask.
+        Application drains events with RPiKeyButtons#drainKeyEvents ( eg. once per frame ) instead of working in callbacks.
+
+        Edges are detected without GPIO bounce time and debounced in software by a RPiKeyDebouncer,
+        so the final level of a bouncy press or release is never missed.
+        A key already set by RPiKeyButtons#setKeyButton with a callback raises RuntimeError,
+        remove it with RPiKeyButtons#removeKeyButtonEvent first.
+
+        @param buttons: an array of button Ids. eg. [ 12,13,15, ...]
+        @param capacity: max number of events in queue, the oldest event is dropped when it is full
+        @param debounceTime: software debounce time in ms, Default set to DEF_DEBOUNCE_TIME
+        @param pullUpDown: Default set to GPIO.PUD_UP, key is pressed on low level. GPIO.PUD_DOWN: pressed on high level
+        @return the KeyEventQueue
+
+        \~chinese
+        启用按键的事件队列模式，按下 / 松开事件以纳秒单调时间戳放入线程安全的有界队列，
+        所有按键状态保存在位掩码中。
+        应用程序使用 RPiKeyButtons#drainKeyEvents 取出事件（例如每帧一次），而不是在回调中工作。
+
+        边沿检测不使用 GPIO 消抖时间，由 RPiKeyDebouncer 进行软件消抖，因此不会丢失抖动按下或松开的最终电平。
+        已由 RPiKeyButtons#setKeyButton 设置回调的按键会抛出 RuntimeError，请先用 RPiKeyButtons#removeKeyButtonEvent 移除。
+
+        @param buttons: 按钮ID数组。 例如: [12,13,15，...]
+        @param capacity: 队列中的最大事件数，队列满时丢弃最旧的事件
+        @param debounceTime: 软件消抖时间，单位 ms，默认 DEF_DEBOUNCE_TIME
+        @param pullUpDown: 默认 GPIO.PUD_UP，低电平为按下。GPIO.PUD_DOWN：高电平为按下
+        @return KeyEventQueue
+
+        \~ \n
+        @see KeyEventQueue
+        @see RPiKeyDebouncer
+        """
+        for btnId in buttons:
+            if btnId in self._detectedKeys:
+                raise RuntimeError("Key {} already has edge detection set by setKeyButton, remove it first".format( btnId ))
+        if self._keyEvents == None:
+            self._keyEvents = KeyEventQueue( capacity )
+            # Only down / up events, long press etc. can be enabled by getKeyDebouncer().setTimings
+            self._keyDebouncer = RPiKeyDebouncer( self._keyEvents, debounceTime, longPressTime = None,
+                                                  repeatInterval = None, doubleClickTime = None )
+        self._keyDebouncer.setupGPIO( buttons, pullUpDown )
+        self._keyDebouncer.start()
+        return self._keyEvents
+
+    def disableKeyEvents(self):
+        """!
+        \~english Stop event queue mode and remove edge detection of its keys, pending events are kept in the queue
+        \~chinese 停止事件队列模式并移除其按键的边沿检测，待处理事件保留在队列中
+        """
+        if self._keyDebouncer == None: return
+        self._keyDebouncer.stop()
+        self._keyDebouncer.removeGPIO( self._keyDebouncer.getGPIOKeys() )
+
+    def getKeyDebouncer(self):
+        """!
+        \~english @return the RPiKeyDebouncer of event queue mode, None if it is not enabled
+        \~chinese @return 事件队列模式的 RPiKeyDebouncer，未启用时为 None
+        """
+        return self._keyDebouncer
+
+    def getKeyEventQueue(self):
+        """!
+        \~english @return the KeyEventQueue, None if event queue mode is not enabled
+        \~chinese @return KeyEventQueue，未启用事件队列模式时为 None
+        """
+        return self._keyEvents
+
+    def drainKeyEvents(self):
+        """!
+        \~english
+        Take all pending key events ( KeyEvent ) in order
+        @return events, empty if event queue mode is not enabled
+        \~chinese
+        按顺序取出所有待处理的按键事件（KeyEvent）
+        @return 事件，未启用事件队列模式时为空
+        """
+        return self._keyEvents.drain() if self._keyEvents != None else []
+
+    def getKeyState(self):
+        """!
+        \~english
+        Get an atomic snapshot of states of all keys in event queue mode
+        @return bitmask of pressed keys, mask of a key is KeyEventQueue#getKeyMask( btnId )
+        \~chinese
+        获取事件队列模式下所有按键状态的原子快照
+        @return 已按下按键的位掩码，按键掩码为 KeyEventQueue#getKeyMask( btnId )
+        """
+        return self._keyEvents.getState() if self._keyEvents != None else 0
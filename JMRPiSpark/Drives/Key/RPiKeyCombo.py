@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+#
+# RPi-Spark pHAT -- Key Combos
+# Chord and sequence recognition over key events with a compiled Aho-Corasick automaton
+# 使用编译的 Aho-Corasick 自动机在按键事件上识别组合键和按键序列
+#
+# Spark pad keys ( BCM ): JOY UP 5, JOY DOWN 6, JOY LEFT 26, JOY RIGHT 27, JOY OK 24, ACT A 22, ACT B 23
+#
+# @version v1.0.0
+#
+
+from collections import namedtuple
+
+from .KeyEvents import KEY_EVENT_DOWN, KEY_EVENT_UP
+
+##
+# \~english
+# A combo event: name of the registered combo, timestamp in ns of the event completing it,
+# duration in ns from the first step
+# \~chinese
+# 组合事件：已注册组合的名称，完成组合的事件时间戳（ns），从第一步开始的持续时间（ns）
+ComboEvent = namedtuple( "ComboEvent", ( "name", "timestamp", "duration" ) )
+
+# UNIT: ms
+DEF_CHORD_WINDOW    = 80        # keys pressed within it are one chord
+DEF_COMBO_STEP_TIME = 600       # max time between steps of a sequence
+
+_NS_PER_MS = 1000000
+
+class RPiKeyCombo:
+    """!
+    \~english
+    Recognize chords ( keys held together, eg. A+B ) and sequences of chords ( eg. UP, UP, DOWN, DOWN, B, A )
+    over a key event stream ( KeyEvent from KeyEventQueue or RPiKeyDebouncer ).
+
+    Each key down produces a symbol: the set of held keys. A key pressed within the chord window after the previous
+    symbol while its keys are still held replaces that symbol ( A then B quickly is chord A+B ),
+    a later one is a new symbol ( OK held then UP is OK, OK+UP ).
+    All combos are compiled into one Aho-Corasick automaton over symbols, so the cost per event does not depend
+    on the number of registered combos, overlapping combos are all recognized.
+
+    \~chinese
+    在按键事件流（来自 KeyEventQueue 或 RPiKeyDebouncer 的 KeyEvent）上识别组合键（同时按住的按键，例如 A+B）
+    和组合键序列（例如 UP, UP, DOWN, DOWN, B, A）。
+
+    每次按键按下产生一个符号：当前按住的按键集合。在上一个符号后的组合窗口内按下且上一个符号的按键仍按住时，
+    替换该符号（快速按 A 再按 B 为组合键 A+B），之后按下则为新符号（按住 OK 再按 UP 为 OK, OK+UP）。
+    所有组合被编译为一个基于符号的 Aho-Corasick 自动机，因此每个事件的开销与已注册组合数量无关，重叠的组合都会被识别。
+
+    \~
+    @note
+    <pre>
+    combo = RPiKeyCombo()
+    combo.addCombo( "AB", [ ( 22, 23 ) ] )
+    combo.addCombo( "OK+UP", [ 24, ( 24, 5 ) ] )
+    combo.addCombo( "konami", [ 5, 5, 6, 6, 26, 27, 26, 27, 23, 22 ], window = 5000 )
+    combo.addCallback( lambda e: print( e.name ) )
+    debouncer.addCallback( combo.feed )
+    </pre>
+    """
+    _chordWindow = DEF_CHORD_WINDOW * _NS_PER_MS
+    _stepTime = DEF_COMBO_STEP_TIME * _NS_PER_MS
+    _callbacks = None
+    _eventQueue = None
+
+    # Registered combos: ( name, symbols, window in ns or None )
+    _combos = None
+    _keyBits = None
+
+    # Compiled automaton
+    _compiled = False
+    _goto = None
+    _fail = None
+    _out = None
+    _maxDepth = 1
+
+    # Matching state
+    _held = 0
+    _node = 0
+    _prevNode = 0
+    _lastSymbol = 0         # 0 when the chord is closed by a release
+    _lastTime = None
+    _times = None
+    _count = 0
+
+    def __init__(self, chordWindow = DEF_CHORD_WINDOW, stepTime = DEF_COMBO_STEP_TIME, eventQueue = None):
+        """!
+        \~english
+        @param chordWindow: in ms, keys pressed within it are one chord, default: DEF_CHORD_WINDOW
+        @param stepTime: in ms, max time between steps of a sequence, default: DEF_COMBO_STEP_TIME
+        @param eventQueue: None, or a queue ( eg. Queue.Queue ) ComboEvent are put into
+        \~chinese
+        @param chordWindow: 单位 ms，在此时间内按下的按键为一个组合键，默认：DEF_CHORD_WINDOW
+        @param stepTime: 单位 ms，序列中相邻步骤的最大间隔，默认：DEF_COMBO_STEP_TIME
+        @param eventQueue: None，或放入 ComboEvent 的队列（例如 Queue.Queue）
+        """
+        self._chordWindow = int( chordWindow * _NS_PER_MS )
+        self._stepTime = int( stepTime * _NS_PER_MS )
+        self._eventQueue = eventQueue
+        self._callbacks = []
+        self._combos = []
+        self._keyBits = {}
+        self.reset()
+
+    def reset(self):
+        """!
+        \~english Reset matching state, registered combos are kept
+        \~chinese 重置匹配状态，保留已注册的组合
+        """
+        self._held = 0
+        self._node = self._prevNode = 0
+        self._lastSymbol = 0
+        self._lastTime = None
+        self._times = [0] * self._maxDepth
+        self._count = 0
+
+    def _keyMask(self, key):
+        if key not in self._keyBits:
+            self._keyBits[key] = 1 << len( self._keyBits )
+        return self._keyBits[key]
+
+    def addCombo(self, name, steps, window = None):
+        """!
+        \~english
+        Register a combo
+        @param name: name of the combo in ComboEvent
+        @param steps: a list of steps, a step is a button id or a tuple of button ids ( chord )
+        @param window: in ms, max time from the first step to the last step, None means no limit
+        \~chinese
+        注册组合
+        @param name: ComboEvent 中的组合名称
+        @param steps: 步骤列表，每步为一个按键 ID 或按键 ID 元组（组合键）
+        @param window: 单位 ms，从第一步到最后一步的最长时间，None 表示不限制
+        """
+        if len( steps ) == 0:
+            raise ValueError("A combo needs at least one step")
+        symbols = []
+        for step in steps:
+            keys = step if isinstance( step, ( tuple, list, set, frozenset ) ) else ( step, )
+            mask = 0
+            for key in keys:
+                mask |= self._keyMask( key )
+            symbols.append( mask )
+        self._combos.append( ( name, tuple( symbols ), None if window == None else int( window * _NS_PER_MS ) ) )
+        self._compiled = False
+
+    def removeCombo(self, name):
+        self._combos = [ c for c in self._combos if c[0] != name ]
+        self._compiled = False
+
+    def addCallback(self, callback):
+        """!
+        \~english @param callback: a function with a ComboEvent argument
+        \~chinese @param callback: 参数为 ComboEvent 的函数
+        """
+        self._callbacks.append( callback )
+
+    def compile(self):
+        """!
+        \~english Compile registered combos into the automaton, it is called automatically by the next event
+        \~chinese 将已注册的组合编译为自动机，下一个事件会自动调用
+        """
+        goto = [ {} ]
+        out = [ [] ]
+        for index, combo in enumerate( self._combos ):
+            node = 0
+            for symbol in combo[1]:
+                nextNode = goto[node].get( symbol )
+                if nextNode == None:
+                    nextNode = len( goto )
+                    goto[node][symbol] = nextNode
+                    goto.append( {} )
+                    out.append( [] )
+                node = nextNode
+            out[node].append( index )
+
+        # Failure links by breadth first order, outputs of suffixes are merged
+        fail = [ 0 ] * len( goto )
+        queue = list( goto[0].values() )
+        head = 0
+        while head < len( queue ):
+            node = queue[head]
+            head += 1
+            for symbol, child in goto[node].items():
+                queue.append( child )
+                f = fail[node]
+                while f != 0 and symbol not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get( symbol, 0 ) if goto[f].get( symbol ) != child else 0
+                out[child] = out[child] + out[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self._maxDepth = max( [ len( c[1] ) for c in self._combos ] + [ 1 ] )
+        self._compiled = True
+        self.reset()
+
+    def _step(self, node, symbol):
+        goto = self._goto
+        fail = self._fail
+        while node != 0 and symbol not in goto[node]:
+            node = fail[node]
+        return goto[node].get( symbol, 0 )
+
+    def feed(self, event):
+        """!
+        \~english
+        Feed a key event, other kinds than KEY_EVENT_DOWN / KEY_EVENT_UP are ignored
+        @param event: a KeyEvent
+        \~chinese
+        输入按键事件，忽略 KEY_EVENT_DOWN / KEY_EVENT_UP 以外的类型
+        @param event: KeyEvent
+        """
+        kind = event[0]
+        if kind == KEY_EVENT_UP:
+            mask = self._keyBits.get( event[1] )
+            if mask != None:
+                self._held &= ~mask
+                # A released key closes the chord of last symbol, pressing it again is a new symbol
+                if self._lastSymbol & mask:
+                    self._lastSymbol = 0
+            return
+        if kind != KEY_EVENT_DOWN: return
+        if not self._compiled:
+            self.compile()
+
+        ts = event[2]
+        self._held |= self._keyMask( event[1] )
+        symbol = self._held
+        lastTime = self._lastTime
+        depth = self._maxDepth
+
+        if self._lastSymbol != 0 and ts - lastTime <= self._chordWindow and ( symbol & self._lastSymbol ) == self._lastSymbol:
+            # Grow the chord of last symbol
+            node = self._step( self._prevNode, symbol )
+        else:
+            if lastTime != None and ts - lastTime > self._stepTime:
+                self._node = 0
+            self._prevNode = self._node
+            node = self._step( self._node, symbol )
+            self._times[self._count % depth] = ts
+            self._count += 1
+            self._lastTime = ts
+        self._node = node
+        self._lastSymbol = symbol
+
+        for index in self._out[node]:
+            name, symbols, window = self._combos[index]
+            start = self._times[( self._count - len( symbols ) ) % depth]
+            if window != None and ts - start > window: continue
+            self._emit( ComboEvent( name, ts, ts - start ) )
+
+    def feedBatch(self, events):
+        """!
+        \~english @param events: key events in order, eg. KeyEventQueue#drain()
+        \~chinese @param events: 按顺序排列的按键事件，例如 KeyEventQueue#drain()
+        """
+        feed = self.feed
+        for event in events:
+            feed( event )
+
+    def _emit(self, event):
+        for callback in self._callbacks:
+            callback( event )
+        if self._eventQueue != None:
+            self._eventQueue.put( event )
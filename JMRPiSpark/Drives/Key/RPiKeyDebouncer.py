@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+#
+# RPi-Spark pHAT -- Key Debouncer
+# Software debouncer with long press, repeat and double click, driven by one timer thread
+# 软件消抖，支持长按、连发和双击，由单个定时线程驱动
+#
+# @version v1.0.0
+#
+
+import threading
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    # Allow import off the Raspberry Pi, GPIO is only needed by setupGPIO()
+    GPIO = None
+
+from .KeyEvents import KeyEvent, KeyEventQueue, monotonicNs
+from .KeyEvents import KEY_EVENT_DOWN, KEY_EVENT_UP, KEY_EVENT_LONG_PRESS, KEY_EVENT_REPEAT, KEY_EVENT_DOUBLE_CLICK
+
+# UNIT: ms
+DEF_DEBOUNCE_TIME       = 10
+DEF_LONG_PRESS_TIME     = 600
+DEF_REPEAT_INTERVAL     = 100
+DEF_DOUBLE_CLICK_TIME   = 300
+
+_NS_PER_MS = 1000000
+
+class _KeyState:
+    """!
+    State of a key in RPiKeyDebouncer, times in nanoseconds
+    """
+    raw = False             # last raw level, True is pressed
+    rawTime = 0             # time of last raw edge
+    stable = False          # debounced state
+    nextTime = None         # deadline of next long press / repeat
+    longFired = False
+    doubleFired = False
+    lastRelease = None      # release time of last short click, for double click
+
+class RPiKeyDebouncer:
+    """!
+    \~english
+    Software debouncer of key buttons. Raw edges are integrated: a key changes its state only when the raw level
+    is held for the debounce time, so a press is reported after a short window ( default 10ms ) instead of
+    GPIO bounce time ( 100ms ) and fast repeated presses are not lost.
+
+    Events ( KeyEvent ) are emitted to callbacks and / or a KeyEventQueue:
+        * KEY_EVENT_DOWN / KEY_EVENT_UP: debounced press and release, timestamp of the raw edge
+        * KEY_EVENT_LONG_PRESS: key held for longPressTime
+        * KEY_EVENT_REPEAT: every repeatInterval after long press
+        * KEY_EVENT_DOUBLE_CLICK: second press within doubleClickTime after release of a short click
+
+    All keys are driven by one timer thread which sleeps until the nearest deadline.
+    Raw edges come from GPIO ( RPiKeyDebouncer#setupGPIO ) or any source with RPiKeyDebouncer#feed.
+
+    \~chinese
+    按键软件消抖。对原始边沿进行积分：只有原始电平保持消抖时间后按键状态才会改变，
+    因此按下事件在短窗口（默认 10ms）后报告，而不是 GPIO 消抖时间（100ms），快速重复按键也不会丢失。
+
+    事件（KeyEvent）发送到回调函数和 / 或 KeyEventQueue：
+        * KEY_EVENT_DOWN / KEY_EVENT_UP：消抖后的按下和松开，时间戳为原始边沿时间
+        * KEY_EVENT_LONG_PRESS：按键保持 longPressTime
+        * KEY_EVENT_REPEAT：长按后每 repeatInterval 一次
+        * KEY_EVENT_DOUBLE_CLICK：短按松开后 doubleClickTime 内再次按下
+
+    所有按键由单个定时线程驱动，该线程休眠至最近的截止时间。
+    原始边沿来自 GPIO（RPiKeyDebouncer#setupGPIO）或通过 RPiKeyDebouncer#feed 输入的任意来源。
+
+    \~
+    @note
+    <pre>
+    queue = KeyEventQueue()
+    debouncer = RPiKeyDebouncer( eventQueue = queue )
+    debouncer.setupGPIO( [ BUTTON_ACT_A, BUTTON_ACT_B ] )
+    debouncer.start()
+    ...
+    for event in queue.drain():
+        print( event.kind, event.key )
+    </pre>
+    """
+    _cond = None
+    _thread = None
+    _running = False
+    _keys = None
+    _callbacks = None
+    _eventQueue = None
+    _activeLevels = None
+
+    # Timings in nanoseconds
+    _debounceTime = DEF_DEBOUNCE_TIME * _NS_PER_MS
+    _longPressTime = DEF_LONG_PRESS_TIME * _NS_PER_MS
+    _repeatInterval = DEF_REPEAT_INTERVAL * _NS_PER_MS
+    _doubleClickTime = DEF_DOUBLE_CLICK_TIME * _NS_PER_MS
+
+    _edges = 0
+    _events = 0
+
+    def __init__(self, eventQueue = None, debounceTime = DEF_DEBOUNCE_TIME, longPressTime = DEF_LONG_PRESS_TIME,
+                 repeatInterval = DEF_REPEAT_INTERVAL, doubleClickTime = DEF_DOUBLE_CLICK_TIME):
+        """!
+        \~english
+        @param eventQueue: None, or a KeyEventQueue events are pushed into
+        @param debounceTime: integration window in ms, default: DEF_DEBOUNCE_TIME
+        @param longPressTime: in ms, None to disable long press and repeat, default: DEF_LONG_PRESS_TIME
+        @param repeatInterval: in ms, None to disable repeat, default: DEF_REPEAT_INTERVAL
+        @param doubleClickTime: in ms, None to disable double click, default: DEF_DOUBLE_CLICK_TIME
+        \~chinese
+        @param eventQueue: None，或推入事件的 KeyEventQueue
+        @param debounceTime: 积分窗口，单位 ms，默认：DEF_DEBOUNCE_TIME
+        @param longPressTime: 单位 ms，None 禁用长按和连发，默认：DEF_LONG_PRESS_TIME
+        @param repeatInterval: 单位 ms，None 禁用连发，默认：DEF_REPEAT_INTERVAL
+        @param doubleClickTime: 单位 ms，None 禁用双击，默认：DEF_DOUBLE_CLICK_TIME
+        """
+        self._cond = threading.Condition()
+        self._keys = {}
+        self._callbacks = []
+        self._activeLevels = {}
+        self._eventQueue = eventQueue
+        self.setTimings( debounceTime, longPressTime, repeatInterval, doubleClickTime )
+
+    def setTimings(self, debounceTime = DEF_DEBOUNCE_TIME, longPressTime = DEF_LONG_PRESS_TIME,
+                   repeatInterval = DEF_REPEAT_INTERVAL, doubleClickTime = DEF_DOUBLE_CLICK_TIME):
+        """!
+        \~english Set timings in ms, see RPiKeyDebouncer#__init__
+        \~chinese 设置时间参数，单位 ms，参见 RPiKeyDebouncer#__init__
+        """
+        toNs = lambda ms: None if ms == None else int( ms * _NS_PER_MS )
+        with self._cond:
+            self._debounceTime = toNs( debounceTime )
+            self._longPressTime = toNs( longPressTime )
+            self._repeatInterval = toNs( repeatInterval )
+            self._doubleClickTime = toNs( doubleClickTime )
+            self._cond.notify()
+
+    def addCallback(self, callback):
+        """!
+        \~english
+        Add a callback of events, it is called on the timer thread
+        @param callback: a function with a KeyEvent argument
+        \~chinese
+        添加事件回调函数，在定时线程中调用
+        @param callback: 参数为 KeyEvent 的函数
+        """
+        self._callbacks.append( callback )
+
+    def addKey(self, key, pressed = False):
+        """!
+        \~english
+        Add a key
+        @param key: button id
+        @param pressed: initial state of the key
+        \~chinese
+        添加按键
+        @param key: 按键 ID
+        @param pressed: 按键初始状态
+        """
+        state = _KeyState()
+        state.raw = state.stable = pressed
+        with self._cond:
+            self._keys[key] = state
+        if isinstance( self._eventQueue, KeyEventQueue ):
+            self._eventQueue.registerKey( key, pressed )
+
+    def setupGPIO(self, buttons = [], pullUpDown = None):
+        """!
+        \~english
+        Setup GPIO of key buttons and feed their raw edges, GPIO bounce time is not used.
+        Keys already set up are skipped. The error of GPIO.add_event_detect is raised, eg. when the pin
+        already has edge detection set by RPiKeyButtons#setKeyButton
+        @param buttons: an array of button Ids. eg. [ 12,13,15, ...]
+        @param pullUpDown: Default GPIO.PUD_UP, key is pressed on low level. GPIO.PUD_DOWN: pressed on high level
+        \~chinese
+        设置按键 GPIO 并输入其原始边沿，不使用 GPIO 消抖时间。
+        已设置的按键被跳过。GPIO.add_event_detect 的错误会被抛出，例如该引脚已由 RPiKeyButtons#setKeyButton 设置边沿检测
+        @param buttons: 按钮ID数组。 例如: [12,13,15，...]
+        @param pullUpDown: 默认 GPIO.PUD_UP，低电平为按下。GPIO.PUD_DOWN：高电平为按下
+        """
+        if GPIO == None:
+            raise RuntimeError("RPi.GPIO is required by RPiKeyDebouncer#setupGPIO")
+        if pullUpDown == None:
+            pullUpDown = GPIO.PUD_UP
+        activeLevel = GPIO.LOW if pullUpDown == GPIO.PUD_UP else GPIO.HIGH
+        for btnId in buttons:
+            if btnId in self._activeLevels: continue
+            GPIO.setup( btnId, GPIO.IN, pull_up_down=pullUpDown )
+            self._activeLevels[btnId] = activeLevel
+            self.addKey( btnId, GPIO.input( btnId ) == activeLevel )
+            try:
+                GPIO.add_event_detect( btnId, GPIO.BOTH, callback=self._onGPIOEdge )
+            except Exception:
+                # The key would never get an edge, do not leave it half set up
+                del self._activeLevels[btnId]
+                with self._cond:
+                    del self._keys[btnId]
+                raise
+
+    def removeGPIO(self, buttons = []):
+        """!
+        \~english
+        Remove edge detection of key buttons set up by RPiKeyDebouncer#setupGPIO
+        @param buttons: an array of button Ids. eg. [ 12,13,15, ...]
+        \~chinese
+        移除由 RPiKeyDebouncer#setupGPIO 设置的按键边沿检测
+        @param buttons: 按钮ID数组。 例如: [12,13,15，...]
+        """
+        for btnId in buttons:
+            if self._activeLevels.pop( btnId, None ) == None: continue
+            GPIO.remove_event_detect( btnId )
+            with self._cond:
+                self._keys.pop( btnId, None )
+
+    def getGPIOKeys(self):
+        """!
+        \~english @return button Ids set up by RPiKeyDebouncer#setupGPIO
+        \~chinese @return 由 RPiKeyDebouncer#setupGPIO 设置的按钮ID
+        """
+        return list( self._activeLevels )
+
+    def _onGPIOEdge(self, channel):
+        self.feed( channel, GPIO.input( channel ) == self._activeLevels[channel] )
+
+    def feed(self, key, pressed, timestamp = None):
+        """!
+        \~english
+        Feed a raw edge of a key, it is cheap and can be called from interrupt callbacks
+        @param key: a button id added by RPiKeyDebouncer#addKey
+        @param pressed: raw level, True - pressed
+        @param timestamp: time of edge in ns, None means monotonicNs()
+        \~chinese
+        输入按键的原始边沿，开销很小，可在中断回调中调用
+        @param key: 由 RPiKeyDebouncer#addKey 添加的按键 ID
+        @param pressed: 原始电平，True - 按下
+        @param timestamp: 边沿时间，单位 ns，None 表示 monotonicNs()
+        """
+        if timestamp == None:
+            timestamp = monotonicNs()
+        with self._cond:
+            state = self._keys[key]
+            if state.raw == pressed: return
+            state.raw = pressed
+            state.rawTime = timestamp
+            self._edges += 1
+            self._cond.notify()
+
+    def _processKey(self, key, state, now, events):
+        """!
+        Advance state machine of a key to now, append events
+        @return next deadline of the key in ns, or None
+        """
+        if state.raw != state.stable:
+            due = state.rawTime + self._debounceTime
+            if now < due: return due
+            ts = state.rawTime
+            state.stable = state.raw
+            if state.stable:
+                events.append( ( KEY_EVENT_DOWN, key, ts ) )
+                state.longFired = False
+                state.doubleFired = False
+                state.nextTime = None if self._longPressTime == None else ts + self._longPressTime
+                if state.lastRelease != None and self._doubleClickTime != None and ts - state.lastRelease <= self._doubleClickTime:
+                    events.append( ( KEY_EVENT_DOUBLE_CLICK, key, ts ) )
+                    state.doubleFired = True
+            else:
+                events.append( ( KEY_EVENT_UP, key, ts ) )
+                state.nextTime = None
+                # Only a short single click can start a double click
+                state.lastRelease = None if state.longFired or state.doubleFired else ts
+
+        if state.stable and state.nextTime != None:
+            if now < state.nextTime: return state.nextTime
+            if not state.longFired:
+                events.append( ( KEY_EVENT_LONG_PRESS, key, state.nextTime ) )
+                state.longFired = True
+            else:
+                events.append( ( KEY_EVENT_REPEAT, key, state.nextTime ) )
+            if self._repeatInterval == None:
+                state.nextTime = None
+            else:
+                # Skip missed repeats instead of a burst when the thread is late
+                while state.nextTime <= now:
+                    state.nextTime += self._repeatInterval
+            return state.nextTime
+        return None
+
+    def _emit(self, kind, key, timestamp):
+        queue = self._eventQueue
+        if queue != None:
+            if isinstance( queue, KeyEventQueue ):
+                if kind == KEY_EVENT_DOWN or kind == KEY_EVENT_UP:
+                    queue.push( key, kind == KEY_EVENT_DOWN, timestamp )
+                else:
+                    queue.pushEvent( kind, key, timestamp )
+            else:
+                queue.put( KeyEvent( kind, key, timestamp, None ) )
+        if len( self._callbacks ) > 0:
+            event = KeyEvent( kind, key, timestamp, None )
+            for callback in self._callbacks:
+                callback( event )
+
+    def _run(self):
+        cond = self._cond
+        while True:
+            events = []
+            with cond:
+                if not self._running: break
+                now = monotonicNs()
+                deadline = None
+                for key, state in self._keys.items():
+                    due = self._processKey( key, state, now, events )
+                    if due != None and ( deadline == None or due < deadline ):
+                        deadline = due
+                if len( events ) == 0:
+                    # Sleep until the nearest deadline or a new edge
+                    cond.wait( None if deadline == None else max( 0, deadline - now ) / 1e9 )
+                    continue
+                self._events += len( events )
+            # Events are emitted without holding the lock, callbacks may feed or read states
+            events.sort( key = lambda e: e[2] )
+            for event in events:
+                self._emit( *event )
+
+    def start(self):
+        """!
+        \~english Start the timer thread
+        \~chinese 启动定时线程
+        """
+        if self._running: return
+        self._running = True
+        self._thread = threading.Thread( target = self._run, name = "RPiKeyDebouncer" )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """!
+        \~english Stop the timer thread
+        \~chinese 停止定时线程
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread != None:
+            self._thread.join()
+            self._thread = None
+
+    def isRunning(self):
+        return self._running
+
+    def isPressed(self, key):
+        """!
+        \~english @return debounced state of a key
+        \~chinese @return 按键消抖后的状态
+        """
+        return self._keys[key].stable
+
+    def getStats(self):
+        """!
+        \~english @return a dictionary: edges ( raw edges ), events ( emitted events )
+        \~chinese @return 字典：edges（原始边沿数）, events（已发送事件数）
+        """
+        return { "edges": self._edges, "events": self._events }
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+#
+# RPi-Spark pHAT -- Key Buttons on GPIO character device
+# Key backend on Linux GPIO character device ( /dev/gpiochipN, uAPI v2 ) with kernel timestamped edge events,
+# it does not need RPi.GPIO and can be tested with the gpio-sim kernel module
+# 基于 Linux GPIO 字符设备（/dev/gpiochipN，uAPI v2）的按键后端，边沿事件带内核时间戳，
+# 不需要 RPi.GPIO，可使用 gpio-sim 内核模块测试
+#
+# @version v1.0.0
+#
+
+import fcntl
+import os
+import select
+import struct
+import threading
+
+from .KeyEvents import KeyEvent, KeyEventQueue, KEY_EVENT_DOWN, KEY_EVENT_UP
+
+def _IOWR(type, nr, size):
+    return ( 3 << 30 ) | ( size << 16 ) | ( type << 8 ) | nr
+
+# linux/gpio.h uAPI v2
+GPIO_V2_LINES_MAX               = 64
+GPIO_V2_LINE_NUM_ATTRS_MAX      = 10
+GPIO_V2_LINE_REQUEST_SIZE       = 592
+GPIO_V2_LINE_EVENT_SIZE         = 48
+GPIO_V2_GET_LINE_IOCTL          = _IOWR( 0xB4, 0x07, GPIO_V2_LINE_REQUEST_SIZE )
+GPIO_V2_LINE_GET_VALUES_IOCTL   = _IOWR( 0xB4, 0x0E, 16 )
+
+GPIO_V2_LINE_FLAG_ACTIVE_LOW        = 1 << 1
+GPIO_V2_LINE_FLAG_INPUT             = 1 << 2
+GPIO_V2_LINE_FLAG_EDGE_RISING       = 1 << 4
+GPIO_V2_LINE_FLAG_EDGE_FALLING      = 1 << 5
+GPIO_V2_LINE_FLAG_BIAS_PULL_UP      = 1 << 8
+GPIO_V2_LINE_FLAG_BIAS_PULL_DOWN    = 1 << 9
+
+GPIO_V2_LINE_ATTR_ID_DEBOUNCE       = 3
+
+GPIO_V2_LINE_EVENT_RISING_EDGE      = 1
+GPIO_V2_LINE_EVENT_FALLING_EDGE     = 2
+
+# Offsets in struct gpio_v2_line_request
+_REQ_OFFSETS        = 0
+_REQ_CONSUMER       = 256
+_REQ_CONFIG_FLAGS   = 288
+_REQ_CONFIG_NATTRS  = 296
+_REQ_CONFIG_ATTRS   = 320
+_REQ_NUM_LINES      = 560
+_REQ_EVENT_BUF_SIZE = 564
+_REQ_FD             = 588
+
+# struct gpio_v2_line_event: timestamp_ns, id, offset, seqno, line_seqno, padding
+_EVENT_FORMAT = "=QIIII24x"
+
+# Bias of key lines
+KEY_BIAS_PULL_UP    = "pull_up"
+KEY_BIAS_PULL_DOWN  = "pull_down"
+
+DEF_GPIO_CHIP           = "/dev/gpiochip0"
+DEF_GPIO_CONSUMER       = "rpi-spark-keys"
+DEF_EVENT_READ_MAX      = 16
+
+class RPiKeyGpioCdev:
+    """!
+    \~english
+    Key buttons on Linux GPIO character device. All keys are requested as lines of one request:
+        * edge events are timestamped by kernel ( CLOCK_MONOTONIC, same as monotonicNs ) and read in batches,
+          many events per read() syscall
+        * states of all keys are read in one ioctl ( RPiKeyGpioCdev#getKeyState )
+        * debounce can be done by kernel, lost events are detected by sequence numbers
+    Keys are active low with pull up by default, so a rising edge of line value is a key down.
+    Events ( KeyEvent ) are pushed into a KeyEventQueue and / or callbacks, eg. RPiKeyDebouncer#feed.
+
+    \~chinese
+    基于 Linux GPIO 字符设备的按键。所有按键作为一个请求中的多条线路申请：
+        * 边沿事件由内核打时间戳（CLOCK_MONOTONIC，与 monotonicNs 相同）并批量读取，每次 read() 系统调用读取多个事件
+        * 一次 ioctl 读取所有按键状态（RPiKeyGpioCdev#getKeyState）
+        * 可由内核消抖，通过序列号检测丢失的事件
+    按键默认为上拉、低电平有效，因此线路值的上升沿为按下。
+    事件（KeyEvent）推入 KeyEventQueue 和 / 或回调函数，例如 RPiKeyDebouncer#feed。
+
+    \~
+    @note
+    <pre>
+    queue = KeyEventQueue()
+    keys = RPiKeyGpioCdev( [ 5, 6, 26, 27, 24, 22, 23 ], eventQueue = queue )
+    keys.start()
+    ...
+    for event in queue.drain():
+        print( event.key, event.kind, event.timestamp )
+    </pre>
+    """
+    _buttons = None
+    _chip = DEF_GPIO_CHIP
+    _bias = KEY_BIAS_PULL_UP
+    _debounceTime = None
+    _consumer = DEF_GPIO_CONSUMER
+    _eventBufferSize = 0
+
+    _lineFd = None
+    _lineIndex = None
+    _allMask = 0
+    _eventQueue = None
+    _callbacks = None
+
+    _thread = None
+    _running = False
+    _wakeFds = None
+
+    _reads = 0
+    _events = 0
+    _lost = 0
+    _lastSeqno = 0
+
+    def __init__(self, buttons, chip = DEF_GPIO_CHIP, bias = KEY_BIAS_PULL_UP, debounceTime = None,
+                 eventQueue = None, consumer = DEF_GPIO_CONSUMER, eventBufferSize = 0):
+        """!
+        \~english
+        @param buttons: an array of button Ids, they are line offsets of the chip ( BCM number on gpiochip0 of Raspberry Pi )
+        @param chip: path of GPIO character device, default: DEF_GPIO_CHIP
+        @param bias: KEY_BIAS_PULL_UP ( key is pressed on low level ) or KEY_BIAS_PULL_DOWN ( pressed on high level )
+        @param debounceTime: kernel debounce time in ms, None means no debounce
+        @param eventQueue: None, or a KeyEventQueue events are pushed into
+        @param consumer: consumer label of lines
+        @param eventBufferSize: size of kernel event buffer, 0 means default ( 16 events per line )
+        \~chinese
+        @param buttons: 按钮ID数组，为芯片的线路偏移（树莓派 gpiochip0 上为 BCM 编号）
+        @param chip: GPIO 字符设备路径，默认：DEF_GPIO_CHIP
+        @param bias: KEY_BIAS_PULL_UP（低电平为按下）或 KEY_BIAS_PULL_DOWN（高电平为按下）
+        @param debounceTime: 内核消抖时间，单位 ms，None 表示不消抖
+        @param eventQueue: None，或推入事件的 KeyEventQueue
+        @param consumer: 线路的使用者标签
+        @param eventBufferSize: 内核事件缓冲区大小，0 表示默认（每条线路 16 个事件）
+        """
+        if len( buttons ) == 0 or len( buttons ) > GPIO_V2_LINES_MAX:
+            raise ValueError( "Invalid number of buttons: {}".format( len( buttons ) ) )
+        self._buttons = list( buttons )
+        self._lineIndex = dict( ( offset, i ) for i, offset in enumerate( self._buttons ) )
+        self._allMask = ( 1 << len( self._buttons ) ) - 1
+        self._chip = chip
+        self._bias = bias
+        self._debounceTime = debounceTime
+        self._eventQueue = eventQueue
+        self._consumer = consumer
+        self._eventBufferSize = eventBufferSize
+        self._callbacks = []
+
+    def _buildRequest(self):
+        n = len( self._buttons )
+        req = bytearray( GPIO_V2_LINE_REQUEST_SIZE )
+        struct.pack_into( "={}I".format( n ), req, _REQ_OFFSETS, *self._buttons )
+        struct.pack_into( "=32s", req, _REQ_CONSUMER, self._consumer.encode( "ascii" )[:31] )
+
+        flags = GPIO_V2_LINE_FLAG_INPUT | GPIO_V2_LINE_FLAG_EDGE_RISING | GPIO_V2_LINE_FLAG_EDGE_FALLING
+        if self._bias == KEY_BIAS_PULL_UP:
+            flags |= GPIO_V2_LINE_FLAG_BIAS_PULL_UP | GPIO_V2_LINE_FLAG_ACTIVE_LOW
+        else:
+            flags |= GPIO_V2_LINE_FLAG_BIAS_PULL_DOWN
+        struct.pack_into( "=Q", req, _REQ_CONFIG_FLAGS, flags )
+
+        if self._debounceTime:
+            # struct gpio_v2_line_config_attribute: id, padding, union ( u32 debounce_period_us ), mask
+            struct.pack_into( "=I", req, _REQ_CONFIG_NATTRS, 1 )
+            struct.pack_into( "=II", req, _REQ_CONFIG_ATTRS, GPIO_V2_LINE_ATTR_ID_DEBOUNCE, 0 )
+            struct.pack_into( "=I", req, _REQ_CONFIG_ATTRS + 8, int( self._debounceTime * 1000 ) )
+            struct.pack_into( "=Q", req, _REQ_CONFIG_ATTRS + 16, self._allMask )
+
+        struct.pack_into( "=II", req, _REQ_NUM_LINES, n, self._eventBufferSize )
+        return req
+
+    def open(self):
+        """!
+        \~english
+        Request key lines from the GPIO character device
+        @note Raise OSError / IOError when the chip or lines are not available ( eg. used by other consumer )
+        \~chinese
+        从 GPIO 字符设备申请按键线路
+        @note 芯片或线路不可用时（例如被其他使用者占用）抛出 OSError / IOError
+        """
+        if self._lineFd != None: return
+        chipFd = os.open( self._chip, os.O_RDONLY )
+        try:
+            req = self._buildRequest()
+            fcntl.ioctl( chipFd, GPIO_V2_GET_LINE_IOCTL, req, True )
+        finally:
+            os.close( chipFd )
+        self._lineFd = struct.unpack_from( "=i", req, _REQ_FD )[0]
+
+        if isinstance( self._eventQueue, KeyEventQueue ):
+            state = self.getKeyState()
+            for i, btnId in enumerate( self._buttons ):
+                self._eventQueue.registerKey( btnId, ( state >> i ) & 1 == 1 )
+
+    def close(self):
+        """!
+        \~english Stop reading and release key lines
+        \~chinese 停止读取并释放按键线路
+        """
+        self.stop()
+        if self._lineFd != None:
+            os.close( self._lineFd )
+            self._lineFd = None
+
+    def fileno(self):
+        """!
+        \~english @return file descriptor of key lines, it is readable when events are pending ( for select / poll )
+        \~chinese @return 按键线路的文件描述符，有待处理事件时可读（用于 select / poll）
+        """
+        return self._lineFd
+
+    def getKeyState(self):
+        """!
+        \~english
+        Read states of all keys in one ioctl
+        @return bitmask of pressed keys, bit i is buttons[i]
+        \~chinese
+        一次 ioctl 读取所有按键状态
+        @return 已按下按键的位掩码，第 i 位为 buttons[i]
+        """
+        values = bytearray( struct.pack( "=QQ", 0, self._allMask ) )
+        fcntl.ioctl( self._lineFd, GPIO_V2_LINE_GET_VALUES_IOCTL, values, True )
+        return struct.unpack_from( "=Q", values, 0 )[0] & self._allMask
+
+    def readKeyButton(self, btnId):
+        """!
+        \~english @return True if the key is pressed
+        \~chinese @return 按键按下时为 True
+        """
+        return ( self.getKeyState() >> self._lineIndex[btnId] ) & 1 == 1
+
+    def addCallback(self, callback):
+        """!
+        \~english
+        Add a callback of events, it is called on the reading thread
+        @param callback: a function with a KeyEvent argument
+        \~chinese
+        添加事件回调函数，在读取线程中调用
+        @param callback: 参数为 KeyEvent 的函数
+        """
+        self._callbacks.append( callback )
+
+    def readEvents(self, maxEvents = DEF_EVENT_READ_MAX):
+        """!
+        \~english
+        Read pending edge events in one read() syscall, it blocks if no event is pending
+        @param maxEvents: max number of events to read
+        @return a list of KeyEvent with kernel timestamps, state is None
+        \~chinese
+        一次 read() 系统调用读取待处理的边沿事件，没有待处理事件时阻塞
+        @param maxEvents: 最多读取的事件数
+        @return 带内核时间戳的 KeyEvent 列表，state 为 None
+        """
+        data = os.read( self._lineFd, GPIO_V2_LINE_EVENT_SIZE * maxEvents )
+        self._reads += 1
+        events = []
+        for pos in range( 0, len( data ) - GPIO_V2_LINE_EVENT_SIZE + 1, GPIO_V2_LINE_EVENT_SIZE ):
+            timestamp, eventId, offset, seqno, lineSeqno = struct.unpack_from( _EVENT_FORMAT, data, pos )
+            # Sequence numbers of a request are continuous, a gap means the kernel buffer overflowed
+            if self._lastSeqno != 0 and seqno > self._lastSeqno + 1:
+                self._lost += seqno - self._lastSeqno - 1
+            self._lastSeqno = seqno
+            kind = KEY_EVENT_DOWN if eventId == GPIO_V2_LINE_EVENT_RISING_EDGE else KEY_EVENT_UP
+            events.append( KeyEvent( kind, offset, timestamp, None ) )
+        self._events += len( events )
+        return events
+
+    def _dispatch(self, events):
+        queue = self._eventQueue
+        for event in events:
+            if queue != None:
+                queue.push( event.key, event.kind == KEY_EVENT_DOWN, event.timestamp )
+            for callback in self._callbacks:
+                callback( event )
+
+    def _run(self):
+        lineFd = self._lineFd
+        wakeFd = self._wakeFds[0]
+        while self._running:
+            readable = select.select( [ lineFd, wakeFd ], [], [] )[0]
+            if wakeFd in readable: break
+            self._dispatch( self.readEvents() )
+
+    def start(self):
+        """!
+        \~english Open lines if needed and start a thread which reads events into the queue and callbacks
+        \~chinese 如需要则打开线路，并启动将事件读入队列和回调函数的线程
+        """
+        if self._running: return
+        self.open()
+        self._wakeFds = os.pipe()
+        self._running = True
+        self._thread = threading.Thread( target = self._run, name = "RPiKeyGpioCdev" )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """!
+        \~english Stop the reading thread, lines are kept
+        \~chinese 停止读取线程，保留线路
+        """
+        if not self._running: return
+        self._running = False
+        os.write( self._wakeFds[1], b"x" )
+        self._thread.join()
+        self._thread = None
+        for fd in self._wakeFds:
+            os.close( fd )
+        self._wakeFds = None
+
+    def isRunning(self):
+        return self._running
+
+    def getStats(self):
+        """!
+        \~english @return a dictionary: reads ( read syscalls ), events, lost ( events lost by kernel buffer overflow )
+        \~chinese @return 字典：reads（read 系统调用数）, events（事件数）, lost（内核缓冲区溢出丢失的事件数）
+        """
+        reads = self._reads
+        return { "reads": reads, "events": self._events, "lost": self._lost,
+                 "events_per_read": float( self._events ) / reads if reads > 0 else 0.0 }
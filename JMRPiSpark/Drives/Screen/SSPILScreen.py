@@ -37,12 +37,23 @@ import PIL
 from PIL import ImageFont
 from PIL import Image
 from PIL import ImageDraw
+from PIL import ImageChops
 
 from .SScreen import SScreenBase
 from .SScreen import SSRect
+from .SScreen import SS_COLOR_MODE_MONO
+from .SScreen import SS_COLOR_MODE_GRAY
+from .SScreen import SS_COLOR_MODE_RGB
+from .SScreen import SS_COLOR_MODE_PALETTE
 
 DEF_SCR_FRONT = ImageFont.load_default()
 
+## Default threshold of converting greyscale or palette buffer to monochrome display
+DEF_MONO_THRESHOLD = 128
+
+## Default palette of SS_COLOR_MODE_PALETTE buffer: 256 grey levels, color index is the grey level
+DEF_PALETTE = [ (i, i, i) for i in range(256) ]
+
 class SSPILScreen( SScreenBase ):
     """!
     \~english
@@ -57,11 +68,137 @@ class SSPILScreen( SScreenBase ):
     Canvas 的所有绘图操作使用 PIL 图形库实现，例如： line(), rectangle(), 等。 
     请参阅： https://pillow.readthedocs.io/en/3.0.x/reference/ImageDraw.html
     """
+    # Threshold of converting "L" and "P" buffer to monochrome display
+    _mono_threshold = DEF_MONO_THRESHOLD
+    # Lookup tables for converting buffer to display format, built on first use.
+    # Cleared when buffer color mode or palette changed
+    _display_luts = None
+
+    def _getMonoTable(self, colorMode):
+        """!
+        \~english
+        Lookup table from pixel value ( grey level or palette index ) to monochrome
+        @return a list of 256 values ( 0 or 255 )
+        \~chinese
+        像素值（灰度或调色板索引）到单色的查找表
+        @return 256 个值（0 或 255）的列表
+        """
+        if self._display_luts is None: self._display_luts = {}
+        key = ("1", colorMode)
+        table = self._display_luts.get(key)
+        if table is None:
+            if colorMode == SS_COLOR_MODE_PALETTE:
+                # Same rounding as PIL convert("L"), so the table matches Image.convert
+                levels = [ (r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16 for (r, g, b) in self.getPalette() ]
+            else:
+                levels = range(256)
+            table = [ 255 if v >= self._mono_threshold else 0 for v in levels ]
+            self._display_luts[key] = table
+        return table
+
+    def _getRGB565Tables(self, colorMode):
+        """!
+        \~english
+        Lookup tables from pixel value ( grey level or palette index ) to RGB565
+        @return ( table of high bytes, table of low bytes ), each has 256 values
+        \~chinese
+        像素值（灰度或调色板索引）到 RGB565 的查找表
+        @return ( 高字节表, 低字节表 )，每个表有 256 个值
+        """
+        if self._display_luts is None: self._display_luts = {}
+        key = ("RGB565", colorMode)
+        tables = self._display_luts.get(key)
+        if tables is None:
+            if colorMode == SS_COLOR_MODE_PALETTE:
+                colors = self.getPalette()
+            else:
+                colors = [ (v, v, v) for v in range(256) ]
+            tables = (
+                [ (r & 0xF8) | (g >> 5) for (r, g, b) in colors ],
+                [ ((g & 0x1C) << 3) | (b >> 3) for (r, g, b) in colors ],
+            )
+            self._display_luts[key] = tables
+        return tables
+
+    def _toMono(self, image):
+        if image.mode == SS_COLOR_MODE_MONO:
+            return image
+        if image.mode != SS_COLOR_MODE_PALETTE:
+            image = image.convert( SS_COLOR_MODE_GRAY )
+        return image.point( self._getMonoTable(image.mode), SS_COLOR_MODE_MONO )
 
-    def _catchCurrentViewContent(self):
+    def _toRGB565(self, image):
+        """!
+        \~english
+        Pack an image into RGB565 bytes ( big-endian, 2 bytes per pixel ).
+        "L" and "P" images use lookup tables, all works are done by PIL.
+        \~chinese
+        将图像打包为 RGB565 字节（大端，每像素 2 字节）。
+        "L" 和 "P" 图像使用查找表，所有操作由 PIL 完成。
+        """
+        if image.mode == SS_COLOR_MODE_MONO:
+            image = image.convert( SS_COLOR_MODE_GRAY )
+
+        if image.mode in (SS_COLOR_MODE_GRAY, SS_COLOR_MODE_PALETTE):
+            highTable, lowTable = self._getRGB565Tables(image.mode)
+            high = image.point( highTable, SS_COLOR_MODE_GRAY )
+            low = image.point( lowTable, SS_COLOR_MODE_GRAY )
+        else:
+            r, g, b = image.convert( SS_COLOR_MODE_RGB ).split()
+            # The bits do not overlap, so add never overflow
+            high = ImageChops.add( r.point( lambda v: v & 0xF8 ), g.point( lambda v: v >> 5 ) )
+            low = ImageChops.add( g.point( lambda v: (v & 0x1C) << 3 ), b.point( lambda v: v >> 3 ) )
+        # "LA" image interleaves the two bands, [ high, low, high, low, ... ]
+        return Image.merge( "LA", (high, low) ).tobytes()
+
+    def setPalette(self, palette):
+        """!
+        \~english
+        Set palette of SS_COLOR_MODE_PALETTE ( "P" ) buffer
+        @param palette: a list of up to 256 (r, g, b) colors. eg. [ (0,0,0), (255,255,255), (255,0,0) ]
+        @note Then the color index can be used as fill color for drawing, eg. Canvas.rectangle( (0,0,10,10), fill=2 )
+        \~chinese
+        设定 SS_COLOR_MODE_PALETTE（"P"）缓存的调色板
+        @param palette: 最多 256 个 (r, g, b) 颜色的列表。例如：[ (0,0,0), (255,255,255), (255,0,0) ]
+        @note 之后绘图时可使用颜色索引作为填充颜色，例如：Canvas.rectangle( (0,0,10,10), fill=2 )
+        """
+        if self._buffer_color_mode != SS_COLOR_MODE_PALETTE:
+            raise ValueError("Palette just can be set in \"P\" buffer color mode")
+        if len(palette) > 256:
+            raise ValueError("Palette can have up to 256 colors")
+        data = []
+        for color in palette:
+            data.extend( color[:3] )
+        data.extend( [0] * (768 - len(data)) )
+        self._buffer.putpalette( data )
+        self._display_luts = None
+
+    def getPalette(self):
+        """!
+        \~english @return palette of buffer, a list of 256 (r, g, b) colors
+        \~chinese @return 缓存的调色板，256 个 (r, g, b) 颜色的列表
+        """
+        data = self._buffer.getpalette() or []
+        data = list(data) + [0] * (768 - len(data))
+        return [ tuple(data[i:i+3]) for i in range(0, 768, 3) ]
+
+    def setMonoThreshold(self, threshold = DEF_MONO_THRESHOLD):
+        """!
+        \~english
+        Set threshold of converting "L" or "P" buffer to monochrome display
+        @param threshold: 0 ~ 255, the grey level greater than or equal to it is white
+        \~chinese
+        设定 "L" 或 "P" 缓存转换为单色显示的阈值
+        @param threshold: 0 ~ 255，灰度大于或等于它的是白色
+        """
+        self._mono_threshold = threshold
+        self._display_luts = None
+
+    def _catchCurrentViewContent(self, convert = True):
         """!
         \~english
         Catch the current view content
+        @param convert: True - convert to display color mode, False - keep buffer color mode
         @return: a PIL Image
         @note 
             Automatically converts the cache color mode and at the 
@@ -70,34 +207,42 @@ class SSPILScreen( SScreenBase ):
 
         \~chinese
         从缓存中抓取当前视图大小的数据
+        @param convert: True - 转换为显示屏色彩模式, False - 保持缓存色彩模式
         @return: PIL Image 对象
         @note 自动转换缓存色彩模式，同时根据屏幕角度设定旋转所抓取的图像数据
         """
-        viewContent = None
-        if self._buffer_color_mode != self._display_color_mode:
-            viewContent = self._buffer.crop( self.View.rectToArray() ) .convert( self._display_color_mode )
-        else:
-            viewContent = self._buffer.crop( self.View.rectToArray() )
+        viewContent = self._buffer.crop( self.View.rectToArray() )
+        if convert and self._buffer_color_mode != self._display_color_mode:
+            if self._display_color_mode == SS_COLOR_MODE_MONO:
+                viewContent = self._toMono( viewContent )
+            else:
+                # Palette aware, PIL converts "P" by its palette
+                viewContent = viewContent.convert( self._display_color_mode )
 
-        # Rotate for display direction
-        if self._display_direction == 0:
+        # Rotate for display direction, the part done by display chip is skipped
+        if self._sw_direction == 0:
             return viewContent
         else:
-            return viewContent.rotate( angle = self._display_direction, expand=True )
+            return viewContent.rotate( angle = self._sw_direction, expand=True )
 
     def _initBuffer(self, bufferColorMode, bufferSize):
         """!
         \~english
         Initialize the buffer object instance, use PIL Image as for buffer
-        @param bufferColorMode: "RGB" or "1"
+        @param bufferColorMode: "RGB", "L", "P" or "1"
         @param bufferSize: (width, height)
+        @note "L" and "P" buffer use 1 byte per pixel, 1/3 memory of "RGB" buffer. 
+              "P" buffer starts with DEF_PALETTE, see SSPILScreen#setPalette
         \~chinese
         初始化缓冲区对象实例，使用PIL Image作为缓冲区
-        @param bufferColorMode: 色彩模式, 取值： "RGB" 或 "1"
+        @param bufferColorMode: 色彩模式, 取值： "RGB", "L", "P" 或 "1"
         @param bufferSize: 缓存大小 (width, height)，例如： (128, 64)
+        @note "L" 和 "P" 缓存每像素使用 1 字节，内存为 "RGB" 缓存的 1/3。
+              "P" 缓存初始调色板为 DEF_PALETTE，参见 SSPILScreen#setPalette
         """
         # super(SSScreenBase)._initBuffer(bufferColorMode, bufferSize)
         self._buffer_color_mode = bufferColorMode
+        self._display_luts = None
 
         #create screen image buffer and canvas
         if bufferSize==None:
@@ -105,6 +250,8 @@ class SSPILScreen( SScreenBase ):
         else:
             self._buffer = Image.new( bufferColorMode , bufferSize )        
         self.Canvas = ImageDraw.Draw( self._buffer )
+        if bufferColorMode == SS_COLOR_MODE_PALETTE:
+            self.setPalette( DEF_PALETTE )
 
         #creare screen view
         self.View = SSRect( 0, 0, self._display_size[0], self._display_size[1] )
@@ -112,6 +259,59 @@ class SSPILScreen( SScreenBase ):
     def getBufferSize(self):
         return self._buffer.size
 
+    def _convertBuffer(self, newColorMode):
+        """!
+        \~english
+        Convert buffer content to new color mode by PIL, the buffer size and View are kept.
+        Converting to "1" uses a threshold instead of dithering, so UI content stays sharp,
+        see SSPILScreen#setMonoThreshold.
+        Converting to "P" uses an adaptive palette.
+        \~chinese
+        使用 PIL 将缓存内容转换为新色彩模式，缓存大小和 View 保持不变。
+        转换为 "1" 时使用阈值而不是抖动，使 UI 内容保持清晰。
+        转换为 "P" 时使用自适应调色板。
+        """
+        buffer = self._buffer
+        if newColorMode == SS_COLOR_MODE_MONO:
+            buffer = self._toMono( buffer )
+        elif newColorMode == SS_COLOR_MODE_PALETTE and buffer.mode == "RGB":
+            buffer = buffer.convert(newColorMode, palette = Image.ADAPTIVE, colors = 256)
+        else:
+            buffer = buffer.convert(newColorMode)
+
+        self._buffer = buffer
+        self._buffer_color_mode = newColorMode
+        self._display_luts = None
+        self.Canvas = ImageDraw.Draw( self._buffer )
+
+    def _rotateBuffer(self, angle):
+        """!
+        \~english
+        Rotate buffer content counter clockwise by PIL transpose, the View moves with 
+        the content, so the display keeps showing the same picture
+        @param angle: 0, 90, 180 or 270
+        \~chinese
+        使用 PIL transpose 逆时针旋转缓存内容，View 随内容一起移动，显示屏上的画面保持不变
+        @param angle: 0, 90, 180 或 270
+        """
+        if angle == 0: return
+        width, height = self._buffer.size
+        view = self.View
+        if angle == 90:
+            self._buffer = self._buffer.transpose( Image.ROTATE_90 )
+            view.moveTo( view.y, width - view.x - view.width )
+            view.swapWH()
+        elif angle == 180:
+            self._buffer = self._buffer.transpose( Image.ROTATE_180 )
+            view.moveTo( width - view.x - view.width, height - view.y - view.height )
+        elif angle == 270:
+            self._buffer = self._buffer.transpose( Image.ROTATE_270 )
+            view.moveTo( height - view.y - view.height, view.x )
+            view.swapWH()
+        else:
+            raise ValueError("Display direction can be chosen: 0, 90, 180, 270")
+        self.Canvas = ImageDraw.Draw( self._buffer )
+
 #     def refresh(self):
 #         """Update current view content to display
 #         """
@@ -186,6 +386,7 @@ class SSPILScreen( SScreenBase ):
             * PIL ImageFile
             * 字典, eg. { "size":(width, height), "color_mode":"1" } or { "size":(width, height), "color_mode":"RGB" } 
         """
+        self._display_luts = None
         # Redefine Frame from an image object
         if type(self._buffer) == type(newBuffer):
             self._buffer = newBuffer
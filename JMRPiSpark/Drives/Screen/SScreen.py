@@ -29,12 +29,25 @@
 #    v1.0.0
 #
 
+import threading
+import time
+
 # Display color mode
 
 ## Mono color mode
 SS_COLOR_MODE_MONO  = "1"
 ## RGB color mode
 SS_COLOR_MODE_RGB   = "RGB"
+## Greyscale color mode, 8 bits per pixel
+SS_COLOR_MODE_GRAY  = "L"
+## Palette color mode, up to 256 colors
+SS_COLOR_MODE_PALETTE = "P"
+
+## All buffer color modes
+SS_BUFFER_COLOR_MODES = ( SS_COLOR_MODE_MONO, SS_COLOR_MODE_GRAY, SS_COLOR_MODE_RGB, SS_COLOR_MODE_PALETTE )
+
+## Default render tick rate of refresh scheduler ( frames per second )
+DEF_REFRESH_FPS     = 30
 
 class SSPoint:
     """!
@@ -179,6 +192,10 @@ class SScreenBase:
 
     # Display direction can choos in 0, 90, 180, 270
     _display_direction = None
+    # Part of display direction which is rotated by software, the rest is done by display chip
+    _sw_direction = 0
+    # Capabilities of display, see RPiDiaplay#getCapabilities. Empty for other drivers
+    _display_caps = None
     # Display's size, it init at intance when __init__ (x,y), and it keep same direction whit "_display_direction"
     # If you need to access the physical size, use the “Display” object
     _display_size = None #(0,0)
@@ -198,6 +215,17 @@ class SScreenBase:
     # Screen buffer, its size can diffent from display size.
     _buffer = None
 
+    # Refresh scheduler, it is None when refresh() updates display immediately
+    _refresh_thread = None
+    _refresh_stop = None
+    _refresh_interval = None
+    _refresh_dirty = False
+    # Protect dirty flag and counters
+    _refresh_lock = None
+    # Only one real refresh at same time
+    _render_lock = None
+    _refresh_stats = None
+
     def __init__(self, display, bufferColorMode, bufferSize=None, displayDirection=0 ):
         raise NotImplementedError
 
@@ -210,6 +238,40 @@ class SScreenBase:
             self._display_size = displaySize
 
         self.Display = display
+        self._resolveDisplayPath()
+
+    def _resolveDisplayPath(self):
+        """!
+        \~english
+        Read capabilities of display once, and choose the fastest way to update display.
+        Subclasses extend it to choose their per-frame update function.
+        \~chinese
+        一次性读取显示屏能力，并选择最快的显示更新方式。
+        子类可扩展它来选择每帧的更新函数。
+        """
+        getCapabilities = getattr(self.Display, "getCapabilities", None)
+        self._display_caps = getCapabilities() if getCapabilities != None else {}
+        self._applyDisplayDirection()
+
+    def _applyDisplayDirection(self):
+        """!
+        \~english
+        Split display direction into the rotation done by display chip and 
+        the rotation done by software
+        \~chinese
+        将显示方向拆分为显示芯片完成的旋转和软件完成的旋转
+        """
+        direction = self._display_direction % 360
+        hwRotations = self._display_caps.get("hw_rotation", (0,))
+        hwDirection = 0
+        if direction in hwRotations:
+            hwDirection = direction
+        elif direction >= 180 and 180 in hwRotations:
+            hwDirection = 180
+
+        if len(hwRotations) > 1:
+            self.Display.setRotation( hwDirection )
+        self._sw_direction = direction - hwDirection
 
     def _initBuffer(self, bufferColorMode, bufferSize):
         self._buffer_color_mode = bufferColorMode
@@ -241,16 +303,163 @@ class SScreenBase:
         检测缓存色彩模式
         @param bufferColorMode: 
         """
-        if bufferColorMode != SS_COLOR_MODE_RGB and bufferColorMode != SS_COLOR_MODE_MONO:
-            raise ValueError("Incorrect bufferColorMode mode, this value just can be chosen: \"RGB\" or \"1\" ")
+        if bufferColorMode not in SS_BUFFER_COLOR_MODES:
+            raise ValueError("Incorrect bufferColorMode mode, this value just can be chosen: \"RGB\", \"L\", \"P\" or \"1\" ")
 
-    def refresh(self):
+    def _refresh(self):
         """!
-        \~english Update current view content to display
-        \~chinese 更新当前 View 内容到显示屏
+        \~english
+        Update current view content to display immediately.
+        waitting for subclasses implement
+        \~chinese
+        立即更新当前 View 内容到显示屏，等待子类实现
         """
         raise NotImplementedError
 
+    def _renderNow(self):
+        if self._render_lock is None:
+            self._refresh()
+            return
+        with self._render_lock:
+            self._refresh()
+
+    def _refreshTicker(self):
+        nextTick = time.time() + self._refresh_interval
+        while not self._refresh_stop.wait( max(0, nextTick - time.time()) ):
+            nextTick += self._refresh_interval
+            # Skip missed ticks, do not try to catch up
+            if nextTick < time.time():
+                nextTick = time.time() + self._refresh_interval
+
+            with self._refresh_lock:
+                if not self._refresh_dirty: continue
+                self._refresh_dirty = False
+                self._refresh_stats["rendered"] += 1
+            self._renderNow()
+
+    def enableRefreshScheduler(self, fps = DEF_REFRESH_FPS):
+        """!
+        \~english
+        Enable refresh scheduler. After enabled, SScreenBase#refresh only marks the
+        screen dirty and a render tick updates the display at most once per tick.
+        Many refresh requests between two ticks ( eg. from key callbacks, timers
+        and main loop ) are coalesced into one real refresh.
+        @param fps: render tick rate, default: DEF_REFRESH_FPS (30)
+
+        \~chinese
+        启用刷新调度器。启用后 SScreenBase#refresh 仅将屏幕标记为待刷新，
+        由渲染节拍在每个节拍内最多更新一次显示屏。
+        两个节拍之间的多次刷新请求（例如来自按键回调，定时器和主循环）将合并为一次真正的刷新。
+        @param fps: 渲染节拍频率，默认：DEF_REFRESH_FPS (30)
+
+        \~ \n
+        @see refreshNow
+        @see getRefreshStats
+        """
+        if fps <= 0:
+            raise ValueError("fps must be greater than 0")
+        self.disableRefreshScheduler()
+
+        self._refresh_lock = threading.Lock()
+        self._render_lock = threading.RLock()
+        self._refresh_dirty = False
+        self._refresh_interval = 1.0 / fps
+        self._refresh_stats = { "requests": 0, "coalesced": 0, "rendered": 0, "forced": 0 }
+        self._refresh_stop = threading.Event()
+        self._refresh_thread = threading.Thread( target = self._refreshTicker, name = "SScreenRefresh" )
+        self._refresh_thread.daemon = True
+        self._refresh_thread.start()
+
+    def disableRefreshScheduler(self, flush = True):
+        """!
+        \~english
+        Disable refresh scheduler, SScreenBase#refresh updates display immediately again
+        @param flush: True - do the pending refresh before return
+        \~chinese
+        停用刷新调度器，SScreenBase#refresh 恢复为立即更新显示屏
+        @param flush: True - 返回前完成等待中的刷新
+        """
+        if self._refresh_thread is None: return
+        self._refresh_stop.set()
+        self._refresh_thread.join()
+        self._refresh_thread = None
+
+        with self._refresh_lock:
+            dirty = self._refresh_dirty
+            self._refresh_dirty = False
+        if dirty and flush:
+            self._renderNow()
+
+    def isRefreshScheduled(self):
+        """!
+        \~english @return True if refresh scheduler is enabled
+        \~chinese @return 如果刷新调度器已启用返回 True
+        """
+        return self._refresh_thread is not None
+
+    def refresh(self):
+        """!
+        \~english
+        Update current view content to display.
+        If refresh scheduler is enabled, just marks the screen dirty and the next
+        render tick will update the display
+
+        \~chinese
+        更新当前 View 内容到显示屏。
+        如果启用了刷新调度器，仅将屏幕标记为待刷新，由下一个渲染节拍更新显示屏
+
+        \~ \n
+        @see enableRefreshScheduler
+        """
+        if self._refresh_thread is None:
+            self._renderNow()
+            return
+
+        with self._refresh_lock:
+            self._refresh_stats["requests"] += 1
+            if self._refresh_dirty:
+                self._refresh_stats["coalesced"] += 1
+            self._refresh_dirty = True
+
+    def refreshNow(self):
+        """!
+        \~english
+        Update current view content to display immediately, even if refresh scheduler is enabled.
+        A pending scheduled refresh is satisfied by this refresh.
+        \~chinese
+        立即更新当前 View 内容到显示屏，即使已启用刷新调度器。
+        等待中的调度刷新将由本次刷新完成。
+        """
+        if self._refresh_thread is not None:
+            with self._refresh_lock:
+                self._refresh_stats["forced"] += 1
+                if self._refresh_dirty:
+                    self._refresh_stats["coalesced"] += 1
+                self._refresh_dirty = False
+        self._renderNow()
+
+    def getRefreshStats(self):
+        """!
+        \~english
+        Get statistics of refresh scheduler
+        @return a dictionary, eg. { "requests": 120, "coalesced": 90, "rendered": 28, "forced": 2 }
+            * requests: number of SScreenBase#refresh calls while scheduler enabled
+            * coalesced: number of requests merged into another refresh
+            * rendered: number of real refreshes done by render tick
+            * forced: number of SScreenBase#refreshNow calls
+        \~chinese
+        读取刷新调度器统计数据
+        @return 字典，例如：{ "requests": 120, "coalesced": 90, "rendered": 28, "forced": 2 }
+            * requests: 调度器启用时 SScreenBase#refresh 的调用次数
+            * coalesced: 被合并到其它刷新中的请求次数
+            * rendered: 渲染节拍完成的真正刷新次数
+            * forced: SScreenBase#refreshNow 的调用次数
+        """
+        if self._refresh_stats is None:
+            return { "requests": 0, "coalesced": 0, "rendered": 0, "forced": 0 }
+        with self._refresh_lock:
+            return dict(self._refresh_stats)
+
     def clear(self):
         """!
         \~english Clear screen
@@ -267,15 +476,31 @@ class SScreenBase:
         
         \~
         @note
-        \~english after rotate the View resize to screen size 
-        \~chinese 改变方向后，默认的 View 大小会更新为当前 Screen 的大小
+        \~english after rotate the drawn content and the View are rotated with the screen, so the display keeps showing the same picture
+        \~chinese 改变方向后，已绘制的内容和 View 随屏幕一起旋转，显示屏上的画面保持不变
         \~\n
         """
         if self._needSwapWH(self._display_direction, displayDirection):
             self._display_size = ( self._display_size[1], self._display_size[0] )
-            if self.redefineBuffer( { "size":self._display_size, "color_mode":self._buffer_color_mode } ):
-                self.View.resize(self._display_size[0], self._display_size[1])
+        self._rotateBuffer( (self._display_direction - displayDirection) % 360 )
         self._display_direction = displayDirection
+        self._applyDisplayDirection()
+
+    def _rotateBuffer(self, angle):
+        """!
+        \~english
+        Rotate buffer content counter clockwise after the screen direction changed.
+        Subclasses should keep the drawn content, this default implementation recreates 
+        an empty buffer with the new screen size.
+        @param angle: 0, 90, 180 or 270
+        \~chinese
+        屏幕方向改变后逆时针旋转缓存内容。
+        子类应保留已绘制的内容，默认实现以新的屏幕大小重新创建一个空缓存。
+        @param angle: 0, 90, 180 或 270
+        """
+        if angle % 180 == 0: return
+        if self.redefineBuffer( { "size":self._display_size, "color_mode":self._buffer_color_mode } ):
+            self.View.resize(self._display_size[0], self._display_size[1])
 
     def redefineBuffer(self, newFrame ):
         """!
@@ -291,15 +516,32 @@ class SScreenBase:
     def changeBufferColorMode(self, newColorMode = SS_COLOR_MODE_MONO):
         """!
         \~english 
-        Change buffer color mode
-        @param newColorMode: new color mode. it can be chosen: { SS_COLOR_MODE_MONO | SS_COLOR_MODE_RGB }
+        Change buffer color mode, the drawn content is kept and converted to the new color mode
+        @param newColorMode: new color mode. it can be chosen: 
+               { SS_COLOR_MODE_MONO | SS_COLOR_MODE_GRAY | SS_COLOR_MODE_RGB | SS_COLOR_MODE_PALETTE }
         \~chinese
-        改变缓存色彩模式
-        @param newColorMode: 新色彩模式。 可选值： SS_COLOR_MODE_MONO 或 SS_COLOR_MODE_RGB
+        改变缓存色彩模式，已绘制的内容被保留并转换为新色彩模式
+        @param newColorMode: 新色彩模式。 可选值： SS_COLOR_MODE_MONO, SS_COLOR_MODE_GRAY, SS_COLOR_MODE_RGB 或 SS_COLOR_MODE_PALETTE
 
         \~ \n 
         @see SS_COLOR_MODE_MONO
+        @see SS_COLOR_MODE_GRAY
         @see SS_COLOR_MODE_RGB
+        @see SS_COLOR_MODE_PALETTE
+        """
+        self._checkBufferColorMode(newColorMode)
+        if newColorMode == self._buffer_color_mode: return
+        self._convertBuffer(newColorMode)
+
+    def _convertBuffer(self, newColorMode):
+        """!
+        \~english
+        Convert buffer content to new color mode.
+        This default implementation recreates an empty buffer with display size, 
+        subclasses should keep the drawn content.
+        \~chinese
+        将缓存内容转换为新色彩模式。
+        默认实现以显示屏大小重新创建一个空缓存，子类应保留已绘制的内容。
         """
         self._initBuffer(newColorMode, None)
 
@@ -1,9 +1,11 @@
 
 from .SSPILScreen import SSPILScreen
+from ..Display.RPiDisplay import DSP_PIXEL_FORMAT_RGB565
 
 class SScreenILI9341( SSPILScreen ):
     """This class work with PIL Lib.
     """
+    _raw_rgb565 = False
 
     def __init__(self, display, bufferColorMode, bufferSize=None, displayDirection=0 ):
         self._checkBufferColorMode(bufferColorMode)
@@ -16,10 +18,21 @@ class SScreenILI9341( SSPILScreen ):
         self._initBuffer( bufferColorMode, bufferSize )
         pass
 
-    def refresh(self):
+    def _resolveDisplayPath(self):
+        """Choose RGB565 raw frames for displays with native RGB565 pixel format,
+        otherwise send PIL images
+        """
+        SSPILScreen._resolveDisplayPath(self)
+        self._raw_rgb565 = self._display_caps.get("pixel_format") == DSP_PIXEL_FORMAT_RGB565
+
+    def _refresh(self):
         """Update current view content to display
         """
-        self.Display.display( self._catchCurrentViewContent() )
+        if self._raw_rgb565:
+            # "L" and "P" buffers are packed by lookup tables without RGB conversion
+            self.Display.display( self._toRGB565( self._catchCurrentViewContent( convert = False ) ) )
+        else:
+            self.Display.display( self._catchCurrentViewContent() )
         pass
 
     def clear(self):
@@ -68,24 +68,52 @@ class SScreenSSD1306( SSPILScreen ):
         # Initialize buffer and canvas
         self._initBuffer( bufferColorMode, bufferSize )
 
-    def refresh(self):
+    # Per-frame display update function, chosen by _resolveDisplayPath
+    _updateDisplay = None
+
+    def _resolveDisplayPath(self):
         """!
         \~english
-        Update current view content to display
+        Choose the display update function once.
         Supported: JMRPiDisplay_SSD1306 and Adafruit SSD1306 driver
 
         \~chinese
-        更新当前视图内容到显示屏
+        一次性选择显示更新函数。
         支持: JMRPiDisplay_SSD1306 和 Adafruit SSD1306 driver
         """
-        try:
+        SSPILScreen._resolveDisplayPath(self)
+        if self._display_caps:
             # suport for RPiDisplay SSD1306 driver
-            self.Display.setImage( self._catchCurrentViewContent() )
-        except:
-            try:
-                # suport for Adafruit SSD1306 driver
-                self.Display.image( self._catchCurrentViewContent() )
-            except:
-                raise "Can not update image to buffer."
+            if self._display_caps.get("partial_update"):
+                self._updateDisplay = self._updatePartial
+            else:
+                self._updateDisplay = self._updateFull
+        elif hasattr(self.Display, "image"):
+            # suport for Adafruit SSD1306 driver
+            self._updateDisplay = self._updateAdafruit
+        else:
+            self._updateDisplay = self._updateFull
+
+    def _updateFull(self, image):
+        self.Display.setImage( image )
+        self.Display.display()
 
-        self.Display.display()
\ No newline at end of file
+    def _updatePartial(self, image):
+        self.Display.setImage( image )
+        self.Display.displayChanged()
+
+    def _updateAdafruit(self, image):
+        self.Display.image( image )
+        self.Display.display()
+
+    def _refresh(self):
+        """!
+        \~english
+        Update current view content to display
+        Supported: JMRPiDisplay_SSD1306 and Adafruit SSD1306 driver
+
+        \~chinese
+        更新当前视图内容到显示屏
+        支持: JMRPiDisplay_SSD1306 和 Adafruit SSD1306 driver
+        """
+        self._updateDisplay( self._catchCurrentViewContent() )
\ No newline at end of file
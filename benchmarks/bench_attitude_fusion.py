@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# Benchmark of attitude filters: updates per second of AttitudeFilter#update,
+# AttitudeFilter#updateBatch with a list of MPUSample and with a numpy structured array
+#
+# python benchmarks/bench_attitude_fusion.py [ samples ]
+#
+
+import math
+import os
+import sys
+import timeit
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), ".." ) )
+
+import numpy
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPUSample, MPU_SAMPLE_DTYPE
+from JMRPiSpark.Drives.Attitude.AttitudeFusion import ComplementaryFilter, MadgwickFilter, MahonyFilter
+
+def makeSamples(n, rate = 200.0):
+    samples = []
+    for k in range( n ):
+        t = k / rate
+        roll = math.radians( 30.0 * math.sin( t ) )
+        samples.append( MPUSample( t, 0.0, math.sin( roll ), math.cos( roll ), 25.0, 30.0 * math.cos( t ), 1.0, -1.0 ) )
+    return samples
+
+def _rate(func, n, repeat = 5):
+    best = min( timeit.repeat( func, number = 1, repeat = repeat ) )
+    return n / best
+
+def main(n = 10000):
+    samples = makeSamples( n )
+    array = numpy.array( [ tuple( s ) for s in samples ], dtype = MPU_SAMPLE_DTYPE )
+    print( "samples: {}".format( n ) )
+    print( "{:<20} {:>12} {:>20} {:>21} {:>8}".format( "filter", "update /s", "updateBatch list /s", "updateBatch numpy /s", "speedup" ) )
+    for filterClass in ( ComplementaryFilter, MadgwickFilter, MahonyFilter ):
+        def single():
+            attitude = filterClass()
+            update = attitude.update
+            for sample in samples:
+                update( sample )
+        def batchList():
+            filterClass().updateBatch( samples )
+        def batchArray():
+            filterClass().updateBatch( array )
+        rates = ( _rate( single, n ), _rate( batchList, n ), _rate( batchArray, n ) )
+        print( "{:<20} {:>12.0f} {:>20.0f} {:>21.0f} {:>7.2f}x".format( filterClass.__name__, rates[0], rates[1], rates[2], rates[2] / rates[0] ) )
+
+if __name__ == "__main__":
+    main( int( sys.argv[1] ) if len( sys.argv ) > 1 else 10000 )
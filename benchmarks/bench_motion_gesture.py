@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# Benchmark of motion gesture detection: CPU time per 1000 samples of MotionGesture#update and
+# MotionGesture#updateBatch over a synthetic trace ( taps, tilt, free fall and shake ),
+# and the CPU load at a sample rate. Run it on the target, eg. a Pi Zero
+#
+# python benchmarks/bench_motion_gesture.py [ samples ] [ rate ]
+#
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), ".." ) )
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPUSample, GRAVITIY_EARTH
+from JMRPiSpark.Drives.Attitude.MotionGesture import MotionGesture
+
+# CPU time of this process, time.clock on Python 2
+_cpuTime = getattr( time, "process_time", None ) or time.clock
+
+def makeSamples(n, rate = 200.0):
+    """Repeat a trace of rest, double tap, tilt, free fall and shake ( accel in g ) up to n samples"""
+    trace = []
+    def add(count, accel):
+        for k in range( count ):
+            trace.append( accel( k ) )
+    add( 200, lambda k: ( 0.0, 0.0, 1.0 ) )
+    add( 3, lambda k: ( 0.0, 0.0, 3.0 ) )
+    add( 30, lambda k: ( 0.0, 0.0, 1.0 ) )
+    add( 3, lambda k: ( 0.0, 0.0, 3.0 ) )
+    add( 200, lambda k: ( 0.0, 0.0, 1.0 ) )
+    add( 200, lambda k: ( 0.0, math.sin( math.radians( 45 ) ), math.cos( math.radians( 45 ) ) ) )
+    add( 200, lambda k: ( 0.0, 0.0, 1.0 ) )
+    add( 40, lambda k: ( 0.0, 0.0, 0.05 ) )
+    add( 200, lambda k: ( 0.0, 0.0, 1.0 ) )
+    add( 200, lambda k: ( 1.5 * math.sin( k * 0.6 ), 0.0, 1.0 ) )
+    g = GRAVITIY_EARTH
+    samples = []
+    for i in range( n ):
+        ax, ay, az = trace[i % len( trace )]
+        samples.append( MPUSample( i / rate, ax * g, ay * g, az * g, 25.0, 0.0, 0.0, 0.0 ) )
+    return samples
+
+def _cpuPer1000(func, n, repeat = 5):
+    best = None
+    for i in range( repeat ):
+        start = _cpuTime()
+        func()
+        used = _cpuTime() - start
+        if best == None or used < best: best = used
+    return best / n * 1000.0
+
+def main(n = 20000, rate = 200.0):
+    samples = makeSamples( n, rate )
+    events = []
+    def single():
+        gesture = MotionGesture( rate )
+        gesture.addCallback( events.append )
+        update = gesture.update
+        for sample in samples:
+            update( sample )
+    def batch():
+        MotionGesture( rate ).updateBatch( samples )
+
+    print( "samples: {}, rate: {:.0f} Hz".format( n, rate ) )
+    print( "{:<12} {:>22} {:>18}".format( "method", "CPU ms / 1000 samples", "CPU load @ rate" ) )
+    for name, func in ( ( "update", single ), ( "updateBatch", batch ) ):
+        cost = _cpuPer1000( func, n )
+        print( "{:<12} {:>22.2f} {:>17.2f}%".format( name, cost * 1000.0, cost / 1000.0 * rate * 100.0 ) )
+    print( "events per run: {}".format( len( events ) // 5 ) )
+
+if __name__ == "__main__":
+    main( int( sys.argv[1] ) if len( sys.argv ) > 1 else 20000,
+          float( sys.argv[2] ) if len( sys.argv ) > 2 else 200.0 )
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2018 Kunpeng Zhang
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# #########################################################
+#
+# Benchmark of SSPILScreen buffer conversion, rotation and display format packing
+# on large virtual buffers, no hardware is needed
+#
+# python benchmarks/bench_screen_conversion.py [ width height ]
+#
+
+import os
+import sys
+import timeit
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), ".." ) )
+
+from JMRPiSpark.Drives.Display.VirtualDisplay import VirtualRGBDisplay
+from JMRPiSpark.Drives.Screen.SScreenILI9341 import SScreenILI9341
+
+def _newScreen(mode, size):
+    screen = SScreenILI9341( VirtualRGBDisplay(), mode, bufferSize = size )
+    for i in range( 0, size[0], 16 ):
+        y0, y1 = sorted( ( i % size[1], ( i * 3 ) % size[1] ) )
+        screen.Canvas.rectangle( ( i, y0, i + 12, y1 ), fill = ( i & 0xFF ) if mode != "RGB" else ( i & 0xFF, 0x80, 0x40 ) )
+    return screen
+
+def _bench(name, func, setup = None, number = 10):
+    times = []
+    for _ in range( number ):
+        if setup != None: setup()
+        times.append( timeit.timeit( func, number = 1 ) )
+    times.sort()
+    print( "{:<36} best {:8.2f} ms   median {:8.2f} ms".format( name, times[0] * 1000, times[len( times ) // 2] * 1000 ) )
+
+def main(width = 1280, height = 960):
+    size = ( width, height )
+    print( "buffer size: {} x {}".format( width, height ) )
+
+    for src, dst in ( ("RGB", "1"), ("RGB", "L"), ("RGB", "P"), ("1", "RGB"), ("L", "1"), ("P", "RGB") ):
+        holder = {}
+        def setup(src = src):
+            holder["screen"] = _newScreen( src, size )
+        _bench( "changeBufferColorMode {} -> {}".format( src, dst ),
+                lambda dst = dst: holder["screen"].changeBufferColorMode( dst ), setup )
+
+    for mode in ("1", "L", "RGB"):
+        screen = _newScreen( mode, size )
+        for angle in (90, 180, 270):
+            _bench( "rotateDirection {} {} and back".format( mode, angle ),
+                    lambda angle = angle: ( screen.rotateDirection( angle ), screen.rotateDirection( 0 ) ) )
+
+    for mode in ("1", "L", "P", "RGB"):
+        screen = _newScreen( mode, size )
+        _bench( "_toMono {}".format( mode ), lambda: screen._toMono( screen._buffer ) )
+        _bench( "_toRGB565 {}".format( mode ), lambda: screen._toRGB565( screen._buffer ) )
+
+if __name__ == "__main__":
+    if len( sys.argv ) == 3:
+        main( int( sys.argv[1] ), int( sys.argv[2] ) )
+    else:
+        main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# Accuracy checks of attitude filters against a synthetic motion trace:
+# known rotation, accelerometer and gyroscope noise and gyroscope bias
+#
+
+import math
+import random
+
+import numpy
+import pytest
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPUSample, MPU_SAMPLE_DTYPE
+from JMRPiSpark.Drives.Attitude.AttitudeFusion import ComplementaryFilter, MadgwickFilter, MahonyFilter
+from JMRPiSpark.Drives.Attitude.AttitudeFusion import eulerToQuaternion, quaternionToEuler
+
+RATE = 100.0
+SECONDS = 30.0
+SETTLE = 10.0
+GYRO_BIAS = ( 0.5, -0.4, 0.3 )      # deg/s
+GYRO_NOISE = 0.1                    # deg/s
+ACCEL_NOISE = 0.02                  # g
+
+def _qmul(a, b):
+    w1, x1, y1, z1 = a
+    w2, x2, y2, z2 = b
+    return ( w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2, w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+             w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2, w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2 )
+
+def _rates(t):
+    # Body angular rates in deg/s
+    return ( 40.0 * math.sin( 2 * math.pi * 0.2 * t ), 30.0 * math.cos( 2 * math.pi * 0.15 * t ), 20.0 )
+
+def makeTrace(seed = 1):
+    """Samples of MPU6050 and true Euler angles of a known rotation"""
+    rnd = random.Random( seed )
+    q = eulerToQuaternion( 5.0, -5.0, 0.0 )
+    substeps = 10
+    samples = []
+    truth = []
+    for k in range( int( RATE * SECONDS ) ):
+        t = k / RATE
+        w = _rates( t )
+        # Gravity in body frame
+        g = _qmul( _qmul( ( q[0], -q[1], -q[2], -q[3] ), ( 0.0, 0.0, 0.0, 1.0 ) ), q )
+        samples.append( MPUSample( t,
+            g[1] + rnd.gauss( 0, ACCEL_NOISE ), g[2] + rnd.gauss( 0, ACCEL_NOISE ), g[3] + rnd.gauss( 0, ACCEL_NOISE ), 25.0,
+            w[0] + GYRO_BIAS[0] + rnd.gauss( 0, GYRO_NOISE ), w[1] + GYRO_BIAS[1] + rnd.gauss( 0, GYRO_NOISE ),
+            w[2] + GYRO_BIAS[2] + rnd.gauss( 0, GYRO_NOISE ) ) )
+        truth.append( quaternionToEuler( q ) )
+        # Integrate the true rotation with small steps
+        h = 1.0 / ( RATE * substeps )
+        for j in range( substeps ):
+            w = _rates( t + j * h )
+            d = _qmul( q, ( 0.0, math.radians( w[0] ), math.radians( w[1] ), math.radians( w[2] ) ) )
+            q = tuple( a + 0.5 * h * b for a, b in zip( q, d ) )
+            n = math.sqrt( sum( a * a for a in q ) )
+            q = tuple( a / n for a in q )
+    return samples, truth
+
+def _angleError(a, b):
+    return abs( ( a - b + 180.0 ) % 360.0 - 180.0 )
+
+# Bounds of roll / pitch error in degrees after settling: ( rms, max )
+@pytest.mark.parametrize( "filterClass, rmsBound, maxBound", [
+    ( ComplementaryFilter, 1.0, 4.0 ),
+    ( MadgwickFilter, 1.0, 5.0 ),
+    ( MahonyFilter, 1.0, 5.0 ),
+] )
+def test_filter_tracks_synthetic_rotation(filterClass, rmsBound, maxBound):
+    samples, truth = makeTrace()
+    attitude = filterClass()
+    errors = []
+    for i, sample in enumerate( samples ):
+        roll, pitch, yaw = attitude.update( sample )
+        if i >= SETTLE * RATE:
+            errors.append( _angleError( roll, truth[i][0] ) )
+            errors.append( _angleError( pitch, truth[i][1] ) )
+    rms = math.sqrt( sum( e * e for e in errors ) / len( errors ) )
+    assert rms < rmsBound
+    assert max( errors ) < maxBound
+
+@pytest.mark.parametrize( "filterClass", [ ComplementaryFilter, MadgwickFilter, MahonyFilter ] )
+def test_batch_update_matches_update(filterClass):
+    samples = makeTrace()[0][:500]
+    single = filterClass()
+    for sample in samples:
+        single.update( sample )
+    batchList = filterClass()
+    batchList.updateBatch( samples )
+    batchArray = filterClass()
+    batchArray.updateBatch( numpy.array( [ tuple( s ) for s in samples ], dtype = MPU_SAMPLE_DTYPE ) )
+    for other in ( batchList, batchArray ):
+        for a, b in zip( single.getQuaternion(), other.getQuaternion() ):
+            assert abs( a - b ) < 1e-9
+
+_NAN = float("nan")
+
+def _isFinite(angles):
+    return all( a - a == 0.0 for a in angles )
+
+@pytest.mark.parametrize( "filterClass", [ ComplementaryFilter, MadgwickFilter, MahonyFilter ] )
+def test_nan_accel_skips_correction(filterClass):
+    samples = makeTrace()[0][:200]
+    attitude = filterClass()
+    attitude.update( samples[0] )
+    attitude.update( samples[1]._replace( accel_x = _NAN, accel_y = _NAN, accel_z = _NAN ) )
+    for sample in samples[2:102]:
+        euler = attitude.update( sample )
+    assert _isFinite( euler )
+    # Accelerometer not captured at all, gyroscope still integrates
+    for sample in samples[102:]:
+        euler = attitude.update( sample._replace( accel_x = _NAN, accel_y = _NAN, accel_z = _NAN ) )
+    assert _isFinite( euler )
+
+@pytest.mark.parametrize( "filterClass", [ ComplementaryFilter, MadgwickFilter, MahonyFilter ] )
+def test_missing_fields_are_skipped(filterClass):
+    samples = makeTrace()[0][:100]
+    reference = filterClass()
+    for sample in samples:
+        reference.update( sample )
+
+    # readFifo gives None for fields not in FIFO, arrays give NaN
+    attitude = filterClass()
+    attitude.update( samples[0]._replace( accel_x = None, accel_y = None, accel_z = None ) )
+    for sample in samples:
+        attitude.update( sample )
+        attitude.update( sample._replace( gyro_x = None, gyro_y = None, gyro_z = None ), dt = 0.01 )
+        attitude.update( sample._replace( gyro_x = _NAN ), dt = 0.01 )
+    for a, b in zip( reference.getQuaternion(), attitude.getQuaternion() ):
+        assert abs( a - b ) < 1e-9
+
+    array = numpy.array( [ tuple( s ) for s in samples ], dtype = MPU_SAMPLE_DTYPE )
+    array["gyro_y"][10:20] = _NAN
+    array["accel_x"][0] = _NAN
+    batch = filterClass()
+    batch.updateBatch( array )
+    assert _isFinite( batch.getEuler() )
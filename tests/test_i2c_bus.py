@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of shared I2C bus reference counting and poll scheduler robustness
+#
+
+import threading
+import time
+
+from JMRPiSpark.Drives.Bus import I2CBus
+from JMRPiSpark.Drives.Bus.I2CBus import I2CPollScheduler, getI2CBusManager
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPU6050
+
+class _FakeSMBus:
+    """smbus stub, all registers read 0"""
+    opened = 0
+    closed = 0
+
+    def __init__(self, busId):
+        _FakeSMBus.opened += 1
+
+    def read_byte_data(self, address, reg):
+        return 0
+
+    def read_i2c_block_data(self, address, reg, length):
+        return [0] * length
+
+    def write_byte_data(self, address, reg, value):
+        pass
+
+    def write_i2c_block_data(self, address, reg, data):
+        pass
+
+    def close(self):
+        _FakeSMBus.closed += 1
+
+class _FakeSMBusModule:
+    SMBus = _FakeSMBus
+
+def test_mpu_close_releases_shared_bus(monkeypatch):
+    monkeypatch.setattr( I2CBus, "smbus", _FakeSMBusModule )
+    monkeypatch.setattr( I2CBus, "_manager", None )
+    _FakeSMBus.opened = _FakeSMBus.closed = 0
+
+    imu0 = MPU6050( 0x68 )
+    imu1 = MPU6050( 0x69 )
+    assert _FakeSMBus.opened == 1
+    imu0.close()
+    imu0.close()
+    assert _FakeSMBus.closed == 0
+    imu1.close()
+    assert _FakeSMBus.closed == 1
+    assert getI2CBusManager().getStats() == {}
+
+def test_mpu_close_keeps_passed_bus():
+    bus = _FakeSMBus( 1 )
+    _FakeSMBus.closed = 0
+    imu = MPU6050( 0x68, bus = bus )
+    imu.close()
+    assert _FakeSMBus.closed == 0
+
+def test_scheduler_survives_callback_exception():
+    scheduler = I2CPollScheduler()
+    done = threading.Event()
+    runs = []
+
+    def failing():
+        raise ValueError("broken device")
+
+    def healthy():
+        runs.append( 1 )
+        if len( runs ) >= 5: done.set()
+
+    scheduler.addTask( "failing", failing, 200 )
+    scheduler.addTask( "healthy", healthy, 200 )
+    scheduler.start()
+    try:
+        assert done.wait( 2 )
+    finally:
+        scheduler.stop()
+    assert scheduler.getStats()["failing"]["errors"] >= 1
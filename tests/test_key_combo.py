@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of chord and sequence recognition of RPiKeyCombo
+#
+
+from JMRPiSpark.Drives.Key.KeyEvents import KeyEvent, KEY_EVENT_DOWN, KEY_EVENT_UP
+from JMRPiSpark.Drives.Key.RPiKeyCombo import RPiKeyCombo
+
+_MS = 1000000
+
+def _combo():
+    combo = RPiKeyCombo()
+    names = []
+    combo.addCallback( lambda e: names.append( e.name ) )
+    combo.addCombo( "UP UP", [ 5, 5 ] )
+    combo.addCombo( "AB", [ ( 22, 23 ) ] )
+    return combo, names
+
+def _tap(combo, key, ms, holdMs = 20):
+    combo.feed( KeyEvent( KEY_EVENT_DOWN, key, ms * _MS, None ) )
+    combo.feed( KeyEvent( KEY_EVENT_UP, key, ( ms + holdMs ) * _MS, None ) )
+
+def test_quick_taps_of_same_key_are_two_steps():
+    combo, names = _combo()
+    _tap( combo, 5, 0 )
+    _tap( combo, 5, 70 )
+    assert names == [ "UP UP" ]
+
+def test_chord_grows_while_keys_held():
+    combo, names = _combo()
+    combo.feed( KeyEvent( KEY_EVENT_DOWN, 22, 0, None ) )
+    combo.feed( KeyEvent( KEY_EVENT_DOWN, 23, 40 * _MS, None ) )
+    assert names == [ "AB" ]
+
+def test_chord_closed_by_release():
+    combo, names = _combo()
+    _tap( combo, 22, 0 )
+    combo.feed( KeyEvent( KEY_EVENT_DOWN, 23, 40 * _MS, None ) )
+    assert names == []
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of key event queue mode of RPiKeyButtons with a fake RPi.GPIO
+#
+
+import importlib
+import sys
+import time
+import types
+
+import pytest
+
+class _FakeGPIO(types.ModuleType):
+    """RPi.GPIO stub, levels are set by tests and edges are fired by calling the registered callback"""
+    BCM = 11
+    IN = 1
+    PUD_UP = 22
+    PUD_DOWN = 21
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self):
+        types.ModuleType.__init__( self, "RPi.GPIO" )
+        self.levels = {}
+        self.callbacks = {}
+        self.bounceTimes = {}
+
+    def setwarnings(self, flag): pass
+    def setmode(self, mode): pass
+    def setup(self, pin, direction, pull_up_down = None): pass
+
+    def add_event_detect(self, pin, edge, callback = None, bouncetime = None):
+        if pin in self.callbacks:
+            raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+        self.callbacks[pin] = callback
+        self.bounceTimes[pin] = bouncetime
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop( pin, None )
+
+    def input(self, pin):
+        return self.levels.get( pin, self.HIGH )
+
+    def edge(self, pin, level):
+        self.levels[pin] = level
+        self.callbacks[pin]( pin )
+
+@pytest.fixture
+def gpio(monkeypatch):
+    fake = _FakeGPIO()
+    package = types.ModuleType( "RPi" )
+    package.GPIO = fake
+    monkeypatch.setitem( sys.modules, "RPi", package )
+    monkeypatch.setitem( sys.modules, "RPi.GPIO", fake )
+    for name in ( "RPiKeyButtons", "RPiKeyDebouncer" ):
+        module = importlib.import_module( "JMRPiSpark.Drives.Key." + name )
+        monkeypatch.setattr( module, "GPIO", fake )
+    return fake
+
+def _keyButtons():
+    from JMRPiSpark.Drives.Key.RPiKeyButtons import RPiKeyButtons
+    return RPiKeyButtons()
+
+def test_bouncy_release_ends_up(gpio):
+    from JMRPiSpark.Drives.Key.KeyEvents import KEY_EVENT_DOWN, KEY_EVENT_UP
+    keys = _keyButtons()
+    queue = keys.enableKeyEvents( [ 5 ], debounceTime = 5 )
+    try:
+        assert gpio.bounceTimes[5] == None
+        gpio.edge( 5, gpio.LOW )
+        time.sleep( 0.05 )
+        # Release bounces, the last edge settles high within a few ms
+        for level in ( gpio.HIGH, gpio.LOW, gpio.HIGH, gpio.LOW, gpio.HIGH ):
+            gpio.edge( 5, level )
+        time.sleep( 0.05 )
+        events = [ ( e.kind, e.key ) for e in queue.drain() ]
+        assert events == [ ( KEY_EVENT_DOWN, 5 ), ( KEY_EVENT_UP, 5 ) ]
+        assert not queue.isPressed( 5 )
+    finally:
+        keys.disableKeyEvents()
+    assert 5 not in gpio.callbacks
+    assert keys.getKeyDebouncer().getGPIOKeys() == []
+
+def test_conflict_with_set_key_button_raises(gpio):
+    keys = _keyButtons()
+    keys.setKeyButton( 6, lambda channel: None )
+    with pytest.raises( RuntimeError ):
+        keys.enableKeyEvents( [ 6 ] )
+    keys.removeKeyButtonEvent( [ 6 ] )
+    keys.enableKeyEvents( [ 6 ] )
+    keys.disableKeyEvents()
+
+def test_setup_gpio_error_is_raised(gpio):
+    from JMRPiSpark.Drives.Key.RPiKeyDebouncer import RPiKeyDebouncer
+    gpio.add_event_detect( 7, gpio.BOTH, callback = lambda channel: None )
+    debouncer = RPiKeyDebouncer()
+    with pytest.raises( RuntimeError ):
+        debouncer.setupGPIO( [ 7 ] )
+    with pytest.raises( KeyError ):
+        debouncer.isPressed( 7 )
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of RPiKeyGpioCdev against the GPIO uAPI v2 layout of linux/gpio.h,
+# event parsing with a pipe as line fd, and a gpio-sim test when the module is available
+#
+
+import ctypes
+import os
+import struct
+import time
+
+import pytest
+
+from JMRPiSpark.Drives.Key import RPiKeyGpioCdev as cdev
+from JMRPiSpark.Drives.Key.RPiKeyGpioCdev import RPiKeyGpioCdev, KEY_BIAS_PULL_UP, KEY_BIAS_PULL_DOWN
+from JMRPiSpark.Drives.Key.KeyEvents import KeyEventQueue, KEY_EVENT_DOWN, KEY_EVENT_UP
+
+# linux/gpio.h, written independently of the hand-computed offsets of the driver
+class _LineAttribute(ctypes.Structure):
+    class _Value(ctypes.Union):
+        _fields_ = [ ( "flags", ctypes.c_uint64 ), ( "values", ctypes.c_uint64 ), ( "debounce_period_us", ctypes.c_uint32 ) ]
+    _anonymous_ = ( "value", )
+    _fields_ = [ ( "id", ctypes.c_uint32 ), ( "padding", ctypes.c_uint32 ), ( "value", _Value ) ]
+
+class _LineConfigAttribute(ctypes.Structure):
+    _fields_ = [ ( "attr", _LineAttribute ), ( "mask", ctypes.c_uint64 ) ]
+
+class _LineConfig(ctypes.Structure):
+    _fields_ = [ ( "flags", ctypes.c_uint64 ), ( "num_attrs", ctypes.c_uint32 ), ( "padding", ctypes.c_uint32 * 5 ),
+                 ( "attrs", _LineConfigAttribute * cdev.GPIO_V2_LINE_NUM_ATTRS_MAX ) ]
+
+class _LineRequest(ctypes.Structure):
+    _fields_ = [ ( "offsets", ctypes.c_uint32 * cdev.GPIO_V2_LINES_MAX ), ( "consumer", ctypes.c_char * 32 ),
+                 ( "config", _LineConfig ), ( "num_lines", ctypes.c_uint32 ), ( "event_buffer_size", ctypes.c_uint32 ),
+                 ( "padding", ctypes.c_uint32 * 5 ), ( "fd", ctypes.c_int32 ) ]
+
+class _LineEvent(ctypes.Structure):
+    _fields_ = [ ( "timestamp_ns", ctypes.c_uint64 ), ( "id", ctypes.c_uint32 ), ( "offset", ctypes.c_uint32 ),
+                 ( "seqno", ctypes.c_uint32 ), ( "line_seqno", ctypes.c_uint32 ), ( "padding", ctypes.c_uint32 * 6 ) ]
+
+def test_uapi_layout():
+    assert ctypes.sizeof( _LineRequest ) == cdev.GPIO_V2_LINE_REQUEST_SIZE == 592
+    assert ctypes.sizeof( _LineEvent ) == cdev.GPIO_V2_LINE_EVENT_SIZE == 48
+    assert _LineRequest.consumer.offset == cdev._REQ_CONSUMER
+    assert _LineRequest.config.offset + _LineConfig.flags.offset == cdev._REQ_CONFIG_FLAGS
+    assert _LineRequest.config.offset + _LineConfig.num_attrs.offset == cdev._REQ_CONFIG_NATTRS
+    assert _LineRequest.config.offset + _LineConfig.attrs.offset == cdev._REQ_CONFIG_ATTRS == 320
+    assert _LineRequest.num_lines.offset == cdev._REQ_NUM_LINES == 560
+    assert _LineRequest.event_buffer_size.offset == cdev._REQ_EVENT_BUF_SIZE
+    assert _LineRequest.fd.offset == cdev._REQ_FD
+    assert struct.calcsize( cdev._EVENT_FORMAT ) == ctypes.sizeof( _LineEvent )
+    # Values of linux/gpio.h on all architectures with the generic ioctl encoding
+    assert cdev.GPIO_V2_GET_LINE_IOCTL == 0xC250B407
+    assert cdev.GPIO_V2_LINE_GET_VALUES_IOCTL == 0xC010B40E
+
+def test_build_request():
+    keys = RPiKeyGpioCdev( [ 5, 6, 26 ], debounceTime = 5, consumer = "spark", eventBufferSize = 32 )
+    req = _LineRequest.from_buffer( keys._buildRequest() )
+    assert list( req.offsets[:3] ) == [ 5, 6, 26 ]
+    assert req.consumer == b"spark"
+    assert req.num_lines == 3
+    assert req.event_buffer_size == 32
+    assert req.config.flags == ( cdev.GPIO_V2_LINE_FLAG_INPUT | cdev.GPIO_V2_LINE_FLAG_EDGE_RISING |
+                                 cdev.GPIO_V2_LINE_FLAG_EDGE_FALLING | cdev.GPIO_V2_LINE_FLAG_BIAS_PULL_UP |
+                                 cdev.GPIO_V2_LINE_FLAG_ACTIVE_LOW )
+    assert req.config.num_attrs == 1
+    attr = req.config.attrs[0]
+    assert attr.attr.id == cdev.GPIO_V2_LINE_ATTR_ID_DEBOUNCE
+    assert attr.attr.debounce_period_us == 5000
+    assert attr.mask == 0b111
+
+    req = _LineRequest.from_buffer( RPiKeyGpioCdev( [ 22 ], bias = KEY_BIAS_PULL_DOWN )._buildRequest() )
+    assert req.config.flags & cdev.GPIO_V2_LINE_FLAG_BIAS_PULL_DOWN
+    assert not req.config.flags & ( cdev.GPIO_V2_LINE_FLAG_ACTIVE_LOW | cdev.GPIO_V2_LINE_FLAG_BIAS_PULL_UP )
+    assert req.config.num_attrs == 0
+
+def _event(timestamp, eventId, offset, seqno):
+    event = _LineEvent( timestamp_ns = timestamp, id = eventId, offset = offset, seqno = seqno, line_seqno = seqno )
+    return bytes( bytearray( event ) )
+
+def test_read_events_from_pipe():
+    keys = RPiKeyGpioCdev( [ 5, 6 ] )
+    readFd, writeFd = os.pipe()
+    keys._lineFd = readFd
+    try:
+        os.write( writeFd, _event( 1000, cdev.GPIO_V2_LINE_EVENT_RISING_EDGE, 5, 1 ) +
+                           _event( 2000, cdev.GPIO_V2_LINE_EVENT_FALLING_EDGE, 5, 2 ) +
+                           _event( 3000, cdev.GPIO_V2_LINE_EVENT_RISING_EDGE, 6, 5 ) )
+        events = keys.readEvents()
+        assert [ tuple( e ) for e in events ] == [ ( KEY_EVENT_DOWN, 5, 1000, None ), ( KEY_EVENT_UP, 5, 2000, None ),
+                                                   ( KEY_EVENT_DOWN, 6, 3000, None ) ]
+        os.write( writeFd, _event( 4000, cdev.GPIO_V2_LINE_EVENT_FALLING_EDGE, 6, 6 ) )
+        assert len( keys.readEvents() ) == 1
+        stats = keys.getStats()
+        assert stats["reads"] == 2
+        assert stats["events"] == 4
+        assert stats["lost"] == 2
+    finally:
+        keys._lineFd = None
+        os.close( readFd )
+        os.close( writeFd )
+
+_GPIO_SIM = "/sys/kernel/config/gpio-sim"
+
+def _write(path, value):
+    with open( path, "w" ) as f:
+        f.write( value )
+
+def _read(path):
+    with open( path ) as f:
+        return f.read().strip()
+
+@pytest.fixture
+def simChip():
+    """A gpio-sim chip with 8 lines, skipped without gpio-sim or permission"""
+    if not os.path.isdir( _GPIO_SIM ):
+        pytest.skip( "gpio-sim is not available" )
+    root = os.path.join( _GPIO_SIM, "rpi-spark-keys-{}".format( os.getpid() ) )
+    bank = os.path.join( root, "bank0" )
+    try:
+        os.mkdir( root )
+        os.mkdir( bank )
+        _write( os.path.join( bank, "num_lines" ), "8" )
+        _write( os.path.join( root, "live" ), "1" )
+    except ( IOError, OSError ) as e:
+        if os.path.isdir( bank ): os.rmdir( bank )
+        if os.path.isdir( root ): os.rmdir( root )
+        pytest.skip( "gpio-sim chip can not be created: {}".format( e ) )
+    chipName = _read( os.path.join( bank, "chip_name" ) )
+    pulls = os.path.join( "/sys/devices/platform", _read( os.path.join( root, "dev_name" ) ), chipName )
+    try:
+        yield "/dev/" + chipName, lambda line, pull: _write( os.path.join( pulls, "sim_gpio{}".format( line ), "pull" ), pull )
+    finally:
+        _write( os.path.join( root, "live" ), "0" )
+        os.rmdir( bank )
+        os.rmdir( root )
+
+def test_gpio_sim_events(simChip):
+    chip, setPull = simChip
+    queue = KeyEventQueue()
+    keys = RPiKeyGpioCdev( [ 2, 5 ], chip = chip, bias = KEY_BIAS_PULL_UP, eventQueue = queue )
+    keys.start()
+    try:
+        assert keys.getKeyState() == 0
+        setPull( 5, "pull-down" )
+        time.sleep( 0.1 )
+        assert keys.readKeyButton( 5 )
+        setPull( 5, "pull-up" )
+        time.sleep( 0.1 )
+    finally:
+        keys.close()
+    assert [ ( e.kind, e.key ) for e in queue.drain() ] == [ ( KEY_EVENT_DOWN, 5 ), ( KEY_EVENT_UP, 5 ) ]
+    assert keys.getStats()["lost"] == 0
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of MotionGesture detectors on synthetic accelerometer traces
+#
+
+import math
+import random
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPUSample, GRAVITIY_EARTH
+from JMRPiSpark.Drives.Attitude.MotionGesture import MotionGesture
+from JMRPiSpark.Drives.Attitude.MotionGesture import GESTURE_TAP, GESTURE_DOUBLE_TAP, GESTURE_SHAKE
+from JMRPiSpark.Drives.Attitude.MotionGesture import GESTURE_TILT, GESTURE_FREE_FALL
+
+RATE = 200.0
+NOISE = 0.01        # g
+
+class _Trace:
+    """Build a trace of accelerometer samples in g, with sensor noise"""
+    def __init__(self, seed = 1):
+        self.samples = []
+        self._rnd = random.Random( seed )
+
+    def add(self, seconds, accel):
+        for k in range( int( seconds * RATE ) ):
+            ax, ay, az = accel( k / RATE )
+            t = len( self.samples ) / RATE
+            self.samples.append( MPUSample( t,
+                ( ax + self._rnd.gauss( 0, NOISE ) ) * GRAVITIY_EARTH,
+                ( ay + self._rnd.gauss( 0, NOISE ) ) * GRAVITIY_EARTH,
+                ( az + self._rnd.gauss( 0, NOISE ) ) * GRAVITIY_EARTH, 25.0, 0.0, 0.0, 0.0 ) )
+        return self
+
+    def rest(self, seconds):
+        return self.add( seconds, lambda t: ( 0.0, 0.0, 1.0 ) )
+
+def _events(trace):
+    events = []
+    detector = MotionGesture( RATE )
+    detector.addCallback( events.append )
+    detector.updateBatch( trace.samples )
+    return [ e.kind for e in events ]
+
+def test_tap():
+    trace = _Trace().rest( 1.0 ).add( 0.015, lambda t: ( 0.0, 0.0, 3.0 ) ).rest( 1.0 )
+    assert _events( trace ) == [ GESTURE_TAP ]
+
+def test_double_tap():
+    trace = _Trace().rest( 1.0 ).add( 0.015, lambda t: ( 0.0, 0.0, 3.0 ) ).rest( 0.15 ) \
+        .add( 0.015, lambda t: ( 0.0, 0.0, 3.0 ) ).rest( 1.0 )
+    assert _events( trace ) == [ GESTURE_TAP, GESTURE_TAP, GESTURE_DOUBLE_TAP ]
+
+def test_slow_taps_are_not_double_tap():
+    trace = _Trace().rest( 1.0 ).add( 0.015, lambda t: ( 0.0, 0.0, 3.0 ) ).rest( 1.0 ) \
+        .add( 0.015, lambda t: ( 0.0, 0.0, 3.0 ) ).rest( 1.0 )
+    assert _events( trace ) == [ GESTURE_TAP, GESTURE_TAP ]
+
+def test_shake():
+    trace = _Trace().rest( 1.0 ).add( 1.0, lambda t: ( 1.5 * math.sin( 2 * math.pi * 5 * t ), 0.0, 1.0 ) ).rest( 1.0 )
+    events = _events( trace )
+    assert events.count( GESTURE_SHAKE ) == 1
+    assert GESTURE_TILT not in events
+
+def test_tilt():
+    angle = math.radians( 45 )
+    trace = _Trace().rest( 1.0 ).add( 1.0, lambda t: ( 0.0, math.sin( angle ), math.cos( angle ) ) ).rest( 1.0 )
+    assert _events( trace ) == [ GESTURE_TILT ]
+
+def test_free_fall():
+    trace = _Trace().rest( 1.0 ).add( 0.3, lambda t: ( 0.0, 0.0, 0.02 ) ).rest( 1.0 )
+    events = _events( trace )
+    assert events.count( GESTURE_FREE_FALL ) == 1
+    assert GESTURE_SHAKE not in events
+
+def test_no_false_positive_at_rest_and_slow_motion():
+    def slowTilt(t):
+        # Rock slowly within +-20 degrees, below tilt threshold
+        angle = math.radians( 20.0 * math.sin( 2 * math.pi * 0.2 * t ) )
+        return ( math.sin( angle ) * 0.5, math.sin( angle ) * 0.866, math.cos( angle ) )
+    trace = _Trace().rest( 5.0 ).add( 10.0, slowTilt ).rest( 5.0 )
+    assert _events( trace ) == []
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of RollingStats and MotionStats against numpy over the sliding window
+#
+
+import random
+
+import numpy
+import pytest
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPUSample, MPU_SAMPLE_DTYPE
+from JMRPiSpark.Drives.Attitude.MotionStats import RollingStats, MotionStats
+
+_NAN = float("nan")
+WINDOW = 50
+
+def _values(n, seed = 1):
+    rnd = random.Random( seed )
+    values = [ rnd.gauss( 3.0, 2.0 ) for i in range( n ) ]
+    for i in ( 0, 7, 60, 61, 130 ):
+        if i < n: values[i] = _NAN
+    if n > 90: values[90] = float("inf")
+    return values
+
+def _assertWindow(stats, values):
+    window = numpy.array( [ v for v in values if numpy.isfinite( v ) ][-WINDOW:] )
+    assert len( stats ) == len( window )
+    assert stats.getMean() == pytest.approx( window.mean(), abs = 1e-9 )
+    assert stats.getVariance() == pytest.approx( window.var(), abs = 1e-9 )
+    assert stats.getRMS() == pytest.approx( numpy.sqrt( ( window * window ).mean() ), abs = 1e-9 )
+    assert stats.getMin() == window.min()
+    assert stats.getMax() == window.max()
+    assert stats.getPeak() == numpy.abs( window ).max()
+
+def test_update_matches_numpy_window():
+    values = _values( 200 )
+    stats = RollingStats( WINDOW )
+    for k, value in enumerate( values ):
+        stats.update( value )
+        if k >= 2: _assertWindow( stats, values[:k + 1] )
+
+def test_update_batch_matches_numpy_window():
+    values = _values( 200 )
+    stats = RollingStats( WINDOW )
+    for start, end in ( ( 0, 10 ), ( 10, 65 ), ( 65, 66 ), ( 66, 200 ) ):
+        stats.updateBatch( numpy.array( values[start:end] ) )
+        _assertWindow( stats, values[:end] )
+    # Mixed with single updates
+    more = _values( 30, seed = 2 )
+    for value in more:
+        stats.update( value )
+    _assertWindow( stats, values + more )
+
+def test_motion_stats_skips_missing_fields():
+    stats = MotionStats( 100, window = 0.5, gravityFactor = 1.0 )
+    samples = [ MPUSample( i * 0.01, 0.0, 0.0, 1.0, 25.0, 3.0, 4.0, 0.0 ) for i in range( 60 ) ]
+    samples[5] = samples[5]._replace( gyro_x = None, gyro_y = None, gyro_z = None )
+    samples[9] = samples[9]._replace( accel_x = None, accel_y = None, accel_z = None )
+    samples[20] = samples[20]._replace( accel_x = _NAN, accel_y = _NAN, accel_z = _NAN )
+    stats.updateBatch( samples )
+    result = stats.getStats()
+    assert result["accel"]["mean"] == pytest.approx( 1.0 )
+    assert result["gyro"]["rms"] == pytest.approx( 5.0 )
+
+    array = MotionStats( 100, window = 0.5, gravityFactor = 1.0 )
+    data = numpy.array( [ tuple( _NAN if v == None else v for v in s ) for s in samples ], dtype = MPU_SAMPLE_DTYPE )
+    array.updateBatch( data )
+    assert array.getStats()["accel"]["mean"] == pytest.approx( 1.0 )
+    assert array.getStats()["gyro"]["std"] == pytest.approx( 0.0, abs = 1e-9 )
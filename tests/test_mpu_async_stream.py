@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of MPUAsyncStream subscriptions in STREAM_BLOCK mode
+#
+
+import asyncio
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPUSample
+from JMRPiSpark.Drives.Attitude.MPUAsyncStream import MPUAsyncStream, STREAM_BLOCK
+from JMRPiSpark.Drives.Attitude.MPUSampler import DEF_SAMPLE_RATE
+
+class _FakeMPU:
+    """Sensor stub with only what the polling stream reads"""
+    def getSampleRate(self):
+        return 500.0
+
+    def getSample(self):
+        return MPUSample( 0.0, 0.0, 0.0, 1.0, 25.0, 0.0, 0.0, 0.0 )
+
+async def _fastConsumer(stream, received, seconds):
+    async with stream.subscribe( maxQueue = 4 ) as batches:
+        loop = asyncio.get_event_loop()
+        end = loop.time() + seconds
+        async for batch in batches:
+            received.append( batch )
+            if loop.time() > end: break
+
+async def _slowConsumer(stream, started):
+    async for batch in stream.subscribe( maxQueue = 1 ):
+        started.set()
+        # Cancelled while processing, not while waiting on the subscription
+        await asyncio.sleep( 3600 )
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete( coroutine )
+    finally:
+        loop.close()
+
+def test_cancelled_slow_subscriber_does_not_block_stream():
+    async def main():
+        stream = MPUAsyncStream( _FakeMPU(), batchSize = 5, overflow = STREAM_BLOCK, pollRate = 500 )
+        stream.start()
+        started = asyncio.Event()
+        slow = asyncio.ensure_future( _slowConsumer( stream, started ) )
+        await started.wait()
+        # Let the slow queue fill up and block the stream
+        await asyncio.sleep( 0.2 )
+        slow.cancel()
+        await asyncio.sleep( 0 )
+        received = []
+        await asyncio.wait_for( _fastConsumer( stream, received, 0.3 ), 5 )
+        stats = stream.getStats()
+        await stream.stop()
+        return received, stats
+
+    received, stats = _run( main() )
+    assert len( received ) >= 10
+    assert stats["subscriptions"] == 0
+
+def test_closed_subscription_releases_blocked_stream():
+    async def main():
+        stream = MPUAsyncStream( _FakeMPU(), batchSize = 5, overflow = STREAM_BLOCK, pollRate = 500 )
+        stream.start()
+        idle = stream.subscribe( maxQueue = 1 )
+        await asyncio.sleep( 0.2 )
+        blocked = stream.getStats()["batches"]
+        idle.close()
+        await asyncio.sleep( 0.2 )
+        batches = stream.getStats()["batches"]
+        await stream.stop()
+        return blocked, batches
+
+    blocked, batches = _run( main() )
+    assert batches > blocked + 5
+
+def test_default_poll_rate_is_bounded():
+    assert MPUAsyncStream( _FakeMPU() ).getPollRate() == DEF_SAMPLE_RATE
+    assert MPUAsyncStream( _FakeMPU(), pollRate = 200 ).getPollRate() == 200.0
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of MPUPowerManager state machine with a scripted MPU6050 stub
+#
+
+import threading
+import time
+
+from JMRPiSpark.Drives.Attitude import MPUPowerManager as power
+from JMRPiSpark.Drives.Attitude.MPUPowerManager import MPUPowerManager
+from JMRPiSpark.Drives.Attitude.MPUPowerManager import POWER_STATE_IDLE, POWER_STATE_ACTIVE, POWER_STATE_OFF
+
+class _ScriptedMPU:
+    """MPU6050 stub: INT_STATUS and samples follow the flags set by the test, every call is one bus transaction"""
+    VAL_PWR_MGMT_2_LP_WAKE_CTRL_5HZ = 0x40
+    VAL_INT_STATUS_MOT = 0x40
+
+    def __init__(self):
+        self.intStatus = 0
+        self.moving = False
+        self.transactions = 0
+        self.lock = threading.Lock()
+
+    def _count(self):
+        with self.lock:
+            self.transactions += 1
+
+    def getSampleRate(self):
+        return 8000.0
+
+    def getGravityFactor(self):
+        return 1.0
+
+    def getBusStats(self):
+        with self.lock:
+            return { "transactions": self.transactions, "bytes_read": self.transactions, "bytes_written": 0 }
+
+    def getIntDataRdy(self):
+        self._count()
+        status, self.intStatus = self.intStatus, 0
+        return status
+
+    def readSensorData(self):
+        self._count()
+        return ( 0.0, 0.0, 1.0, 25.0, 90.0 if self.moving else 0.0, 0.0, 0.0 )
+
+    def setMotionInt(self): self._count()
+    def openOnlyAccel(self, freq): self._count()
+    def disableInt(self): self._count()
+    def open(self): self._count()
+    def sleep(self): self._count()
+
+def _waitState(manager, state, timeout = 3.0):
+    end = time.time() + timeout
+    while manager.getState() != state and time.time() < end:
+        time.sleep( 0.01 )
+    return manager.getState() == state
+
+def test_idle_active_idle(monkeypatch):
+    monkeypatch.setattr( power, "DEF_IDLE_POLL_INTERVAL", 0.02 )
+    monkeypatch.setattr( power, "DEF_ACTIVE_CHECK_INTERVAL", 0.02 )
+    mpu = _ScriptedMPU()
+    manager = MPUPowerManager( mpu, quietTimeout = 0.2 )
+    states = []
+    manager.addStateCallback( states.append )
+
+    manager.start()
+    try:
+        time.sleep( 0.1 )
+        assert manager.getState() == POWER_STATE_IDLE
+        idle = manager.getStats()[POWER_STATE_IDLE]
+        assert idle["wakeups"] >= 2 and idle["transactions"] >= 2
+
+        mpu.moving = True
+        mpu.intStatus = mpu.VAL_INT_STATUS_MOT
+        assert _waitState( manager, POWER_STATE_ACTIVE )
+        # Still moving, no timeout
+        time.sleep( 0.3 )
+        assert manager.getState() == POWER_STATE_ACTIVE
+        mpu.moving = False
+        assert _waitState( manager, POWER_STATE_IDLE )
+    finally:
+        manager.stop()
+
+    assert states == [ POWER_STATE_IDLE, POWER_STATE_ACTIVE, POWER_STATE_IDLE, POWER_STATE_OFF ]
+    stats = manager.getStats()
+    assert stats[POWER_STATE_IDLE]["entries"] == 2
+    assert stats[POWER_STATE_ACTIVE]["entries"] == 1
+    assert 0.4 <= stats[POWER_STATE_ACTIVE]["time"] < 2.0
+    # Power-on sample rate of sensor is 8kHz, active sampling stays at DEF_SAMPLE_RATE
+    assert 20 <= stats[POWER_STATE_ACTIVE]["wakeups"] < 200
+    assert stats[POWER_STATE_ACTIVE]["transactions"] >= 20
+    assert stats[POWER_STATE_ACTIVE]["bytes"] == stats[POWER_STATE_ACTIVE]["transactions"]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of MPURecorder: record -> replay round trip through MPU6050, index chain and seek
+#
+
+import struct
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPU6050
+from JMRPiSpark.Drives.Attitude.MPURecorder import MPURecorder, MPURecordReader, RecordingBus, ReplayBus
+from JMRPiSpark.Drives.Attitude.MPURecorder import REC_READ_BLOCK
+
+ADDRESS = 0x68
+
+class _SensorBus:
+    """smbus stub: a register map, sensor data registers change on every read"""
+    def __init__(self):
+        self.registers = bytearray( 256 )
+        self.registers[0x75] = ADDRESS
+        self.reads = 0
+
+    def read_byte_data(self, address, register):
+        return self.registers[register]
+
+    def read_i2c_block_data(self, address, register, length):
+        if register == MPU6050.REG_ACCEL_XOUT_H:
+            self.reads += 1
+            k = self.reads
+            self.registers[register:register + 14] = struct.pack( ">7h", k, -2 * k, 16384 - k, 100 * k, 3 * k, -k, 7 )
+        return list( self.registers[register:register + length] )
+
+    def write_byte_data(self, address, register, value):
+        self.registers[register] = value
+
+def test_record_replay_round_trip(tmp_path):
+    path = str( tmp_path / "motion.rec" )
+    recorder = MPURecorder( path, indexInterval = 16 )
+    mpu = MPU6050( ADDRESS, bus = RecordingBus( _SensorBus(), recorder ) )
+    mpu.open()
+    recorded = [ mpu.readRawData() for i in range( 50 ) ]
+    recorder.close()
+    assert len( set( recorded ) ) == 50
+
+    replay = MPU6050( ADDRESS, bus = ReplayBus( path, speed = None ) )
+    replay.open()
+    assert [ replay.readRawData() for i in range( 50 ) ] == recorded
+
+def _session(path, first, chunks, interval = 4):
+    recorder = MPURecorder( path, indexInterval = interval )
+    for i in range( chunks * interval ):
+        recorder.log( REC_READ_BLOCK, ADDRESS, 0x3B, [ i & 0xFF ], timestamp = first + i )
+    recorder.close()
+
+def test_index_chain_across_appended_sessions(tmp_path):
+    path = str( tmp_path / "sessions.rec" )
+    _session( path, 100.0, 4 )
+    _session( path, 200.0, 4 )
+    reader = MPURecordReader( path )
+    index = reader.readIndex()
+    assert [ ts for ts, offset in index ] == [ 100.0, 104.0, 108.0, 112.0, 200.0, 204.0, 208.0, 212.0 ]
+    assert len( list( reader.records() ) ) == 32
+
+    # Seek into the first session by index
+    records = list( reader.records( start = 109.0 ) )
+    assert records[0][4] == 109.0
+    assert len( records ) == 7 + 16
+
+def test_append_after_lost_end_record(tmp_path):
+    path = str( tmp_path / "lost.rec" )
+    recorder = MPURecorder( path, indexInterval = 4 )
+    for i in range( 10 ):
+        recorder.log( REC_READ_BLOCK, ADDRESS, 0x3B, [ i ], timestamp = 10.0 + i )
+    # Power lost: flushed, but no last index and end record
+    recorder.flush()
+    _session( path, 50.0, 2 )
+    assert [ ts for ts, offset in MPURecordReader( path ).readIndex() ] == [ 10.0, 14.0, 50.0, 54.0 ]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of MPURingBuffer batch writes against per-sample writes and of MPUSampler rates
+#
+
+import math
+
+import pytest
+
+from JMRPiSpark.Drives.Attitude.MPU6050 import MPUSample
+from JMRPiSpark.Drives.Attitude.MPUSampler import MPURingBuffer, MPUSampler, DEF_SAMPLE_RATE
+
+def _samples(n, temp = 25.0):
+    return [ MPUSample( i * 0.01, 0.0, 0.0, 1.0, temp, 0.1 * i, 0.0, 0.0 ) for i in range( n ) ]
+
+def test_write_batch_of_iterator_with_none_fields():
+    buffer = MPURingBuffer( 8 )
+    buffer.writeBatch( iter( _samples( 3, temp = None ) ) )
+    assert len( buffer ) == 3
+    samples = buffer.read()
+    assert [ s.timestamp for s in samples ] == [ 0.0, 0.01, 0.02 ]
+    assert all( math.isnan( s.temp ) for s in samples )
+
+def test_write_batch_matches_write():
+    single = MPURingBuffer( 8 )
+    batch = MPURingBuffer( 8 )
+    samples = _samples( 13 )
+    for sample in samples:
+        single.write( *sample )
+    batch.writeBatch( samples[:5] )
+    batch.writeBatch( s for s in samples[5:] )
+    assert len( batch ) == len( single ) == 8
+    assert batch.overruns == single.overruns
+    assert batch.read() == single.read()
+
+class _RateMPU:
+    def __init__(self, rate):
+        self.rate = rate
+
+    def getSampleRate(self):
+        return self.rate
+
+def test_sampler_default_rate_is_bounded():
+    # 8kHz is the power-on sample rate of sensor
+    assert MPUSampler( _RateMPU( 8000.0 ) ).getRate() == DEF_SAMPLE_RATE
+    assert MPUSampler( _RateMPU( 50.0 ) ).getRate() == 50.0
+    assert MPUSampler( _RateMPU( 8000.0 ), rate = 1000 ).getRate() == 1000.0
+    with pytest.raises( ValueError ):
+        MPUSampler( _RateMPU( 50.0 ), rate = 100 )
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of the coalescing refresh scheduler of SScreenBase on a virtual display
+#
+
+import time
+
+from JMRPiSpark.Drives.Display.VirtualDisplay import VirtualSSD1306_128x64
+from JMRPiSpark.Drives.Screen.SScreenSSD1306 import SScreenSSD1306
+
+FPS = 5
+TICK = 1.0 / FPS
+
+def _screen():
+    display = VirtualSSD1306_128x64()
+    display.init()
+    display.on()
+    screen = SScreenSSD1306( display, "1" )
+    refreshes = []
+    render = screen._refresh
+    def countingRefresh():
+        refreshes.append( time.time() )
+        render()
+    screen._refresh = countingRefresh
+    return screen, display.Controller, refreshes
+
+def test_refresh_requests_coalesce_into_one_tick():
+    screen, controller, refreshes = _screen()
+    screen.enableRefreshScheduler( fps = FPS )
+    try:
+        screen.Canvas.rectangle( (0, 0, 9, 4), fill = 1 )
+        for i in range( 20 ):
+            screen.refresh()
+        # Nothing is rendered before the tick
+        assert refreshes == []
+        time.sleep( TICK * 2.5 )
+        assert len( refreshes ) == 1
+        assert controller.getPixel( 0, 0 ) == 1
+        stats = screen.getRefreshStats()
+        assert stats == { "requests": 20, "coalesced": 19, "rendered": 1, "forced": 0 }
+    finally:
+        screen.disableRefreshScheduler()
+
+def test_refresh_now_bypasses_tick():
+    screen, controller, refreshes = _screen()
+    screen.enableRefreshScheduler( fps = FPS )
+    try:
+        screen.Canvas.rectangle( (0, 0, 9, 4), fill = 1 )
+        screen.refreshNow()
+        assert len( refreshes ) == 1
+        assert controller.getPixel( 0, 0 ) == 1
+
+        # A pending request is satisfied by refreshNow, the tick does not render it again
+        screen.refresh()
+        screen.refreshNow()
+        time.sleep( TICK * 2.5 )
+        assert len( refreshes ) == 2
+        assert screen.getRefreshStats() == { "requests": 1, "coalesced": 1, "rendered": 0, "forced": 2 }
+    finally:
+        screen.disableRefreshScheduler()
+    assert screen.isRefreshScheduled() == False
+
+def test_disable_flushes_pending_refresh():
+    screen, controller, refreshes = _screen()
+    screen.enableRefreshScheduler( fps = 1 )
+    screen.refresh()
+    screen.disableRefreshScheduler()
+    assert len( refreshes ) == 1
+    # Without scheduler refresh is immediate again
+    screen.refresh()
+    assert len( refreshes ) == 2
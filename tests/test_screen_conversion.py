@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of SSPILScreen lookup-table conversion and content preserving mode change / rotation
+#
+
+import random
+
+from PIL import Image
+
+from JMRPiSpark.Drives.Display.VirtualDisplay import VirtualRGBDisplay, VirtualSSD1306_128x64
+from JMRPiSpark.Drives.Screen.SScreenILI9341 import SScreenILI9341
+from JMRPiSpark.Drives.Screen.SScreenSSD1306 import SScreenSSD1306
+
+def _randomImages(size = (64, 48), seed = 1):
+    rnd = random.Random( seed )
+    palette = [ (rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)) for _ in range(256) ]
+    pixels = bytes( bytearray( rnd.randint(0, 255) for _ in range(size[0] * size[1]) ) )
+    imageP = Image.frombytes( "P", size, pixels )
+    imageP.putpalette( [ c for rgb in palette for c in rgb ] )
+    imageL = Image.frombytes( "L", size, pixels )
+    return palette, imageP, imageL
+
+def test_mono_lut_matches_convert():
+    palette, imageP, imageL = _randomImages()
+    screen = SScreenILI9341( VirtualRGBDisplay(), "P" )
+    screen.setPalette( palette )
+    assert screen._toMono( imageP ).tobytes() == imageP.convert( "L" ).convert( "1", dither = Image.NONE ).tobytes()
+    assert screen._toMono( imageL ).tobytes() == imageL.convert( "1", dither = Image.NONE ).tobytes()
+
+def test_rgb565_lut_matches_rgb_path():
+    palette, imageP, imageL = _randomImages()
+    screen = SScreenILI9341( VirtualRGBDisplay(), "P" )
+    screen.setPalette( palette )
+    assert screen._toRGB565( imageP ) == screen._toRGB565( imageP.convert( "RGB" ) )
+    assert screen._toRGB565( imageL ) == screen._toRGB565( imageL.convert( "RGB" ) )
+
+    # RGB path against per pixel packing
+    rgb = imageP.convert( "RGB" )
+    expected = bytearray()
+    for r, g, b in rgb.getdata():
+        value = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+        expected += bytearray( (value >> 8, value & 0xFF) )
+    assert screen._toRGB565( rgb ) == bytes( expected )
+
+def test_mode_change_keeps_content():
+    screen = SScreenSSD1306( VirtualSSD1306_128x64(), "1" )
+    screen.Canvas.rectangle( (10, 5, 40, 20), fill = 1 )
+    before = screen._buffer.tobytes()
+    for mode in ("L", "RGB", "P", "1"):
+        screen.changeBufferColorMode( mode )
+    assert screen._buffer.tobytes() == before
+
+def test_rotation_keeps_content():
+    screen = SScreenSSD1306( VirtualSSD1306_128x64(), "1" )
+    screen.Canvas.rectangle( (10, 5, 40, 20), fill = 1 )
+    before = screen._buffer.tobytes()
+    view = ( screen.View.x, screen.View.y, screen.View.width, screen.View.height )
+    for direction in (90, 180, 270, 0):
+        screen.rotateDirection( direction )
+    assert screen._buffer.tobytes() == before
+    assert ( screen.View.x, screen.View.y, screen.View.width, screen.View.height ) == view
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+#
+# Checks that partial updates of SSD1306 leave the panel equal to full updates
+#
+
+import random
+
+from JMRPiSpark.Drives.Display.VirtualDisplay import VirtualSSD1306_128x64
+
+def _newDisplay():
+    display = VirtualSSD1306_128x64( recordTraffic = True )
+    display.init()
+    display.on()
+    return display
+
+def test_display_changed_matches_full_update():
+    rnd = random.Random( 7 )
+    partial = _newDisplay()
+    full = _newDisplay()
+    partial.display()
+    for _ in range( 50 ):
+        for _ in range( rnd.randint( 1, 20 ) ):
+            i = rnd.randrange( len( partial._buffer ) )
+            partial._buffer[i] = full._buffer[i] = rnd.randint( 0, 255 )
+        partial.displayChanged()
+        full.display()
+        assert partial.Controller.gram == full.Controller.gram
+
+def test_display_changed_sends_only_window():
+    display = _newDisplay()
+    display.display()
+    display.Bus.resetStats()
+    display.displayChanged()
+    assert display.Bus.dataBytes == 0
+
+    # Column 10 page 2 and column 12 page 5: 3 columns x 4 pages
+    pages = display._mem_pages
+    display._buffer[10 * pages + 2] = 0xFF
+    display._buffer[12 * pages + 5] = 0x81
+    display.displayChanged()
+    assert display.Bus.dataBytes == 3 * 4
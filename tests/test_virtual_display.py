@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+#
+# Checks of headless display backends against the orientation of mounted panels
+#
+
+from JMRPiSpark.Drives.Display.VirtualDisplay import VirtualSSD1306_128x64
+from JMRPiSpark.Drives.Screen.SScreenSSD1306 import SScreenSSD1306
+
+def _drawTopLeft(mirrorH = 0, mirrorV = 0):
+    display = VirtualSSD1306_128x64( mirrorH = mirrorH, mirrorV = mirrorV )
+    display.init()
+    display.on()
+    screen = SScreenSSD1306( display, "1" )
+    screen.Canvas.rectangle( (0, 0, 9, 4), fill = 1 )
+    screen.refresh()
+    return display.Controller
+
+def test_default_init_is_upright():
+    controller = _drawTopLeft()
+    assert controller.getPixel( 0, 0 ) == 1
+    assert controller.getPixel( 127, 63 ) == 0
+    assert controller.toImage().getbbox() == (0, 0, 10, 5)
+
+def test_mirror_flips_picture():
+    assert _drawTopLeft( mirrorH = 1 ).toImage().getbbox() == (118, 0, 128, 5)
+    assert _drawTopLeft( mirrorV = 1 ).toImage().getbbox() == (0, 59, 10, 64)